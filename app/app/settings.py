@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'drf_spectacular',
@@ -46,6 +47,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,14 +84,112 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # PostgreSQL with connection metrics and an optional pool.
+        'ENGINE': 'core.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # Seconds a thread keeps its connection open for later requests.
+        # Use 0 under ASGI and with the pool, which hands connections back
+        # at the end of each request.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.environ.get(
+            'DB_CONN_HEALTH_CHECKS', '1'
+        ) == '1',
+        # Connections shared between the threads of a process; 0 disables
+        # the pool.
+        'POOL_SIZE': int(os.environ.get('DB_POOL_SIZE', 0)),
+        'POOL_TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        # Transaction pooling in pgbouncer cannot keep server-side cursors
+        # open between transactions.
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get(
+            'DB_PGBOUNCER', '0'
+        ) == '1',
     }
 }
 
+# Read replica of the default database, used for book and genre reads.
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ.get('DB_REPLICA_HOST'),
+        'NAME': os.environ.get(
+            'DB_REPLICA_NAME', DATABASES['default']['NAME']
+        ),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+# Seconds a client reads from the primary after writing, which should
+# exceed the replication lag.
+REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 5))
+# Seconds an unreachable replica is skipped before being tried again.
+REPLICA_RETRY_SECONDS = int(os.environ.get('DB_REPLICA_RETRY_SECONDS', 30))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Seconds a cached public book list or detail response is kept.
+BOOK_CACHE_TIMEOUT = int(os.environ.get('BOOK_CACHE_TIMEOUT', 300))
+
+# Token authentication keeps up to TOKEN_CACHE_SIZE users in memory for
+# TOKEN_CACHE_TTL seconds. With TOKEN_CACHE_ALIAS naming a cache shared by
+# every server process, such as Redis, entries are checked against it so
+# invalidations reach every process. It defaults to the default cache
+# unless that is process-local; without it a changed or deactivated user
+# may be served from another process for up to TOKEN_CACHE_TTL seconds.
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 60))
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_ALIAS = os.environ.get(
+    'TOKEN_CACHE_ALIAS',
+    '' if CACHES['default']['BACKEND'].endswith('LocMemCache') else 'default',
+) or None
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/4.2/topics/auth/passwords/
+
+# PASSWORD_HASHER picks the hasher for new passwords: argon2, bcrypt
+# (requires the bcrypt package) or pbkdf2. Passwords stored with another
+# hasher or cost are rehashed on the next successful login.
+_PASSWORD_HASHERS = {
+    'argon2': 'core.hashers.Argon2PasswordHasher',
+    'bcrypt': 'core.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2': 'core.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS.pop(os.environ.get('PASSWORD_HASHER', 'argon2')),
+    *_PASSWORD_HASHERS.values(),
+]
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2))
+PASSWORD_ARGON2_MEMORY_COST = int(
+    os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 19456)
+)
+PASSWORD_ARGON2_PARALLELISM = int(
+    os.environ.get('PASSWORD_ARGON2_PARALLELISM', 1)
+)
+PASSWORD_BCRYPT_ROUNDS = int(os.environ.get('PASSWORD_BCRYPT_ROUNDS', 12))
+PASSWORD_PBKDF2_ITERATIONS = int(
+    os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 600000)
+)
+# Threads hashing passwords for the async token endpoint.
+PASSWORD_HASH_WORKERS = int(
+    os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -126,6 +227,11 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files, such as book images, are stored under MEDIA_ROOT and
+# served from MEDIA_URL.
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', BASE_DIR / 'media')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -133,6 +239,90 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
 
+# Hashes passwords with a fast, insecure hasher during tests.
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
+
+# Cursor pagination for list endpoints. Clients may request up to
+# MAX_PAGE_SIZE items with the `page_size` query parameter.
+PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 20))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 100))
+
+# Rows validated and written per transaction by the bulk book import.
+BULK_IMPORT_CHUNK_SIZE = int(os.environ.get('BULK_IMPORT_CHUNK_SIZE', 500))
+
+# Rows fetched from the database cursor per chunk by book exports.
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+
+# Radius of the `near` book filter when `radius_km` is not given, and the
+# largest radius accepted.
+NEAR_DEFAULT_RADIUS_KM = float(os.environ.get('NEAR_DEFAULT_RADIUS_KM', 10))
+NEAR_MAX_RADIUS_KM = float(os.environ.get('NEAR_MAX_RADIUS_KM', 500))
+
+# Request instrumentation logs queries slower than SLOW_QUERY_MS and SQL
+# repeated N_PLUS_ONE_THRESHOLD times within one request.
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 10))
+# /metrics is served to requests sending METRICS_TOKEN as a bearer token
+# and to clients in METRICS_ALLOWED_NETWORKS, comma-separated networks such
+# as 10.0.0.0/8. Behind a proxy every client has the proxy's address, so
+# list only networks that reach the server directly.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_ALLOWED_NETWORKS = [
+    network
+    for network in os.environ.get('METRICS_ALLOWED_NETWORKS', '').split(',')
+    if network
+]
+
+# Background tasks run by core.tasks: ThreadPoolBackend runs them in each
+# server process, DatabaseBackend queues them for `manage.py run_workers`.
+TASK_BACKEND = os.environ.get('TASK_BACKEND', 'core.tasks.ThreadPoolBackend')
+TASK_CONCURRENCY = int(os.environ.get('TASK_CONCURRENCY', 4))
+TASK_MAX_ATTEMPTS = int(os.environ.get('TASK_MAX_ATTEMPTS', 3))
+# Seconds before the first retry; each further retry waits twice as long.
+TASK_RETRY_DELAY = float(os.environ.get('TASK_RETRY_DELAY', 5))
+# Seconds an idle run_workers thread waits before polling the queue again.
+TASK_POLL_INTERVAL = float(os.environ.get('TASK_POLL_INTERVAL', 1))
+
+# Notification emails are sent through EMAIL_BACKEND; locally they are
+# printed to the console or written to EMAIL_FILE_PATH by the file backend.
+EMAIL_BACKEND = os.environ.get(
+    'EMAIL_BACKEND',
+    'django.core.mail.backends.console.EmailBackend',
+)
+EMAIL_FILE_PATH = os.environ.get('EMAIL_FILE_PATH', BASE_DIR / 'sent_emails')
+DEFAULT_FROM_EMAIL = os.environ.get(
+    'DEFAULT_FROM_EMAIL',
+    'Book Giveaway <noreply@localhost>',
+)
+
+# Seconds events are collected before they are sent as one digest per
+# user, the items listed per digest, the emails sent per batch and the
+# events handled per run of the digest task.
+NOTIFICATION_DIGEST_SECONDS = float(
+    os.environ.get('NOTIFICATION_DIGEST_SECONDS', 60)
+)
+NOTIFICATION_DIGEST_MAX_ITEMS = int(
+    os.environ.get('NOTIFICATION_DIGEST_MAX_ITEMS', 20)
+)
+NOTIFICATION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_BATCH_SIZE', 100))
+NOTIFICATION_EVENTS_PER_RUN = int(
+    os.environ.get('NOTIFICATION_EVENTS_PER_RUN', 1000)
+)
+
+# Largest book image upload accepted, in bytes, and the widths of the
+# thumbnails generated from it in IMAGE_PROCESSES worker processes.
+IMAGE_MAX_UPLOAD_SIZE = int(
+    os.environ.get('IMAGE_MAX_UPLOAD_SIZE', 10 * 1024 * 1024)
+)
+IMAGE_THUMBNAIL_WIDTHS = [
+    int(width)
+    for width in os.environ.get(
+        'IMAGE_THUMBNAIL_WIDTHS',
+        '160,320,640',
+    ).split(',')
+]
+IMAGE_PROCESSES = int(os.environ.get('IMAGE_PROCESSES', 2))
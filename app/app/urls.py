@@ -19,11 +19,15 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from core import views as core_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', core_views.metrics, name='metrics'),
     path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
     path(
         'api/docs/',
@@ -33,3 +37,12 @@ urlpatterns = [
     path('api/user/', include('user.urls')),
     path('api/book/', include('book.urls')),
 ]
+
+# Uploads are served by Django only in development. In production serve
+# MEDIA_ROOT from the web server or object storage.
+if settings.DEBUG:
+    urlpatterns.append(re_path(
+        r'^{}(?P<path>.+)$'.format(settings.MEDIA_URL.lstrip('/')),
+        core_views.media,
+        name='media',
+    ))
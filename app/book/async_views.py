@@ -0,0 +1,165 @@
+"""
+Async read-only views for the book APIs, for serving under ASGI.
+
+These mirror the book list, detail and my-books responses of the DRF
+views using Django's async ORM. Writes stay on the sync DRF views.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotAllowed, JsonResponse
+from rest_framework.exceptions import APIException, NotAuthenticated
+from rest_framework.pagination import Cursor
+from rest_framework.request import Request
+
+from core.authentication import CachedTokenAuthentication
+from core.models import Book
+from book.fieldsets import IMAGE_COLUMNS, select_fields
+from book.filters import filter_books
+from book.pagination import IdCursorPagination
+from book.serializers import (
+    BookCompactSerializer,
+    BookListSerializer,
+    BookSerializer,
+)
+
+
+SAFE_METHODS = ['GET', 'HEAD']
+
+
+def _columns(fields):
+    """Return the book columns to load for the requested fields."""
+    columns = ['id', *(name for name in fields if name != 'genres')]
+    if 'image' in fields:
+        columns += IMAGE_COLUMNS
+    return columns
+
+
+async def _attach_genres(books):
+    """Add a list of genres to each book dict with a single query."""
+    genres = {book['id']: [] for book in books}
+    links = Book.genres.through.objects.filter(
+        book_id__in=genres,
+    ).values('book_id', 'genre_id', 'genre__name').order_by('genre_id')
+    async for link in links.aiterator():
+        genres[link['book_id']].append(
+            {'id': link['genre_id'], 'name': link['genre__name']},
+        )
+    for book in books:
+        book['genres'] = genres[book['id']]
+
+
+async def _paginate(request, queryset, serializer_class=BookSerializer):
+    """Return a cursor page of books, compatible with IdCursorPagination."""
+    paginator = IdCursorPagination()
+    drf_request = Request(request)
+    fields = select_fields(request.GET, serializer_class.Meta.fields)
+    page_size = paginator.get_page_size(drf_request)
+    paginator.base_url = request.build_absolute_uri()
+    cursor = paginator.decode_cursor(drf_request)
+    reverse = bool(cursor and cursor.reverse)
+
+    queryset = queryset.order_by('id' if reverse else '-id')
+    if cursor and cursor.position is not None:
+        lookup = 'id__gt' if reverse else 'id__lt'
+        queryset = queryset.filter(**{lookup: cursor.position})
+
+    books = [
+        book async for book in
+        queryset.values(*_columns(fields))[:page_size + 1].aiterator()
+    ]
+    has_more = len(books) > page_size
+    books = books[:page_size]
+    if reverse:
+        books.reverse()
+    if 'genres' in fields:
+        await _attach_genres(books)
+
+    has_next = True if reverse else has_more
+    has_previous = has_more if reverse else cursor is not None
+    return {
+        'next': paginator.encode_cursor(
+            Cursor(offset=0, reverse=False, position=books[-1]['id']),
+        ) if books and has_next else None,
+        'previous': paginator.encode_cursor(
+            Cursor(offset=0, reverse=True, position=books[0]['id']),
+        ) if books and has_previous else None,
+        'results': serializer_class(
+            books,
+            many=True,
+            context={'request': drf_request},
+        ).data,
+    }
+
+
+async def _authenticate(request):
+    """Return the token authenticated user or raise NotAuthenticated."""
+    authentication = CachedTokenAuthentication()
+    result = await sync_to_async(authentication.authenticate)(request)
+    if result is None:
+        raise NotAuthenticated()
+    return result[0]
+
+
+def _error(exc):
+    """Return a JSON error response shaped like DRF's."""
+    data = exc.detail
+    if not isinstance(data, (dict, list)):
+        data = {'detail': data}
+    response = JsonResponse(data, status=exc.status_code, safe=False)
+    if exc.status_code == 401:
+        response['WWW-Authenticate'] = 'Token'
+    return response
+
+
+async def book_list(request):
+    """List available books."""
+    if request.method not in SAFE_METHODS:
+        return HttpResponseNotAllowed(SAFE_METHODS)
+
+    serializer_class = BookListSerializer
+    if request.GET.get('compact') in ('true', '1'):
+        serializer_class = BookCompactSerializer
+    try:
+        queryset = await sync_to_async(filter_books)(
+            Book.objects.filter(available=True),
+            request.GET,
+        )
+        return JsonResponse(
+            await _paginate(request, queryset, serializer_class),
+        )
+    except APIException as exc:
+        return _error(exc)
+
+
+async def book_detail(request, pk):
+    """Retrieve an available book."""
+    if request.method not in SAFE_METHODS:
+        return HttpResponseNotAllowed(SAFE_METHODS)
+
+    try:
+        fields = select_fields(request.GET, BookSerializer.Meta.fields)
+    except APIException as exc:
+        return _error(exc)
+    book = await Book.objects.filter(
+        available=True,
+        pk=pk,
+    ).values(*_columns(fields)).afirst()
+    if book is None:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    if 'genres' in fields:
+        await _attach_genres([book])
+
+    serializer = BookSerializer(book, context={'request': Request(request)})
+    return JsonResponse(serializer.data)
+
+
+async def my_books(request):
+    """List books owned by the token authenticated user."""
+    if request.method not in SAFE_METHODS:
+        return HttpResponseNotAllowed(SAFE_METHODS)
+
+    try:
+        user = await _authenticate(request)
+        queryset = Book.objects.filter(user=user)
+        return JsonResponse(await _paginate(request, queryset))
+    except APIException as exc:
+        return _error(exc)
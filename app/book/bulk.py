@@ -0,0 +1,111 @@
+"""
+Streaming bulk import of books.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from core.models import Book, Genre
+from book import caching
+from book.serializers import BookSerializer
+
+
+CSV_GENRE_SEPARATOR = ';'
+
+
+def read_csv_rows(lines):
+    """Yield book data from CSV lines with a header row.
+
+    Empty cells are treated as missing and genres are separated by `;`.
+    """
+    for row in csv.DictReader(line.decode('utf-8') for line in lines):
+        genres = row.pop('genres', None) or ''
+        data = {key: value for key, value in row.items() if value}
+        data['genres'] = [
+            {'name': name.strip()}
+            for name in genres.split(CSV_GENRE_SEPARATOR)
+            if name.strip()
+        ]
+        yield data
+
+
+def read_ndjson_rows(lines):
+    """Yield book data from newline-delimited JSON, one object per line."""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield line.decode('utf-8', errors='replace').strip()
+
+
+ROW_READERS = {
+    'text/csv': read_csv_rows,
+    'application/x-ndjson': read_ndjson_rows,
+}
+
+
+def import_books(rows, user, chunk_size=None):
+    """Validate and create books from rows, one transaction per chunk.
+
+    Returns the number of books created and the errors of rejected rows,
+    numbered from 1.
+    """
+    chunk_size = chunk_size or settings.BULK_IMPORT_CHUNK_SIZE
+    result = {'created': 0, 'errors': []}
+    numbered_rows = enumerate(rows, start=1)
+    # One serializer validates every row so its fields are built only once.
+    serializer = BookSerializer()
+
+    while chunk := list(islice(numbered_rows, chunk_size)):
+        valid = []
+        for number, data in chunk:
+            try:
+                valid.append(serializer.run_validation(data))
+            except ValidationError as error:
+                result['errors'].append(
+                    {'row': number, 'errors': error.detail},
+                )
+        if valid:
+            _create_books(valid, user)
+            result['created'] += len(valid)
+
+    return result
+
+
+def _create_books(books_data, user):
+    """Insert books with their genres using a fixed number of queries."""
+    with transaction.atomic():
+        books = Book.objects.bulk_create([
+            Book(user=user, **{
+                field: value
+                for field, value in data.items()
+                if field != 'genres'
+            })
+            for data in books_data
+        ])
+        genres = Genre.objects.get_or_create_by_name(
+            genre['name']
+            for data in books_data
+            for genre in data['genres']
+        )
+        Book.genres.through.objects.bulk_create(
+            [
+                Book.genres.through(
+                    book=book,
+                    genre=genres[genre['name']],
+                )
+                for book, data in zip(books, books_data)
+                for genre in data['genres']
+            ],
+            ignore_conflicts=True,
+        )
+        Book.objects.filter(
+            pk__in=[book.pk for book in books],
+        ).refresh_derived_fields()
+        caching.invalidate()
@@ -0,0 +1,183 @@
+"""
+Response caching for the public book APIs.
+
+Cached responses are keyed on a version number which is bumped whenever
+books, genres or interests change, so stale entries are never read again
+and simply expire. Conditional requests for a book or a user's books are
+answered from the books' last update, without rendering them.
+
+For REPLICA_PIN_SECONDS after a bump, cache misses are filled from the
+primary, since replicas may not have the change yet and whatever is
+cached is served to every client until it expires.
+"""
+import contextlib
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.routers import read_from
+
+
+VERSION_KEY = 'book-responses:version'
+BUMPED_KEY = 'book-responses:bumped'
+
+
+def _new_version():
+    """Return a version that is newer than any previously issued one."""
+    return time.time_ns()
+
+
+def get_version():
+    """Return the current version of cached book responses."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, _new_version(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """Make every cached book response stale."""
+    if settings.REPLICA_DATABASES:
+        cache.set(BUMPED_KEY, True, settings.REPLICA_PIN_SECONDS)
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, _new_version(), timeout=None)
+
+
+def fill_from():
+    """Return a context manager routing the reads filling the cache.
+
+    They use the primary while replicas may lag behind the last bump.
+    """
+    if settings.REPLICA_DATABASES and cache.get(BUMPED_KEY):
+        return read_from(None)
+    return contextlib.nullcontext()
+
+
+def invalidate():
+    """Invalidate cached responses now and once the transaction commits.
+
+    The second bump drops responses cached by readers who saw the old data
+    before the transaction committed.
+    """
+    bump_version()
+    transaction.on_commit(bump_version)
+
+
+def get_cache_key(request, version):
+    """Return the cache key for request, ignoring query parameter order."""
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+        if value
+    )
+    url = f'{request.build_absolute_uri(request.path)}?{urlencode(params)}'
+    digest = hashlib.md5(url.encode()).hexdigest()
+    return f'book-responses:{version}:{digest}'
+
+
+def cache_response(view_method):
+    """Serve a view method from the cache, answering If-None-Match."""
+    @wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        key = get_cache_key(request, get_version())
+        etag = '"{}"'.format(hashlib.md5(key.encode()).hexdigest())
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED,
+                headers={'ETag': etag},
+            )
+
+        data = cache.get(key)
+        if data is None:
+            with fill_from():
+                response = view_method(view, request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cache.set(key, response.data, settings.BOOK_CACHE_TIMEOUT)
+        else:
+            response = Response(data)
+
+        response['ETag'] = etag
+        return response
+
+    return wrapper
+
+
+def conditional_response(get_queryset):
+    """Answer conditional GETs of a view method from the state of its books.
+
+    get_queryset(view) returns the books the response shows. Their latest
+    `updated_at` and their count are read with one aggregate query, cached
+    like responses until books change, and requests whose If-None-Match
+    or If-Modified-Since still match are answered with a 304 before the
+    view method runs. Other successful responses get the ETag and
+    Last-Modified of that state, replacing the ETag of cache_response.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(view, request, *args, **kwargs):
+            key = '{}:state:{}'.format(
+                get_cache_key(request, get_version()),
+                request.user.pk,
+            )
+            state = cache.get(key)
+            if state is None:
+                try:
+                    with fill_from():
+                        state = get_queryset(view).aggregate(
+                            updated_at=Max('updated_at'),
+                            # COUNT(*) lets an index on the filter and
+                            # updated_at answer without reading the rows.
+                            count=Count('*'),
+                        )
+                except (TypeError, ValueError, ValidationError):
+                    # Malformed lookups are rejected by the view method.
+                    return view_method(view, request, *args, **kwargs)
+                cache.set(key, state, settings.BOOK_CACHE_TIMEOUT)
+
+            last_modified = None
+            if state['updated_at'] is not None:
+                last_modified = int(state['updated_at'].timestamp())
+            # Responses differ by URL, format and, for a user's books, user.
+            tag = '|'.join(str(part) for part in [
+                request.build_absolute_uri(),
+                request.accepted_renderer.format,
+                request.user.pk,
+                state['updated_at'],
+                state['count'],
+            ])
+            etag = '"{}"'.format(hashlib.md5(tag.encode()).hexdigest())
+
+            response = get_conditional_response(
+                request,
+                etag=etag,
+                last_modified=last_modified,
+            )
+            if response is None:
+                response = view_method(view, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            return response
+
+        return wrapper
+
+    return decorator
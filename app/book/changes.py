@@ -0,0 +1,79 @@
+"""
+Feed of changes to the book catalogue.
+
+Database triggers log every book inserted, deleted, or updated with a new
+`updated_at` to BookChange, with the id of the writing transaction. The
+feed pages through the log in (transaction id, entry id) order and its
+sync tokens are positions in that order.
+
+Transactions commit out of id order, so the feed only reads entries of
+transactions older than every one still running: an entry committed late
+is never ordered before a token already handed out.
+"""
+from django.db import router
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import ValidationError
+
+from core.models import Book, BookChange
+
+
+# The position before the first entry.
+START_TOKEN = '0.0'
+
+# Entries of finished transactions, and of the current one so that a
+# client sees its own writes.
+SETTLED_SQL = """(
+    transaction_id < txid_snapshot_xmin(txid_current_snapshot())
+    OR transaction_id = txid_current_if_assigned()
+)"""
+
+
+def format_token(change):
+    """Return the sync token of the position after change."""
+    return f'{change.transaction_id}.{change.pk}'
+
+
+def parse_token(token):
+    """Return the (transaction id, entry id) position of a sync token."""
+    try:
+        transaction_id, change_id = (int(part) for part in token.split('.'))
+    except ValueError:
+        raise ValidationError({'since': 'Invalid sync token.'})
+    return transaction_id, change_id
+
+
+def changes_since(token, limit):
+    """Return up to limit settled log entries after the sync token."""
+    transaction_id, change_id = parse_token(token)
+    return list(
+        BookChange.objects.filter(
+            RawSQL(SETTLED_SQL, [], output_field=BooleanField()),
+            # The first condition alone can use the index.
+            Q(transaction_id__gt=transaction_id) | Q(pk__gt=change_id),
+            transaction_id__gte=transaction_id,
+        ).order_by('transaction_id', 'pk')[:limit]
+    )
+
+
+def changed_books(changes):
+    """Split the books of changes into those listed and ids of the removed.
+
+    Returns the changed books in the catalogue, by id, and the sorted ids
+    of those deleted or made unavailable. Books are read from the
+    database holding the log, so they are at least as new as it.
+    """
+    book_ids = {change.book_id for change in changes}
+    if not book_ids:
+        return [], []
+    books = list(
+        Book.objects.using(
+            router.db_for_read(BookChange),
+        ).filter(
+            pk__in=book_ids,
+            available=True,
+        ).defer('search_vector').select_related(
+            'uploaded_image',
+        ).prefetch_related('genres').order_by('pk')
+    )
+    return books, sorted(book_ids - {book.pk for book in books})
@@ -0,0 +1,75 @@
+"""
+Sparse fieldsets for book responses.
+
+Clients pick the fields of each book with `?fields=id,title` or drop
+some with `?omit=description`. Views load only the matching columns and
+skip the genre prefetch when genres are not requested.
+"""
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+# Columns of the uploaded image that the `image` field is rendered from.
+IMAGE_COLUMNS = ['uploaded_image__file', 'uploaded_image__thumbnail_widths']
+
+
+def _names(params, param):
+    """Return the comma separated names in param, or None if absent."""
+    value = params.get(param)
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def select_fields(params, available):
+    """Return the names in available selected by the fields and omit params.
+
+    Raises ValidationError when a param names a field that is not
+    available.
+    """
+    selected = list(available)
+    for param in (FIELDS_PARAM, OMIT_PARAM):
+        names = _names(params, param)
+        if names is None:
+            continue
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise ValidationError(
+                {param: f'Unknown fields: {", ".join(unknown)}.'},
+            )
+        if param == FIELDS_PARAM:
+            selected = [name for name in selected if name in names]
+        else:
+            selected = [name for name in selected if name not in names]
+    return selected
+
+
+def only_requested(queryset, params, serializer_class):
+    """Load only the columns of the requested fields of serializer_class.
+
+    Genres are prefetched only when requested, uploaded images are joined
+    when the image is, and ids are always loaded for cursor pagination.
+    """
+    fields = select_fields(params, serializer_class.Meta.fields)
+    columns = ['id', *(name for name in fields if name != 'genres')]
+    if 'genres' in fields:
+        queryset = queryset.prefetch_related('genres')
+    if 'image' in fields:
+        queryset = queryset.select_related('uploaded_image')
+        columns += ['uploaded_image', *IMAGE_COLUMNS]
+    return queryset.only(*columns)
+
+
+class SparseFieldsetMixin:
+    """Serializer mixin rendering only the fields requested by GET requests."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return fields
+        params = getattr(request, 'query_params', request.GET)
+        selected = select_fields(params, list(fields))
+        return {name: fields[name] for name in selected}
@@ -0,0 +1,64 @@
+"""
+Query parameter filters for book lists.
+"""
+from django.conf import settings
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+from core.models import Genre
+
+
+def parse_near(params):
+    """Return the point and radius of the near and radius_km params.
+
+    Raises ValidationError for malformed or out of range values.
+    """
+    try:
+        latitude, longitude = map(float, params['near'].split(','))
+    except ValueError:
+        raise ValidationError({'near': 'Expected latitude,longitude.'})
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValidationError({'near': 'Coordinates out of range.'})
+
+    try:
+        radius_km = float(
+            params.get('radius_km', settings.NEAR_DEFAULT_RADIUS_KM),
+        )
+    except ValueError:
+        raise ValidationError({'radius_km': 'Expected a number.'})
+    if not 0 < radius_km <= settings.NEAR_MAX_RADIUS_KM:
+        raise ValidationError({
+            'radius_km': f'Expected a number between 0 and '
+                         f'{settings.NEAR_MAX_RADIUS_KM}.',
+        })
+    return latitude, longitude, radius_km
+
+
+def filter_books(queryset, params):
+    """Apply the author, genre, condition, location and near filters.
+
+    The genre filter matches books with a genre containing the value,
+    ignoring case.
+    """
+    author = params.get('author')
+    genre = params.get('genre')
+    condition = params.get('condition')
+    location = params.get('location')
+
+    if author:
+        queryset = queryset.filter(Q(author=author))
+    if genre:
+        # One GIN indexed overlap with the matching genres' names, found in
+        # the same query, instead of a join that may duplicate rows.
+        queryset = queryset.filter(genre_names__overlap=ArraySubquery(
+            Genre.objects.filter(name__icontains=genre).values('name'),
+        ))
+    if condition:
+        queryset = queryset.filter(Q(condition=condition))
+    if location:
+        queryset = queryset.filter(Q(location=location))
+    if params.get('near'):
+        queryset = queryset.near(*parse_near(params))
+
+    return queryset
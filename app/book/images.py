@@ -0,0 +1,205 @@
+"""
+Uploaded book images.
+
+Uploads are streamed to a temporary file and hashed on the way, so an
+image is never held in memory whole, and stored once per distinct
+content under a path derived from its SHA-256. Thumbnails are generated
+by a background task in a pool of worker processes, and each response
+links the smallest thumbnail at least as wide as it needs.
+"""
+import hashlib
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import (
+    StopUpload,
+    TemporaryFileUploadHandler,
+)
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from PIL import ExifTags, Image
+from rest_framework.exceptions import ValidationError
+
+from core.models import Book, StoredImage
+from core.tasks import task
+from book import caching, thumbnails
+
+
+# Extensions of the stored files by accepted image format.
+FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """Stream uploaded files to temporary files, hashing them on the way.
+
+    Uploads larger than IMAGE_MAX_UPLOAD_SIZE are stopped and flagged
+    with `too_large`.
+    """
+    too_large = False
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.IMAGE_MAX_UPLOAD_SIZE:
+            self.too_large = True
+            raise StopUpload(connection_reset=True)
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.sha256.hexdigest()
+        return file
+
+
+def _inspect(upload):
+    """Return the format and upright size of the image in upload.
+
+    Raises ValidationError unless upload is an image in a supported
+    format. Only the image's headers are read.
+    """
+    try:
+        with Image.open(upload) as image:
+            image_format = image.format
+            width, height = image.size
+            image.verify()
+    except Exception:
+        # Pillow raises many exception types for corrupt images.
+        image_format = None
+    if image_format not in FORMATS:
+        raise ValidationError(
+            {'image': 'Upload a valid JPEG, PNG, GIF or WebP image.'},
+        )
+
+    orientation = None
+    upload.seek(0)
+    if image_format in ('JPEG', 'WEBP'):
+        # Their EXIF is in the headers; other formats would be decoded.
+        with Image.open(upload) as image:
+            orientation = image.getexif().get(ExifTags.Base.Orientation)
+        upload.seek(0)
+    if orientation in thumbnails.TRANSPOSED:
+        return image_format, (height, width)
+    return image_format, (width, height)
+
+
+def store(upload):
+    """Return the stored image with the content of upload, storing it if new.
+
+    upload must have been received by HashingUploadHandler. Thumbnails
+    of new images are generated once the transaction commits.
+    """
+    image = StoredImage.objects.filter(sha256=upload.sha256).first()
+    if image is not None:
+        return image
+
+    image_format, (width, height) = _inspect(upload)
+    image = StoredImage(sha256=upload.sha256, width=width, height=height)
+    name = image.file.field.generate_filename(
+        image,
+        f'upload.{FORMATS[image_format]}',
+    )
+    if default_storage.exists(name):
+        # Names are derived from the content, so the file left by an upload
+        # whose transaction rolled back is the same image.
+        image.file.name = name
+    else:
+        image.file.save(name, upload, save=False)
+    try:
+        with transaction.atomic():
+            image.save()
+    except IntegrityError:
+        # The same image was uploaded concurrently; keep the first copy.
+        first = StoredImage.objects.get(sha256=upload.sha256)
+        if image.file.name != first.file.name:
+            image.file.delete(save=False)
+        return first
+
+    generate_thumbnails.enqueue(image.pk)
+    return image
+
+
+def thumbnail_name(name, width):
+    """Return the storage name of the thumbnail of name at width."""
+    stem, extension = name.rsplit('.', 1)
+    return f'{stem}-{width}.{extension}'
+
+
+def image_url(name, thumbnail_widths, width=None):
+    """Return the URL of the stored image name for showing at width.
+
+    That is the smallest of its thumbnail_widths at least width wide, or
+    the image itself when there is none or width is None.
+    """
+    if width is not None:
+        for thumbnail_width in thumbnail_widths:
+            if thumbnail_width >= width:
+                return default_storage.url(
+                    thumbnail_name(name, thumbnail_width),
+                )
+    return default_storage.url(name)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process pool that resizes images."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_PROCESSES,
+                # Forked children of a threaded server could inherit locks
+                # held by other threads, so workers are started afresh.
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+@task
+def generate_thumbnails(image_id):
+    """Generate the missing thumbnails of a stored image.
+
+    Each width is resized in the process pool, in parallel and outside
+    the GIL. Only widths narrower than the image are generated; wider
+    ones are served the image itself.
+    """
+    image = StoredImage.objects.filter(pk=image_id).first()
+    if image is None:
+        return
+    widths = [
+        width for width in sorted(settings.IMAGE_THUMBNAIL_WIDTHS)
+        if width < image.width and width not in image.thumbnail_widths
+    ]
+    if not widths:
+        return
+
+    with image.file.open('rb') as file:
+        data = file.read()
+    resized = get_executor().map(
+        thumbnails.resize,
+        [data] * len(widths),
+        widths,
+    )
+    for width, content in zip(widths, resized):
+        name = thumbnail_name(image.file.name, width)
+        # Drop what a failed earlier attempt left, so the name is kept.
+        default_storage.delete(name)
+        default_storage.save(name, ContentFile(content))
+
+    StoredImage.objects.filter(pk=image.pk).update(
+        thumbnail_widths=sorted({*image.thumbnail_widths, *widths}),
+    )
+    # The books' image URLs change to the new thumbnails.
+    Book.objects.filter(uploaded_image=image).update(
+        updated_at=timezone.now(),
+    )
+    caching.invalidate()
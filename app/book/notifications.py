@@ -0,0 +1,179 @@
+"""
+Digest notifications about book interests.
+
+Views record an OutboxEvent in the transaction changing an interest. A
+background task later expands the pending events to their recipients in
+one streamed query ordered by user, coalesces each user's items into one
+digest email and sends the digests in batches through EMAIL_BACKEND.
+
+Delivery is at least once: events are deleted only after all of their
+digests are sent, so a run failing midway is retried in full and users
+whose digests went out before the failure get them again.
+"""
+from itertools import groupby
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import CharField, F, Value
+
+from core.models import BookInterest, OutboxEvent
+from core.tasks import on_startup, task
+
+
+SCHEDULED_KEY = 'notifications:digest-scheduled'
+
+INTEREST_ADDED = 'interest_added'
+CHOSEN = 'chosen'
+GIVEN_AWAY = 'given_away'
+MESSAGES = {
+    INTEREST_ADDED: '{actor} is interested in your book "{title}".',
+    CHOSEN: 'You were chosen to receive "{title}".',
+    GIVEN_AWAY: '"{title}" was given to another reader.',
+}
+
+
+def record(kind, interest):
+    """Record an event about interest and schedule the next digest.
+
+    The digest task runs NOTIFICATION_DIGEST_SECONDS later, so events
+    recorded meanwhile are sent in the same digests. It is scheduled at
+    most once per half window, leaving the other half for the
+    transactions of the events it covers to commit.
+    """
+    OutboxEvent.objects.create(kind=kind, interest=interest)
+    # Scheduled on commit, so a rolled back event blocks no later digest.
+    transaction.on_commit(schedule_digests)
+
+
+def schedule_digests():
+    """Schedule the next digest unless one is already scheduled."""
+    delay = settings.NOTIFICATION_DIGEST_SECONDS
+    if cache.add(SCHEDULED_KEY, True, delay / 2):
+        send_digests.enqueue_in(delay)
+
+
+@on_startup
+def send_pending_digests():
+    """Send digests for events whose scheduled digest may have been lost.
+
+    The ThreadPoolBackend loses its scheduled tasks when its process
+    exits.
+    """
+    if OutboxEvent.objects.exists():
+        send_digests.enqueue()
+
+
+def _item(value):
+    return Value(value, output_field=CharField())
+
+
+def digest_items(event_ids):
+    """Return the items of the digests for events, ordered by recipient.
+
+    Owners hear of added interests, chosen readers of their book, and the
+    other interested readers that the book was given away.
+    """
+    # The querysets' columns are combined by position, so every one of
+    # them lists the same names in the same order.
+    events = OutboxEvent.objects.filter(pk__in=event_ids)
+    interests_added = events.filter(
+        kind=OutboxEvent.INTEREST_ADDED,
+    ).values(
+        recipient_id=F('interest__book__user_id'),
+        email=F('interest__book__user__email'),
+        item=_item(INTEREST_ADDED),
+        title=F('interest__book__title'),
+        actor=F('interest__interested_user__name'),
+        event_id=F('pk'),
+    )
+    chosen = events.filter(
+        kind=OutboxEvent.RECIPIENT_CHOSEN,
+    ).values(
+        recipient_id=F('interest__interested_user_id'),
+        email=F('interest__interested_user__email'),
+        item=_item(CHOSEN),
+        title=F('interest__book__title'),
+        actor=_item(''),
+        event_id=F('pk'),
+    )
+    # The chosen interest is marked in the transaction recording the event,
+    # so the book's other interests are the ones not chosen.
+    given_away = BookInterest.objects.filter(
+        book__bookinterest__outboxevent__in=event_ids,
+        book__bookinterest__outboxevent__kind=OutboxEvent.RECIPIENT_CHOSEN,
+        chosen_by_owner=False,
+    ).values(
+        recipient_id=F('interested_user_id'),
+        email=F('interested_user__email'),
+        item=_item(GIVEN_AWAY),
+        title=F('book__title'),
+        actor=_item(''),
+        event_id=F('book__bookinterest__outboxevent__pk'),
+    )
+    return interests_added.union(chosen, given_away, all=True).order_by(
+        'recipient_id',
+        'event_id',
+    )
+
+
+def render_digest(email, items):
+    """Return the digest email listing items, up to the configured limit."""
+    lines = []
+    count = 0
+    for item in items:
+        count += 1
+        if count <= settings.NOTIFICATION_DIGEST_MAX_ITEMS:
+            lines.append('- ' + MESSAGES[item['item']].format(**item))
+    if count > len(lines):
+        lines.append(f'- and {count - len(lines)} more.')
+    return EmailMessage(
+        subject='Updates about your book giveaways',
+        body='\n'.join(lines) + '\n',
+        to=[email],
+    )
+
+
+@task
+def send_digests():
+    """Send digests for the pending events, returning the number sent.
+
+    Events are claimed with SKIP LOCKED, so concurrent runs split them,
+    and deleted with the digests sent. Items are streamed from the
+    database and only one batch of emails is held at a time, however many
+    readers a book has.
+    """
+    with transaction.atomic():
+        event_ids = list(
+            OutboxEvent.objects.select_for_update(
+                skip_locked=True,
+            ).order_by('pk').values_list(
+                'pk',
+                flat=True,
+            )[:settings.NOTIFICATION_EVENTS_PER_RUN]
+        )
+        if not event_ids:
+            return 0
+
+        items = digest_items(event_ids).iterator(
+            chunk_size=settings.NOTIFICATION_BATCH_SIZE,
+        )
+        sent = 0
+        batch = []
+        with get_connection() as connection:
+            for (_, email), user_items in groupby(
+                items,
+                key=lambda item: (item['recipient_id'], item['email']),
+            ):
+                batch.append(render_digest(email, user_items))
+                if len(batch) == settings.NOTIFICATION_BATCH_SIZE:
+                    sent += connection.send_messages(batch)
+                    batch = []
+            if batch:
+                sent += connection.send_messages(batch)
+        OutboxEvent.objects.filter(pk__in=event_ids).delete()
+
+    if len(event_ids) == settings.NOTIFICATION_EVENTS_PER_RUN:
+        send_digests.enqueue()
+    return sent
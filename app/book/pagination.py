@@ -0,0 +1,20 @@
+"""
+Pagination classes for the book APIs.
+"""
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset pagination, newest-first or by relevance for searches."""
+    ordering = '-id'
+    search_ordering = ('-rank', '-id')
+    page_size = settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        """Order searches by rank, breaking ties by id."""
+        if 'rank' in queryset.query.annotations:
+            return self.search_ordering
+        return (self.ordering,)
@@ -8,6 +8,9 @@ from core.models import (
     Genre,
     BookInterest,
 )
+from core.serializers import TimedListSerializer, TimedSerializerMixin
+from book.fieldsets import SparseFieldsetMixin
+from book.images import image_url
 
 
 class GenreSerializer(serializers.ModelSerializer):
@@ -19,46 +22,169 @@ class GenreSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class BookSerializer(serializers.ModelSerializer):
+class BookImageField(serializers.CharField):
+    """Image URL of a book, sized to `width` for uploaded images.
+
+    Books with an uploaded image link its smallest thumbnail at least
+    width wide, falling back to the image itself, while other books keep
+    their image URL. Writing a URL replaces the uploaded image.
+    """
+
+    def __init__(self, width=None, **kwargs):
+        self.width = width
+        kwargs.update(
+            source='*',
+            max_length=255,
+            allow_null=True,
+            required=False,
+        )
+        super().__init__(**kwargs)
+
+    def run_validation(self, data=serializers.empty):
+        value = super().run_validation(data)
+        return {'image': value, 'uploaded_image': None}
+
+    def to_representation(self, book):
+        if isinstance(book, dict):
+            # Rows loaded with values(), as by the async views.
+            name = book.get('uploaded_image__file')
+            widths = book.get('uploaded_image__thumbnail_widths')
+            url = book['image']
+        elif book.uploaded_image_id:
+            name = book.uploaded_image.file.name
+            widths = book.uploaded_image.thumbnail_widths
+        else:
+            name = None
+            url = book.image
+        if not name:
+            return url
+
+        url = image_url(name, widths, self.width)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class BookSerializer(
+    TimedSerializerMixin,
+    SparseFieldsetMixin,
+    serializers.ModelSerializer,
+):
     """Serializer for books."""
 
     genres = GenreSerializer(many=True)
+    image = BookImageField(width=640)
 
     class Meta:
         model = Book
+        list_serializer_class = TimedListSerializer
         fields = [
             'id', 'title', 'author', 'description',
-            'available', 'location', 'condition', 'image',
-            'genres',
+            'available', 'location', 'latitude', 'longitude', 'condition',
+            'image', 'genres', 'genre_names',
         ]
-        read_only_fields = ['id']
+        read_only_fields = ['id', 'latitude', 'longitude', 'genre_names']
+
+    def _get_or_create_genres(self, genres):
+        """Handle getting or creating genres in bulk."""
+        names = [genre['name'] for genre in genres]
+        return Genre.objects.get_or_create_many(names)
 
     def create(self, validated_data):
-        genres_data = validated_data.pop('genres')
+        """Create a book."""
+        genres = validated_data.pop('genres', [])
         book = Book.objects.create(**validated_data)
+        book.genres.add(*self._get_or_create_genres(genres))
+
+        return book
 
-        # Create genres or get existing ones based on genre names
-        for genre_data in genres_data:
-            genre_name = genre_data['name']
-            genre, created = Genre.objects.get_or_create(name=genre_name)
-            book.genres.add(genre)  # Add the genre to the book
+    def update(self, instance, validated_data):
+        """Update a book."""
+        genres = validated_data.pop('genres', None)
+        book = super().update(instance, validated_data)
+        if genres is not None:
+            book.genres.set(self._get_or_create_genres(genres))
 
         return book
 
 
-class OwnerBookInterestSerializer(serializers.ModelSerializer):
+class BookListSerializer(BookSerializer):
+    """Serializer for book lists, reading genres from the book row."""
+
+    image = BookImageField(width=320)
+
+    class Meta(BookSerializer.Meta):
+        fields = [
+            field for field in BookSerializer.Meta.fields if field != 'genres'
+        ]
+
+
+class BookCompactSerializer(BookListSerializer):
+    """Serializer for book cards, with just enough to show and locate them."""
+
+    image = BookImageField(width=160)
+
+    class Meta(BookListSerializer.Meta):
+        fields = ['id', 'title', 'author', 'image', 'location']
+
+
+class BookImageUploadSerializer(serializers.Serializer):
+    """Serializer for uploading an image of a book."""
+
+    image = serializers.FileField()
+
+
+class BookInboxSerializer(
+    TimedSerializerMixin,
+    serializers.ModelSerializer,
+):
+    """Serializer for the owner's books with their interests."""
+
+    recent_interested_users = serializers.ListField(read_only=True)
+
+    class Meta:
+        model = Book
+        list_serializer_class = TimedListSerializer
+        fields = [
+            'id', 'title', 'available',
+            'interest_count', 'recent_interested_users',
+        ]
+        read_only_fields = fields
+
+
+class OwnerBookInterestSerializer(
+    TimedSerializerMixin,
+    serializers.ModelSerializer,
+):
     """Serializer for book interests (for book owners)."""
 
+    book_title = serializers.CharField(source='book.title', read_only=True)
+    interested_user_name = serializers.CharField(
+        source='interested_user.name',
+        read_only=True,
+    )
+
     class Meta:
         model = BookInterest
-        fields = ['id', 'book', 'interested_user', 'chosen_by_owner']
-        read_only_fields = ['id', 'interested_user', 'book']
+        list_serializer_class = TimedListSerializer
+        fields = [
+            'id', 'book', 'book_title',
+            'interested_user', 'interested_user_name',
+            'chosen_by_owner', 'rejected_by_owner',
+        ]
+        read_only_fields = [
+            'id', 'interested_user', 'book',
+            'chosen_by_owner', 'rejected_by_owner',
+        ]
 
 
-class UserBookInterestSerializer(serializers.ModelSerializer):
+class UserBookInterestSerializer(
+    TimedSerializerMixin,
+    serializers.ModelSerializer,
+):
     """Serializer for book interests (for interested users)."""
 
     class Meta:
         model = BookInterest
+        list_serializer_class = TimedListSerializer
         fields = ['id', 'book',]
         read_only_fields = ['id']
@@ -0,0 +1,17 @@
+"""
+Signal handlers invalidating cached book responses.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Book, BookInterest, Genre
+from book import caching
+
+
+@receiver([post_save, post_delete], sender=Book)
+@receiver([post_save, post_delete], sender=Genre)
+@receiver([post_save, post_delete], sender=BookInterest)
+@receiver(m2m_changed, sender=Book.genres.through)
+def invalidate_cached_responses(sender, **kwargs):
+    """Invalidate cached book responses after any book data changes."""
+    caching.invalidate()
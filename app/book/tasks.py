@@ -0,0 +1,8 @@
+"""
+Background tasks for books.
+
+Tasks defined next to the code they belong to are imported here, so
+workers register them.
+"""
+from book.images import generate_thumbnails  # noqa: F401
+from book.notifications import send_digests  # noqa: F401
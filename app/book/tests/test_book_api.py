@@ -1,19 +1,36 @@
 """
 Tests for Book APIs.
 """
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Book
+from core.models import Book, BookInterest, Genre
 
-from book.serializers import BookSerializer
+from book.serializers import BookListSerializer
 
 
 BOOKS_URL = reverse('book:book-list')
+MY_BOOKS_URL = reverse('book:my-books')
+BOOK_INTERESTS_URL = reverse('book:book-interest-list-create')
+BULK_IMPORT_URL = reverse('book:book-bulk-import')
+INBOX_URL = reverse('book:my-books-inbox')
+
+
+def detail_url(book_id):
+    """Create and return a book detail URL."""
+    return reverse('book:book-detail', args=[book_id])
+
+
+def choose_recipient_url(interest_id):
+    """Create and return a choose recipient URL."""
+    return reverse('book:choose-recipient', args=[interest_id])
 
 
 def create_book(user, **params):
@@ -36,6 +53,7 @@ def create_book(user, **params):
 class PublicBookAPITests(TestCase):
     """Test unauthenticated API requests."""
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
 
     def test_auth_required(self):
@@ -49,6 +67,7 @@ class PrivateBookApiTests(TestCase):
     """Test authenticated API requests."""
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             'user@example.com',
@@ -64,9 +83,9 @@ class PrivateBookApiTests(TestCase):
         res = self.client.get(BOOKS_URL)
 
         books = Book.objects.all().order_by('-id')
-        serializer = BookSerializer(books, many=True)
+        serializer = BookListSerializer(books, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_create_book(self):
         """Test creating a book."""
@@ -94,3 +113,532 @@ class PrivateBookApiTests(TestCase):
             else:
                 self.assertEqual(getattr(book, k), v)
         self.assertEqual(book.user, self.user)
+
+    def test_create_book_reuses_genres_case_insensitively(self):
+        """Test creating a book links existing genres regardless of case."""
+        genre = Genre.objects.create(name='Fantasy')
+        payload = {
+            'title': 'test Book Title',
+            'author': 'test Author Name',
+            'location': 'test Location',
+            'genres': [
+                {'name': 'fantasy'},
+                {'name': 'FANTASY'},
+                {'name': 'Horror'},
+            ],
+        }
+        res = self.client.post(BOOKS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        book = Book.objects.get(id=res.data['id'])
+        self.assertEqual(Genre.objects.count(), 2)
+        self.assertCountEqual(
+            book.genres.values_list('name', flat=True),
+            [genre.name, 'Horror'],
+        )
+
+    def test_update_book_genres(self):
+        """Test updating the genres of a book."""
+        book = create_book(user=self.user)
+        book.genres.add(Genre.objects.create(name='Drama'))
+        payload = {'genres': [{'name': 'Comedy'}, {'name': 'drama'}]}
+
+        res = self.client.patch(detail_url(book.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertCountEqual(
+            [genre['name'] for genre in res.data['genres']],
+            ['Comedy', 'Drama'],
+        )
+        self.assertEqual(Genre.objects.count(), 2)
+
+    def test_clear_book_genres(self):
+        """Test updating a book with empty genres clears them."""
+        book = create_book(user=self.user)
+        book.genres.add(Genre.objects.create(name='Drama'))
+
+        res = self.client.patch(
+            detail_url(book.id),
+            {'genres': []},
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(book.genres.count(), 0)
+
+    def test_partial_update_keeps_genres(self):
+        """Test updating other fields leaves the genres untouched."""
+        book = create_book(user=self.user)
+        book.genres.add(Genre.objects.create(name='Drama'))
+
+        res = self.client.patch(detail_url(book.id), {'title': 'New title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        book.refresh_from_db()
+        self.assertEqual(book.title, 'New title')
+        self.assertEqual(book.genres.count(), 1)
+
+    def test_update_other_users_book_error(self):
+        """Test updating another user's book is forbidden."""
+        other_user = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass123',
+        )
+        book = create_book(user=other_user)
+
+        res = self.client.patch(detail_url(book.id), {'title': 'New title'})
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        book.refresh_from_db()
+        self.assertNotEqual(book.title, 'New title')
+
+    def test_list_books_paginated(self):
+        """Test books are returned newest first in cursor pages."""
+        books = [create_book(user=self.user) for _ in range(5)]
+
+        res = self.client.get(BOOKS_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [book['id'] for book in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += [book['id'] for book in res.data['results']]
+        self.assertEqual(ids, [book.id for book in reversed(books)])
+
+    def test_list_books_page_size_capped(self):
+        """Test page_size cannot exceed the configured maximum."""
+        for _ in range(5):
+            create_book(user=self.user)
+
+        with patch('book.pagination.IdCursorPagination.max_page_size', 3):
+            res = self.client.get(BOOKS_URL, {'page_size': 1000})
+
+        self.assertEqual(len(res.data['results']), 3)
+
+    def test_list_my_books_paginated(self):
+        """Test listing own books is paginated."""
+        other_user = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass123',
+        )
+        create_book(user=other_user)
+        book = create_book(user=self.user)
+
+        res = self.client.get(MY_BOOKS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            [book.id],
+        )
+        self.assertIsNone(res.data['next'])
+
+    def test_list_book_interests_paginated(self):
+        """Test listing interests in own books is paginated."""
+        other_user = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass123',
+        )
+        book = create_book(user=self.user)
+        interests = [
+            BookInterest.objects.create(book=book, interested_user=other_user)
+            for _ in range(3)
+        ]
+
+        res = self.client.get(BOOK_INTERESTS_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            [interests[2].id, interests[1].id],
+        )
+        self.assertIsNotNone(res.data['next'])
+
+    def test_inbox(self):
+        """Test the inbox lists own books with counts and recent users."""
+        book = create_book(user=self.user)
+        readers = [
+            get_user_model().objects.create_user(
+                f'reader{i}@example.com',
+                'testpass123',
+                name=f'Reader {i}',
+            )
+            for i in range(4)
+        ]
+        for reader in readers:
+            BookInterest.objects.create(book=book, interested_user=reader)
+        BookInterest.objects.filter(interested_user=readers[0]).delete()
+        create_book(user=readers[0])
+
+        res = self.client.get(INBOX_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [{
+            'id': book.id,
+            'title': book.title,
+            'available': True,
+            'interest_count': 3,
+            'recent_interested_users': [
+                {'id': reader.id, 'name': reader.name}
+                for reader in reversed(readers[1:])
+            ],
+        }])
+
+    def test_choose_recipient(self):
+        """Test choosing a recipient rejects the others and takes the book."""
+        book = create_book(user=self.user)
+        interests = [
+            BookInterest.objects.create(
+                book=book,
+                interested_user=get_user_model().objects.create_user(
+                    f'reader{i}@example.com',
+                    'testpass123',
+                ),
+            )
+            for i in range(3)
+        ]
+
+        # Without running tasks, as the others must be rejected with the
+        # choice.
+        with self.captureOnCommitCallbacks():
+            res = self.client.patch(choose_recipient_url(interests[1].id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data['chosen_by_owner'])
+        book.refresh_from_db()
+        self.assertFalse(book.available)
+        self.assertEqual(
+            list(BookInterest.objects.order_by('id').values_list(
+                'chosen_by_owner',
+                'rejected_by_owner',
+            )),
+            [(False, True), (True, False), (False, True)],
+        )
+
+        res = self.client.patch(choose_recipient_url(interests[1].id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.patch(choose_recipient_url(interests[0].id))
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+    def test_choose_recipient_after_relisting(self):
+        """Test choosing again after relisting replaces the first choice."""
+        book = create_book(user=self.user)
+        first, second = [
+            BookInterest.objects.create(
+                book=book,
+                interested_user=get_user_model().objects.create_user(
+                    f'reader{i}@example.com',
+                    'testpass123',
+                ),
+            )
+            for i in range(2)
+        ]
+        # The book is relisted, e.g. from the admin, before the rejection
+        # task has run.
+        self.client.patch(choose_recipient_url(first.id))
+        Book.objects.filter(pk=book.pk).update(available=True)
+
+        res = self.client.patch(choose_recipient_url(second.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(BookInterest.objects.filter(
+                chosen_by_owner=True,
+            ).values_list('pk', flat=True)),
+            [second.id],
+        )
+
+    def test_choose_recipient_other_users_book(self):
+        """Test choosing a recipient for another user's book is forbidden."""
+        other_user = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass123',
+        )
+        book = create_book(user=other_user)
+        interest = BookInterest.objects.create(
+            book=book,
+            interested_user=self.user,
+        )
+
+        res = self.client.patch(choose_recipient_url(interest.id))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        interest.refresh_from_db()
+        self.assertFalse(interest.chosen_by_owner)
+
+    def test_filter_by_genre(self):
+        """Test filtering matches genres by substring without duplicates."""
+        book = create_book(user=self.user)
+        book.genres.add(
+            Genre.objects.create(name='Science Fiction'),
+            Genre.objects.create(name='Fiction'),
+        )
+        other = create_book(user=self.user)
+        other.genres.add(Genre.objects.create(name='Drama'))
+
+        res = self.client.get(BOOKS_URL, {'genre': 'FICTION'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([b['id'] for b in res.data['results']], [book.id])
+        self.assertEqual(
+            res.data['results'][0]['genre_names'],
+            ['Fiction', 'Science Fiction'],
+        )
+
+    def test_filter_near(self):
+        """Test filtering books within a radius of a point."""
+        tbilisi = create_book(user=self.user, location='Tbilisi')
+        rustavi = create_book(user=self.user, location='Rustavi, Georgia')
+        create_book(user=self.user, location='Batumi')
+        create_book(user=self.user, location='unknown place')
+
+        res = self.client.get(
+            BOOKS_URL,
+            {'near': '41.70,44.80', 'radius_km': '30'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [b['id'] for b in res.data['results']],
+            [rustavi.id, tbilisi.id],
+        )
+        self.assertEqual(res.data['results'][1]['latitude'], 41.7151)
+
+    def test_filter_near_invalid(self):
+        """Test malformed near and radius_km values are rejected."""
+        for params in [
+            {'near': '41.7'},
+            {'near': 'north,east'},
+            {'near': '91,0'},
+            {'near': '41.7,44.8', 'radius_km': '-1'},
+            {'near': '41.7,44.8', 'radius_km': '100000'},
+        ]:
+            with self.subTest(params=params):
+                res = self.client.get(BOOKS_URL, params)
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_books_sparse_fields(self):
+        """Test listing only the requested fields of books."""
+        create_book(user=self.user)
+
+        res = self.client.get(BOOKS_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(res.data['results'][0]), ['id', 'title'])
+
+    def test_list_books_compact(self):
+        """Test the compact list representation."""
+        create_book(user=self.user)
+
+        res = self.client.get(BOOKS_URL, {'compact': 'true'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(res.data['results'][0]),
+            ['id', 'title', 'author', 'image', 'location'],
+        )
+
+    def test_list_books_compact_with_omit(self):
+        """Test fields can be omitted from the compact representation."""
+        create_book(user=self.user)
+
+        res = self.client.get(BOOKS_URL, {'compact': '1', 'omit': 'image'})
+
+        self.assertEqual(
+            list(res.data['results'][0]),
+            ['id', 'title', 'author', 'location'],
+        )
+
+    def test_retrieve_book_omit_fields(self):
+        """Test omitting fields from a book."""
+        book = create_book(user=self.user)
+        book.genres.add(Genre.objects.create(name='Drama'))
+
+        res = self.client.get(
+            detail_url(book.id),
+            {'omit': 'description,genres'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('description', res.data)
+        self.assertNotIn('genres', res.data)
+        self.assertEqual(res.data['title'], book.title)
+
+    def test_list_my_books_sparse_fields(self):
+        """Test own books can be listed with sparse fields."""
+        book = create_book(user=self.user)
+
+        res = self.client.get(MY_BOOKS_URL, {'fields': 'id,available'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'],
+            [{'id': book.id, 'available': True}],
+        )
+
+    def test_sparse_fields_unknown_field(self):
+        """Test unknown field names are rejected."""
+        book = create_book(user=self.user)
+
+        for url, params in [
+            (BOOKS_URL, {'fields': 'id,password'}),
+            (BOOKS_URL, {'compact': 'true', 'fields': 'description'}),
+            (detail_url(book.id), {'omit': 'nope'}),
+        ]:
+            with self.subTest(url=url, params=params):
+                res = self.client.get(url, params)
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_books(self):
+        """Test searching books across title, author, genres and text."""
+        by_title = create_book(user=self.user, title='The Dragon Reborn')
+        by_author = create_book(user=self.user, author='Dragon Smith')
+        by_text = create_book(user=self.user, description='dragons fly')
+        by_genre = create_book(user=self.user)
+        by_genre.genres.add(Genre.objects.create(name='Dragon Lore'))
+        create_book(user=self.user)
+
+        res = self.client.get(BOOKS_URL, {'q': 'dragon'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [book['id'] for book in res.data['results']]
+        self.assertCountEqual(
+            ids,
+            [by_title.id, by_author.id, by_text.id, by_genre.id],
+        )
+        self.assertEqual(ids[-1], by_text.id)
+
+    def test_search_books_with_filters(self):
+        """Test search can be combined with the other filters."""
+        book = create_book(user=self.user, title='Dune', location='Tbilisi')
+        create_book(user=self.user, title='Dune', location='Batumi')
+
+        res = self.client.get(BOOKS_URL, {'q': 'dune', 'location': 'Tbilisi'})
+
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            [book.id],
+        )
+
+    def test_search_books_paginated(self):
+        """Test paging through search results returns each match once."""
+        books = [
+            create_book(user=self.user, title='Dune', description='dune ' * i)
+            for i in range(5)
+        ]
+
+        res = self.client.get(BOOKS_URL, {'q': 'dune', 'page_size': 2})
+        ids = [book['id'] for book in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += [book['id'] for book in res.data['results']]
+
+        self.assertCountEqual(ids, [book.id for book in books])
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_search_books_paginated_tied_rank(self):
+        """Test paging through equally ranked results newest-first."""
+        books = [create_book(user=self.user, title='Dune') for i in range(5)]
+
+        res = self.client.get(BOOKS_URL, {'q': 'dune', 'page_size': 2})
+        ids = [book['id'] for book in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += [book['id'] for book in res.data['results']]
+
+        self.assertEqual(ids, [book.id for book in reversed(books)])
+
+    def test_bulk_import_csv(self):
+        """Test importing books from a CSV stream."""
+        content = (
+            'title,author,location,condition,genres\n'
+            'Dune,Frank Herbert,Tbilisi,good,Sci-Fi;Classic\n'
+            'Emma,Jane Austen,Batumi,,classic\n'
+        )
+
+        res = self.client.post(
+            BULK_IMPORT_URL,
+            content,
+            content_type='text/csv',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data, {'created': 2, 'errors': []})
+        books = Book.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(books.count(), 2)
+        self.assertIsNone(books[1].condition)
+        self.assertCountEqual(
+            books[0].genres.values_list('name', flat=True),
+            ['Sci-Fi', 'Classic'],
+        )
+        self.assertEqual(books[1].genres.get().name, 'Classic')
+        self.assertTrue(books.search('herbert').exists())
+
+    def test_bulk_import_non_ascii_genres(self):
+        """Test imported genres match as the database lowercases them."""
+        genre = Genre.objects.create(name='İnce')
+        content = 'title,author,location,genres\nDune,Herbert,Tbilisi,ince\n'
+
+        res = self.client.post(
+            BULK_IMPORT_URL,
+            content,
+            content_type='text/csv',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        book = Book.objects.get(user=self.user)
+        self.assertEqual(book.genres.get(), genre)
+
+    def test_bulk_import_ndjson_reports_row_errors(self):
+        """Test invalid NDJSON rows are reported and valid ones created."""
+        content = (
+            '{"title": "Dune", "author": "Herbert", "location": "Tbilisi",'
+            ' "genres": [{"name": "Sci-Fi"}]}\n'
+            '{"title": "No author", "location": "Tbilisi", "genres": []}\n'
+            'not json\n'
+            '\n'
+            '{"title": "Emma", "author": "Austen", "location": "Batumi",'
+            ' "genres": []}\n'
+        )
+
+        res = self.client.post(
+            BULK_IMPORT_URL,
+            content,
+            content_type='application/x-ndjson',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(
+            [error['row'] for error in res.data['errors']],
+            [2, 3],
+        )
+        self.assertIn('author', res.data['errors'][0]['errors'])
+        self.assertCountEqual(
+            Book.objects.values_list('title', flat=True),
+            ['Dune', 'Emma'],
+        )
+
+    def test_bulk_import_all_rows_invalid(self):
+        """Test importing only invalid rows returns an error."""
+        res = self.client.post(
+            BULK_IMPORT_URL,
+            'title\nDune\n',
+            content_type='text/csv',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['created'], 0)
+        self.assertFalse(Book.objects.exists())
+
+    def test_bulk_import_unsupported_media_type(self):
+        """Test importing an unsupported format is rejected."""
+        res = self.client.post(BULK_IMPORT_URL, [], format='json')
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        )
@@ -0,0 +1,205 @@
+"""
+Tests for the async book read APIs.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Book, Genre
+
+
+BOOKS_URL = reverse('book:book-list')
+MY_BOOKS_URL = reverse('book:my-books')
+ASYNC_BOOKS_URL = reverse('book:async-book-list')
+ASYNC_MY_BOOKS_URL = reverse('book:async-my-books')
+
+
+def async_detail_url(book_id):
+    """Create and return an async book detail URL."""
+    return reverse('book:async-book-detail', args=[book_id])
+
+
+def create_book(user, **params):
+    """Create and return a sample book."""
+    defaults = {
+        'title': 'sample title for book',
+        'author': 'test auth',
+        'description': 'sample description for book',
+        'location': 'test location',
+        'condition': 'good',
+        'image': 'testbook.jpg',
+    }
+    defaults.update(params)
+
+    return Book.objects.create(user=user, **defaults)
+
+
+class AsyncBookApiTests(TestCase):
+    """Test the async book read APIs."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.genre = Genre.objects.create(name='Drama')
+
+    def test_list_matches_sync_list(self):
+        """Test the async list returns the same payload as the sync one."""
+        for i in range(3):
+            book = create_book(user=self.user, title=f'title {i}')
+            book.genres.add(self.genre)
+        create_book(user=self.user, available=False)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ASYNC_BOOKS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        sync_res = self.client.get(BOOKS_URL)
+        self.assertEqual(res.json()['results'], sync_res.json()['results'])
+        self.assertIsNone(res.json()['next'])
+        self.assertIsNone(res.json()['previous'])
+
+    def test_list_sparse_fields_match_sync_list(self):
+        """Test the async list selects fields like the sync one."""
+        book = create_book(user=self.user)
+        book.genres.add(self.genre)
+
+        for params in [
+            {'fields': 'id,title,genre_names'},
+            {'omit': 'description'},
+            {'compact': 'true'},
+        ]:
+            with self.subTest(params=params):
+                res = self.client.get(ASYNC_BOOKS_URL, params)
+
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                sync_res = self.client.get(BOOKS_URL, params)
+                self.assertEqual(
+                    res.json()['results'],
+                    sync_res.json()['results'],
+                )
+
+    def test_list_filters(self):
+        """Test the async list applies the book filters."""
+        book = create_book(user=self.user, author='Tolkien')
+        book.genres.add(self.genre)
+        create_book(user=self.user, author='Tolkien')
+        create_book(user=self.user, author='Austen')
+
+        res = self.client.get(
+            ASYNC_BOOKS_URL,
+            {'author': 'Tolkien', 'genre': 'dra'},
+        )
+
+        self.assertEqual(
+            [item['id'] for item in res.json()['results']],
+            [book.id],
+        )
+
+    def test_list_cursor_pagination(self):
+        """Test paging forwards and backwards through the async list."""
+        books = [create_book(user=self.user) for _ in range(5)]
+        ids = [book.id for book in reversed(books)]
+
+        first = self.client.get(ASYNC_BOOKS_URL, {'page_size': 2}).json()
+        second = self.client.get(first['next']).json()
+        third = self.client.get(second['next']).json()
+        back = self.client.get(second['previous']).json()
+
+        self.assertEqual([b['id'] for b in first['results']], ids[:2])
+        self.assertEqual([b['id'] for b in second['results']], ids[2:4])
+        self.assertEqual([b['id'] for b in third['results']], ids[4:])
+        self.assertIsNone(third['next'])
+        self.assertEqual([b['id'] for b in back['results']], ids[:2])
+
+    def test_invalid_cursor_error(self):
+        """Test an invalid cursor is rejected like the sync API does."""
+        res = self.client.get(ASYNC_BOOKS_URL, {'cursor': 'invalid'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_detail(self):
+        """Test retrieving a book through the async API."""
+        book = create_book(user=self.user)
+        book.genres.add(self.genre)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(async_detail_url(book.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['genres'], [
+            {'id': self.genre.id, 'name': 'Drama'},
+        ])
+
+    def test_detail_omit_genres(self):
+        """Test omitting genres from a book skips the genre query."""
+        book = create_book(user=self.user)
+        book.genres.add(self.genre)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                async_detail_url(book.id),
+                {'omit': 'genres,description'},
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('genres', res.json())
+        self.assertNotIn('description', res.json())
+
+    def test_sparse_fields_unknown_field(self):
+        """Test unknown field names are rejected like the sync API does."""
+        res = self.client.get(ASYNC_BOOKS_URL, {'fields': 'id,password'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', res.json())
+
+    def test_detail_not_found(self):
+        """Test unavailable books are not found."""
+        book = create_book(user=self.user, available=False)
+
+        res = self.client.get(async_detail_url(book.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_my_books_auth_required(self):
+        """Test listing own books requires a valid token."""
+        res = self.client.get(ASYNC_MY_BOOKS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['WWW-Authenticate'], 'Token')
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+        res = self.client.get(ASYNC_MY_BOOKS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_my_books(self):
+        """Test listing own books, including unavailable ones."""
+        other_user = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass123',
+        )
+        create_book(user=other_user)
+        create_book(user=self.user)
+        create_book(user=self.user, available=False)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+        res = self.client.get(ASYNC_MY_BOOKS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        sync_res = self.client.get(MY_BOOKS_URL)
+        self.assertEqual(res.json()['results'], sync_res.json()['results'])
+        self.assertEqual(len(res.json()['results']), 2)
+
+    def test_write_not_allowed(self):
+        """Test the async endpoints are read only."""
+        res = self.client.post(ASYNC_BOOKS_URL, {})
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
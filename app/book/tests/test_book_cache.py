@@ -0,0 +1,318 @@
+"""
+Tests for caching of book API responses.
+"""
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+from django.utils.http import http_date
+
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from core.models import Book, Genre
+from core.routers import ReplicaRouter, read_from
+from book import caching
+from book.serializers import BookSerializer
+
+
+BOOKS_URL = reverse('book:book-list')
+BULK_IMPORT_URL = reverse('book:book-bulk-import')
+MY_BOOKS_URL = reverse('book:my-books')
+
+
+def detail_url(book_id):
+    """Create and return a book detail URL."""
+    return reverse('book:book-detail', args=[book_id])
+
+
+def create_book(user, **params):
+    """Create and return a sample book."""
+    defaults = {
+        'title': 'sample title for book',
+        'author': 'test auth',
+        'location': 'test location',
+    }
+    defaults.update(params)
+
+    return Book.objects.create(user=user, **defaults)
+
+
+class BookCacheTests(TestCase):
+    """Test caching of book list and detail responses."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+
+    def test_list_served_from_cache(self):
+        """Test repeated list requests do not hit the database."""
+        create_book(user=self.user)
+        res = self.client.get(BOOKS_URL)
+
+        with self.assertNumQueries(0):
+            cached_res = self.client.get(BOOKS_URL)
+
+        self.assertEqual(cached_res.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached_res.data, res.data)
+        self.assertEqual(cached_res['ETag'], res['ETag'])
+
+    def test_query_params_normalized(self):
+        """Test parameter order does not change the cache entry."""
+        self.client.get(BOOKS_URL, {'author': 'a', 'location': 'b'})
+
+        with self.assertNumQueries(0):
+            self.client.get(f'{BOOKS_URL}?location=b&author=a&genre=')
+
+    def test_filters_cached_separately(self):
+        """Test each filter combination gets its own cache entry."""
+        create_book(user=self.user, author='Tolkien')
+        create_book(user=self.user, author='Austen')
+        self.client.get(BOOKS_URL, {'author': 'Tolkien'})
+
+        res = self.client.get(BOOKS_URL, {'author': 'Austen'})
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['author'], 'Austen')
+
+    def test_detail_served_from_cache(self):
+        """Test repeated detail requests do not hit the database."""
+        book = create_book(user=self.user)
+        self.client.get(detail_url(book.id))
+
+        with self.assertNumQueries(0):
+            res = self.client.get(detail_url(book.id))
+
+        self.assertEqual(res.data['id'], book.id)
+
+    def test_not_found_not_cached(self):
+        """Test error responses are not cached."""
+        res = self.client.get(detail_url(1000))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        book = create_book(user=self.user)
+        res = self.client.get(detail_url(book.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_if_none_match_not_modified(self):
+        """Test a matching ETag returns 304 without touching the database."""
+        create_book(user=self.user)
+        etag = self.client.get(BOOKS_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(BOOKS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+
+    def test_book_change_invalidates_cache(self):
+        """Test saving, updating and deleting books invalidates the cache."""
+        book = create_book(user=self.user)
+        etag = self.client.get(BOOKS_URL)['ETag']
+
+        book.title = 'New title'
+        book.save()
+        res = self.client.get(BOOKS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['title'], 'New title')
+
+        book.delete()
+        res = self.client.get(BOOKS_URL)
+        self.assertEqual(res.data['results'], [])
+
+    def test_genre_change_invalidates_cache(self):
+        """Test changing and renaming genres invalidates the cache."""
+        book = create_book(user=self.user)
+        genre = Genre.objects.create(name='Drama')
+        self.client.get(detail_url(book.id))
+
+        book.genres.add(genre)
+        res = self.client.get(detail_url(book.id))
+        self.assertEqual(res.data['genres'][0]['name'], 'Drama')
+
+        genre.name = 'Comedy'
+        genre.save()
+        res = self.client.get(detail_url(book.id))
+        self.assertEqual(res.data['genres'][0]['name'], 'Comedy')
+
+    def test_api_writes_invalidate_cache(self):
+        """Test creating books through the API invalidates the cache."""
+        self.client.force_authenticate(self.user)
+        self.client.get(BOOKS_URL)
+
+        self.client.post(
+            BOOKS_URL,
+            {'title': 't', 'author': 'a', 'location': 'l', 'genres': []},
+            format='json',
+        )
+        self.client.post(
+            BULK_IMPORT_URL,
+            'title,author,location\nt,a,l\n',
+            content_type='text/csv',
+        )
+        res = self.client.get(BOOKS_URL)
+
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_invalidated_again_on_commit(self):
+        """Test the cache is invalidated again when the write commits."""
+        book = create_book(user=self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book.save()
+            self.client.get(BOOKS_URL)
+
+        with self.assertNumQueries(1):
+            self.client.get(BOOKS_URL)
+
+
+class ConditionalRequestTests(TestCase):
+    """Test conditional requests for book details and the user's books."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.book = create_book(user=self.user)
+
+    def test_detail_not_modified(self):
+        """Test a matching ETag gets a 304 from a cached query, unrendered."""
+        res = self.client.get(detail_url(self.book.id))
+        etag = res['ETag']
+        self.assertEqual(
+            res['Last-Modified'],
+            http_date(self.book.updated_at.timestamp()),
+        )
+        cache.clear()
+
+        with patch.object(BookSerializer, 'to_representation') as render:
+            with self.assertNumQueries(1):
+                res = self.client.get(
+                    detail_url(self.book.id),
+                    HTTP_IF_NONE_MATCH=etag,
+                )
+            with self.assertNumQueries(0):
+                self.client.get(
+                    detail_url(self.book.id),
+                    HTTP_IF_NONE_MATCH=etag,
+                )
+
+        render.assert_not_called()
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_detail_not_modified_since(self):
+        """Test a request for changes since the last update gets a 304."""
+        since = self.book.updated_at + timedelta(seconds=1)
+
+        res = self.client.get(
+            detail_url(self.book.id),
+            HTTP_IF_MODIFIED_SINCE=http_date(since.timestamp()),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def assert_modified(self, etag):
+        """Assert the book's detail no longer matches etag; return the new."""
+        res = self.client.get(
+            detail_url(self.book.id),
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        return res['ETag']
+
+    def test_changes_modify_detail(self):
+        """Test saves and genre changes change the detail's ETag."""
+        genre = Genre.objects.create(name='Drama')
+        etag = self.client.get(detail_url(self.book.id))['ETag']
+
+        self.book.save()
+        etag = self.assert_modified(etag)
+        self.book.genres.add(genre)
+        etag = self.assert_modified(etag)
+        genre.name = 'Comedy'
+        genre.save()
+        self.assert_modified(etag)
+
+    def test_my_books_not_modified(self):
+        """Test polling unchanged own books gets a 304."""
+        self.client.force_authenticate(self.user)
+        etag = self.client.get(MY_BOOKS_URL)['ETag']
+
+        res = self.client.get(MY_BOOKS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        create_book(user=self.user)
+        res = self.client.get(MY_BOOKS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_my_books_etag_per_user(self):
+        """Test users with books in the same state get different ETags."""
+        other_user = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass123',
+        )
+        create_book(user=other_user)
+        Book.objects.filter(user=other_user).update(
+            updated_at=self.book.updated_at,
+        )
+        self.client.force_authenticate(self.user)
+        etag = self.client.get(MY_BOOKS_URL)['ETag']
+
+        self.client.force_authenticate(other_user)
+        res = self.client.get(MY_BOOKS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+@override_settings(REPLICA_DATABASES=['replica'], REPLICA_PIN_SECONDS=5)
+class CacheFillReplicaTests(SimpleTestCase):
+    """Test which database fills the response cache."""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.databases = []
+
+        @caching.cache_response
+        def view_method(view, request):
+            self.databases.append(ReplicaRouter().db_for_read(Book))
+            return Response({})
+
+        self.view_method = view_method
+
+    def get(self, path):
+        """Call the view method for a GET of path on the replica."""
+        with read_from('replica'):
+            self.view_method(None, Request(self.factory.get(path)))
+
+    def test_fill_after_bump_reads_primary(self):
+        """Test responses cached right after a change come from the primary."""
+        caching.bump_version()
+        self.get('/books/')
+
+        cache.delete(caching.BUMPED_KEY)
+        self.get('/books/?page_size=5')
+
+        self.assertEqual(self.databases, [None, 'replica'])
@@ -0,0 +1,227 @@
+"""
+Tests for the book change feed.
+"""
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Book, BookChange
+
+
+CHANGES_URL = reverse('book:book-changes')
+
+
+def detail_url(book_id):
+    """Create and return a book detail URL."""
+    return reverse('book:book-detail', args=[book_id])
+
+
+def create_book(user, **params):
+    """Create and return a sample book."""
+    defaults = {
+        'title': 'Sample book title',
+        'author': 'Sample author',
+        'location': 'Tbilisi',
+    }
+    defaults.update(params)
+    return Book.objects.create(user=user, **defaults)
+
+
+class BookChangesTests(TestCase):
+    """Test listing catalogue changes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+
+    def sync(self, since=None, **params):
+        """Return the feed from since, following every page."""
+        if since is not None:
+            params['since'] = since
+        res = self.client.get(CHANGES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        pages = [res.data]
+        while pages[-1]['next']:
+            pages.append(self.client.get(pages[-1]['next']).data)
+        return pages
+
+    def test_changes_list_created_books(self):
+        """Test the feed starts with every book."""
+        books = [create_book(self.user, title=f'title {i}') for i in range(3)]
+
+        res = self.client.get(CHANGES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [book['id'] for book in res.data['results']],
+            [book.id for book in books],
+        )
+        self.assertEqual(res.data['results'][0]['title'], 'title 0')
+        self.assertEqual(res.data['removed'], [])
+        self.assertIsNone(res.data['next'])
+
+    def test_changes_since_token(self):
+        """Test the feed from a sync token lists only later changes."""
+        book = create_book(self.user)
+        other_book = create_book(self.user)
+        token = self.client.get(CHANGES_URL).data['sync_token']
+
+        self.client.force_authenticate(self.user)
+        self.client.patch(detail_url(book.id), {'title': 'New title'})
+        res = self.client.get(CHANGES_URL, {'since': token})
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['title'], 'New title')
+        self.assertNotEqual(res.data['sync_token'], token)
+        res = self.client.get(
+            CHANGES_URL,
+            {'since': res.data['sync_token']},
+        )
+        self.assertEqual(res.data['results'], [])
+        self.assertNotIn(other_book.id, res.data['removed'])
+
+    def test_deleted_books_removed(self):
+        """Test deleting a book through the API leaves a tombstone."""
+        book = create_book(self.user)
+        token = self.client.get(CHANGES_URL).data['sync_token']
+        self.client.force_authenticate(self.user)
+
+        res = self.client.delete(detail_url(book.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        res = self.client.get(CHANGES_URL, {'since': token})
+        self.assertEqual(res.data['results'], [])
+        self.assertEqual(res.data['removed'], [book.id])
+        self.assertTrue(
+            BookChange.objects.filter(book_id=book.id, deleted=True).exists(),
+        )
+
+    def test_unavailable_books_removed(self):
+        """Test books made unavailable by a queryset update are removed."""
+        book = create_book(self.user)
+        token = self.client.get(CHANGES_URL).data['sync_token']
+
+        Book.objects.filter(pk=book.pk).update(
+            available=False,
+            updated_at=timezone.now(),
+        )
+
+        res = self.client.get(CHANGES_URL, {'since': token})
+        self.assertEqual(res.data['removed'], [book.id])
+
+    def test_created_book_coordinates_listed(self):
+        """Test books are listed again once their coordinates are derived."""
+        # Insert without the refresh that saving sends, as a mirror may
+        # sync between the two.
+        book = Book.objects.bulk_create([Book(
+            user=self.user,
+            title='Dune',
+            author='Herbert',
+            location='Tbilisi',
+        )])[0]
+        res = self.client.get(CHANGES_URL)
+        self.assertIsNone(res.data['results'][0]['latitude'])
+
+        Book.objects.filter(pk=book.pk).refresh_derived_fields()
+
+        res = self.client.get(CHANGES_URL, {'since': res.data['sync_token']})
+        self.assertAlmostEqual(res.data['results'][0]['latitude'], 41.7151)
+        self.assertAlmostEqual(res.data['results'][0]['longitude'], 44.8271)
+
+    def test_derived_field_updates_not_logged(self):
+        """Test updates leaving updated_at alone are not changes."""
+        book = create_book(self.user)
+        token = self.client.get(CHANGES_URL).data['sync_token']
+
+        Book.objects.filter(pk=book.pk).update(interest_count=3)
+
+        res = self.client.get(CHANGES_URL, {'since': token})
+        self.assertEqual(res.data['results'], [])
+        self.assertEqual(res.data['sync_token'], token)
+
+    def test_changes_paginated_by_token(self):
+        """Test following next pages through every change once."""
+        books = [create_book(self.user, title=f'title {i}') for i in range(5)]
+
+        # Each book is logged when inserted and when its derived fields
+        # are refreshed.
+        pages = self.sync(page_size=2)
+
+        self.assertEqual(len(pages), 5)
+        self.assertEqual(
+            [book['id'] for page in pages for book in page['results']],
+            [book.id for book in books],
+        )
+        self.assertEqual(
+            pages[-1]['sync_token'],
+            self.sync(since=pages[0]['sync_token'])[-1]['sync_token'],
+        )
+
+    def test_changes_query_count(self):
+        """Test a page costs a query for changes, books and genres."""
+        for i in range(20):
+            create_book(self.user, title=f'title {i}')
+
+        with self.assertNumQueries(3):
+            res = self.client.get(CHANGES_URL, {'page_size': 40})
+
+        self.assertEqual(len(res.data['results']), 20)
+
+    def test_invalid_token_rejected(self):
+        """Test a malformed sync token is a bad request."""
+        res = self.client.get(CHANGES_URL, {'since': 'not-a-token'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('since', res.data)
+
+
+class BookChangesConcurrencyTests(TransactionTestCase):
+    """Test the feed around transactions committing out of order."""
+
+    def test_changes_wait_for_older_transactions(self):
+        """Test changes are listed once older transactions have finished."""
+        user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        client = APIClient()
+        token = client.get(CHANGES_URL).data['sync_token']
+        written = threading.Event()
+        release = threading.Event()
+
+        def write_slowly():
+            try:
+                with transaction.atomic():
+                    create_book(user, title='slow')
+                    written.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=write_slowly)
+        thread.start()
+        try:
+            written.wait(10)
+            create_book(user, title='fast')
+            res = client.get(CHANGES_URL, {'since': token})
+            self.assertEqual(res.data['results'], [])
+            self.assertEqual(res.data['sync_token'], token)
+        finally:
+            release.set()
+            thread.join()
+
+        res = client.get(CHANGES_URL, {'since': token})
+        self.assertEqual(
+            [book['title'] for book in res.data['results']],
+            ['slow', 'fast'],
+        )
@@ -0,0 +1,93 @@
+"""
+Concurrency tests for choosing book recipients.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Book, BookInterest
+
+
+THREADS = 8
+INTERESTS = 40
+
+
+def choose_recipient_url(interest_id):
+    """Create and return a choose recipient URL."""
+    return reverse('book:choose-recipient', args=[interest_id])
+
+
+class ChooseRecipientConcurrencyTests(TransactionTestCase):
+    """Test concurrent recipient choices for one book."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.book = Book.objects.create(
+            user=self.user,
+            title='title',
+            author='author',
+            location='location',
+        )
+        readers = get_user_model().objects.bulk_create([
+            get_user_model()(email=f'reader{i}@example.com')
+            for i in range(INTERESTS)
+        ])
+        self.interests = BookInterest.objects.bulk_create([
+            BookInterest(book=self.book, interested_user=reader)
+            for reader in readers
+        ])
+
+    def choose(self, interest):
+        """Choose interest as recipient from a fresh client and connection."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        try:
+            return client.patch(choose_recipient_url(interest.id)).status_code
+        finally:
+            connection.close()
+
+    def test_concurrent_choices_award_book_once(self):
+        """Test only one of many concurrent choices wins."""
+        start = time.perf_counter()
+        with ThreadPoolExecutor(THREADS) as executor:
+            codes = list(executor.map(self.choose, self.interests))
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(codes.count(status.HTTP_200_OK), 1)
+        self.assertEqual(
+            codes.count(status.HTTP_409_CONFLICT),
+            INTERESTS - 1,
+        )
+        self.assertEqual(
+            BookInterest.objects.filter(chosen_by_owner=True).count(),
+            1,
+        )
+        self.assertEqual(
+            BookInterest.objects.filter(rejected_by_owner=True).count(),
+            INTERESTS - 1,
+        )
+        self.book.refresh_from_db()
+        self.assertFalse(self.book.available)
+        # Each choice holds the book lock for one short transaction.
+        self.assertLess(elapsed, 10)
+
+    def test_one_chosen_interest_per_book(self):
+        """Test the database rejects a second chosen interest."""
+        BookInterest.objects.filter(pk=self.interests[0].pk).update(
+            chosen_by_owner=True,
+        )
+
+        with self.assertRaises(IntegrityError):
+            BookInterest.objects.filter(pk=self.interests[1].pk).update(
+                chosen_by_owner=True,
+            )
@@ -0,0 +1,151 @@
+"""
+Tests for the streaming book exports.
+"""
+import json
+import tracemalloc
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Book, Genre
+from book.serializers import BookSerializer
+
+
+EXPORT_URL = reverse('book:book-export')
+MY_BOOKS_EXPORT_URL = reverse('book:my-books-export')
+
+
+def create_books(user, count, genre):
+    """Insert `count` books for user tagged with genre, using plain SQL."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO core_book
+                (user_id, title, author, description, location, condition,
+                 image, available, genre_names, interest_count, updated_at)
+            SELECT %s, 'title ' || n, 'author ' || n, 'description ' || n,
+                   'location', 'good', '', TRUE, '{}', 0, NOW()
+            FROM generate_series(1, %s) AS n
+            """,
+            [user.id, count],
+        )
+        cursor.execute(
+            """
+            INSERT INTO core_book_genres (book_id, genre_id)
+            SELECT id, %s FROM core_book WHERE user_id = %s
+            """,
+            [genre.id, user.id],
+        )
+    Book.objects.filter(user=user).update_genre_names()
+
+
+def read_lines(res):
+    """Return the decoded NDJSON objects of a streaming response."""
+    return [
+        json.loads(line)
+        for line in b''.join(res.streaming_content).splitlines()
+    ]
+
+
+class BookExportTests(TestCase):
+    """Test the streaming book exports."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.other_user = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass123',
+        )
+        self.genre = Genre.objects.create(name='Drama')
+
+    def test_export_streams_available_books(self):
+        """Test exporting returns every available book as NDJSON."""
+        create_books(self.user, 5, self.genre)
+        Book.objects.filter(title='title 1').update(available=False)
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        books = Book.objects.filter(available=True).order_by('-id')
+        self.assertEqual(
+            read_lines(res),
+            json.loads(json.dumps(BookSerializer(books, many=True).data)),
+        )
+
+    def test_export_applies_filters(self):
+        """Test exporting honours the list filters."""
+        create_books(self.user, 5, self.genre)
+
+        res = self.client.get(EXPORT_URL, {'author': 'author 3'})
+
+        self.assertEqual(
+            [book['author'] for book in read_lines(res)],
+            ['author 3'],
+        )
+
+    def test_my_books_export(self):
+        """Test exporting my books returns only the user's books."""
+        create_books(self.user, 3, self.genre)
+        create_books(self.other_user, 2, self.genre)
+        Book.objects.filter(user=self.user).update(available=False)
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(MY_BOOKS_EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [book['id'] for book in read_lines(res)]
+        self.assertEqual(
+            ids,
+            list(Book.objects.filter(
+                user=self.user,
+            ).order_by('-id').values_list('id', flat=True)),
+        )
+
+    def test_my_books_export_requires_auth(self):
+        """Test authentication is required to export my books."""
+        res = self.client.get(MY_BOOKS_EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @patch('django.conf.settings.EXPORT_CHUNK_SIZE', 100)
+    def test_export_query_count(self):
+        """Test exporting costs one books and one genres query per chunk."""
+        create_books(self.user, 250, self.genre)
+        res = self.client.get(EXPORT_URL)
+
+        with self.assertNumQueries(1 + 3):
+            lines = read_lines(res)
+
+        self.assertEqual(len(lines), 250)
+
+    @patch('django.conf.settings.EXPORT_CHUNK_SIZE', 500)
+    def test_export_memory_is_bounded(self):
+        """Test peak memory does not grow with the number of books."""
+        peaks = []
+        for count in [2000, 20000]:
+            Book.objects.all().delete()
+            create_books(self.user, count, self.genre)
+            res = self.client.get(EXPORT_URL)
+
+            tracemalloc.start()
+            exported = sum(
+                chunk.count(b'\n') for chunk in res.streaming_content
+            )
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+            self.assertEqual(exported, count)
+
+        self.assertLess(peaks[1], peaks[0] * 2)
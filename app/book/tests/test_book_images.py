@@ -0,0 +1,222 @@
+"""
+Tests for uploading book images.
+"""
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from PIL import ExifTags, Image
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Book, StoredImage
+from core.views import media
+
+
+BOOKS_URL = reverse('book:book-list')
+ASYNC_BOOKS_URL = reverse('book:async-book-list')
+
+
+def detail_url(book_id):
+    """Create and return a book detail URL."""
+    return reverse('book:book-detail', args=[book_id])
+
+
+def image_url(book_id):
+    """Create and return a book image upload URL."""
+    return reverse('book:book-upload-image', args=[book_id])
+
+
+def image_file(size=(800, 600), color='red', image_format='JPEG', **options):
+    """Return an in-memory image file."""
+    file = io.BytesIO()
+    Image.new('RGB', size, color).save(file, format=image_format, **options)
+    file.name = f'cover.{image_format.lower()}'
+    file.seek(0)
+    return file
+
+
+class BookImageTests(TestCase):
+    """Test uploading and serving book images."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.book = Book.objects.create(
+            user=self.user,
+            title='Dune',
+            author='Herbert',
+            location='Tbilisi',
+            image='http://example.com/dune.jpg',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, file, book=None):
+        """Upload file as the image of book, running its tasks."""
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                image_url((book or self.book).id),
+                {'image': file},
+                format='multipart',
+            )
+
+    def test_upload_image(self):
+        """Test uploading stores the image and generates its thumbnails."""
+        res = self.upload(image_file())
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        image = StoredImage.objects.get()
+        self.assertEqual((image.width, image.height), (800, 600))
+        self.assertEqual(image.thumbnail_widths, [160, 320, 640])
+        self.assertEqual(
+            image.file.name,
+            f'images/{image.sha256[:2]}/{image.sha256}.jpg',
+        )
+        self.assertTrue(res.data['image'].endswith(image.file.url))
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.uploaded_image, image)
+        self.assertIsNone(self.book.image)
+        thumbnail = image.file.name.replace('.jpg', '-160.jpg')
+        with default_storage.open(thumbnail) as file:
+            self.assertEqual(Image.open(file).size, (160, 120))
+
+    def test_same_image_stored_once(self):
+        """Test identical uploads share one stored file."""
+        other_book = Book.objects.create(
+            user=self.user,
+            title='Emma',
+            author='Austen',
+            location='Tbilisi',
+        )
+
+        self.upload(image_file())
+        self.upload(image_file(), book=other_book)
+
+        image = StoredImage.objects.get()
+        self.assertEqual(image.book_set.count(), 2)
+        _, files = default_storage.listdir(f'images/{image.sha256[:2]}')
+        self.assertEqual(len(files), 4)
+
+    def test_responses_link_sized_images(self):
+        """Test lists link smaller thumbnails than the detail."""
+        self.upload(image_file())
+        image = StoredImage.objects.get()
+        stem = image.file.url.rsplit('.', 1)[0]
+
+        responses = {
+            'detail': self.client.get(detail_url(self.book.id)).data,
+            'list': self.client.get(BOOKS_URL).data['results'][0],
+            'compact': self.client.get(
+                BOOKS_URL,
+                {'compact': 'true'},
+            ).data['results'][0],
+            'async': self.client.get(ASYNC_BOOKS_URL).json()['results'][0],
+        }
+
+        for name, width in [
+            ('detail', 640), ('list', 320), ('compact', 160), ('async', 320),
+        ]:
+            with self.subTest(name=name):
+                self.assertTrue(
+                    responses[name]['image'].endswith(f'{stem}-{width}.jpg'),
+                )
+
+    def test_small_image_served_whole(self):
+        """Test images narrower than a thumbnail are served as uploaded."""
+        self.upload(image_file(size=(200, 300), image_format='PNG'))
+
+        image = StoredImage.objects.get()
+        self.assertEqual(image.thumbnail_widths, [160])
+        res = self.client.get(detail_url(self.book.id))
+        self.assertTrue(res.data['image'].endswith(image.file.url))
+
+    def test_rotated_image_upright(self):
+        """Test thumbnails of images with an EXIF orientation are upright."""
+        exif = Image.Exif()
+        exif[ExifTags.Base.Orientation] = 6
+
+        self.upload(image_file(exif=exif))
+
+        image = StoredImage.objects.get()
+        self.assertEqual((image.width, image.height), (600, 800))
+        self.assertEqual(image.thumbnail_widths, [160, 320])
+        thumbnail = image.file.name.replace('.jpg', '-320.jpg')
+        with default_storage.open(thumbnail) as file:
+            self.assertEqual(Image.open(file).size, (320, 427))
+
+    def test_url_replaces_uploaded_image(self):
+        """Test setting an image URL drops the uploaded image."""
+        self.upload(image_file())
+
+        res = self.client.patch(
+            detail_url(self.book.id),
+            {'image': 'http://example.com/new.jpg'},
+        )
+
+        self.assertEqual(res.data['image'], 'http://example.com/new.jpg')
+        self.book.refresh_from_db()
+        self.assertIsNone(self.book.uploaded_image)
+
+    def test_invalid_image_rejected(self):
+        """Test files which are not images are rejected."""
+        file = io.BytesIO(b'not an image')
+        file.name = 'cover.jpg'
+
+        res = self.upload(file)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+        self.assertFalse(StoredImage.objects.exists())
+
+    @override_settings(IMAGE_MAX_UPLOAD_SIZE=1024)
+    def test_large_image_rejected(self):
+        """Test uploads over the size limit are stopped."""
+        res = self.upload(image_file(size=(2000, 2000)))
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+        self.assertFalse(StoredImage.objects.exists())
+
+    def test_upload_requires_owner(self):
+        """Test only the owner can upload an image of a book."""
+        other_user = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(other_user)
+
+        res = self.upload(image_file())
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_media_cached_long(self):
+        """Test uploaded files are served with long lived cache headers."""
+        self.upload(image_file())
+        image = StoredImage.objects.get()
+
+        res = media(RequestFactory().get(image.file.url), image.file.name)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res['Cache-Control'],
+            'public, max-age=31536000, immutable',
+        )
+
+    def test_media_not_routed_without_debug(self):
+        """Test uploads are not served by Django outside development."""
+        self.upload(image_file())
+        image = StoredImage.objects.get()
+
+        res = self.client.get(image.file.url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,221 @@
+"""
+Tests for digest notifications about book interests.
+"""
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Book, BookInterest, OutboxEvent, Task
+from book import notifications
+
+
+BOOK_INTERESTS_URL = reverse('book:book-interest-list-create')
+
+
+def choose_recipient_url(interest_id):
+    """Create and return a choose recipient URL."""
+    return reverse('book:choose-recipient', args=[interest_id])
+
+
+def create_readers(count):
+    """Bulk create and return count users."""
+    return get_user_model().objects.bulk_create([
+        get_user_model()(email=f'reader{i}@example.com', name=f'Reader {i}')
+        for i in range(count)
+    ])
+
+
+class NotificationTests(TestCase):
+    """Test interest changes are notified in digests."""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = get_user_model().objects.create_user(
+            'owner@example.com',
+            'testpass123',
+        )
+        self.book = Book.objects.create(
+            user=self.owner,
+            title='Dune',
+            author='Herbert',
+            location='Tbilisi',
+        )
+        self.client = APIClient()
+
+    def add_interests(self, readers):
+        """Add interests of readers in the book with their events."""
+        interests = BookInterest.objects.bulk_create([
+            BookInterest(book=self.book, interested_user=reader)
+            for reader in readers
+        ])
+        Book.objects.filter(pk=self.book.pk).update(
+            interest_count=F('interest_count') + len(interests),
+        )
+        OutboxEvent.objects.bulk_create([
+            OutboxEvent(kind=OutboxEvent.INTEREST_ADDED, interest=interest)
+            for interest in interests
+        ])
+        return interests
+
+    def test_interest_notifies_owner(self):
+        """Test adding an interest sends the owner a digest."""
+        reader = create_readers(1)[0]
+        self.client.force_authenticate(reader)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(BOOK_INTERESTS_URL, {'book': self.book.id})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['owner@example.com'])
+        self.assertIn(
+            'Reader 0 is interested in your book "Dune"',
+            mail.outbox[0].body,
+        )
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_events_coalesced_per_user(self):
+        """Test each user gets one digest however many events concern them."""
+        other_book = Book.objects.create(
+            user=self.owner,
+            title='Emma',
+            author='Austen',
+            location='Tbilisi',
+        )
+        readers = create_readers(2)
+        self.add_interests(readers)
+        interest = BookInterest.objects.create(
+            book=other_book,
+            interested_user=readers[0],
+        )
+        OutboxEvent.objects.create(
+            kind=OutboxEvent.INTEREST_ADDED,
+            interest=interest,
+        )
+
+        sent = notifications.send_digests()
+
+        self.assertEqual(sent, 1)
+        self.assertEqual(mail.outbox[0].body, (
+            '- Reader 0 is interested in your book "Dune".\n'
+            '- Reader 1 is interested in your book "Dune".\n'
+            '- Reader 0 is interested in your book "Emma".\n'
+        ))
+
+    @override_settings(NOTIFICATION_DIGEST_MAX_ITEMS=3)
+    def test_digest_items_capped(self):
+        """Test long digests list the first items and count the rest."""
+        self.add_interests(create_readers(5))
+
+        notifications.send_digests()
+
+        lines = mail.outbox[0].body.splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[-1], '- and 2 more.')
+
+    def test_recipient_chosen_notifies_readers(self):
+        """Test the chosen reader and all the others are told."""
+        readers = create_readers(3)
+        interests = self.add_interests(readers)
+        notifications.send_digests()
+        mail.outbox.clear()
+        self.client.force_authenticate(self.owner)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.patch(choose_recipient_url(interests[1].id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        bodies = {message.to[0]: message.body for message in mail.outbox}
+        self.assertEqual(bodies, {
+            'reader0@example.com': '- "Dune" was given to another reader.\n',
+            'reader1@example.com': '- You were chosen to receive "Dune".\n',
+            'reader2@example.com': '- "Dune" was given to another reader.\n',
+        })
+
+    @override_settings(NOTIFICATION_BATCH_SIZE=50)
+    def test_many_readers_constant_queries(self):
+        """Test fan-out to many readers costs the same queries and batches."""
+        for count in [10, 500]:
+            with self.subTest(count=count):
+                BookInterest.objects.all().delete()
+                get_user_model().objects.exclude(pk=self.owner.pk).delete()
+                interests = self.add_interests(create_readers(count))
+                OutboxEvent.objects.all().delete()
+                BookInterest.objects.filter(pk=interests[0].pk).update(
+                    chosen_by_owner=True,
+                )
+                OutboxEvent.objects.create(
+                    kind=OutboxEvent.RECIPIENT_CHOSEN,
+                    interest=interests[0],
+                )
+                mail.outbox.clear()
+
+                with patch.object(
+                    EmailBackend,
+                    'send_messages',
+                    autospec=True,
+                    side_effect=EmailBackend.send_messages,
+                ) as send_messages:
+                    with self.assertNumQueries(5):
+                        sent = notifications.send_digests()
+
+                self.assertEqual(sent, count)
+                self.assertEqual(len(mail.outbox), count)
+                self.assertEqual(send_messages.call_count, -(-count // 50))
+
+    @override_settings(TASK_BACKEND='core.tasks.DatabaseBackend')
+    def test_digest_scheduled_once_per_window(self):
+        """Test events recorded together schedule one delayed digest."""
+        for interest in self.add_interests(create_readers(3)):
+            with self.captureOnCommitCallbacks(execute=True):
+                notifications.record(OutboxEvent.RECIPIENT_CHOSEN, interest)
+
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertEqual(
+            Task.objects.get().name,
+            'book.notifications.send_digests',
+        )
+
+    @override_settings(TASK_BACKEND='core.tasks.DatabaseBackend')
+    def test_rolled_back_event_schedules_nothing(self):
+        """Test a rolled back event leaves the next digest to be scheduled."""
+        interests = self.add_interests(create_readers(2))
+        OutboxEvent.objects.all().delete()
+        try:
+            with transaction.atomic():
+                notifications.record(OutboxEvent.INTEREST_ADDED, interests[0])
+                raise ValueError
+        except ValueError:
+            pass
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notifications.record(OutboxEvent.INTEREST_ADDED, interests[1])
+
+        self.assertEqual(Task.objects.count(), 1)
+
+    @override_settings(TASK_BACKEND='core.tasks.DatabaseBackend')
+    def test_pending_events_sent_when_workers_start(self):
+        """Test workers starting send events whose digest was never queued."""
+        self.add_interests(create_readers(1))
+
+        call_command(
+            'run_workers',
+            burst=True,
+            concurrency=1,
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertFalse(OutboxEvent.objects.exists())
@@ -0,0 +1,240 @@
+"""
+Query-count regression tests for book APIs.
+"""
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Book, BookInterest, Genre
+
+
+BOOKS_URL = reverse('book:book-list')
+MY_BOOKS_URL = reverse('book:my-books')
+INBOX_URL = reverse('book:my-books-inbox')
+BOOK_INTERESTS_URL = reverse('book:book-interest-list-create')
+BULK_IMPORT_URL = reverse('book:book-bulk-import')
+BOOK_COUNTS = [1, 50, 500]
+PAGE = {'page_size': settings.MAX_PAGE_SIZE}
+# In a transaction (a savepoint here), insert the book and its search
+# vector, resolve genres with a lookup, an insert and a lookup of the
+# inserted rows, link them in bulk (check and insert), refresh the search
+# vector and read the genres back.
+CREATE_BOOK_QUERIES = 11
+
+
+def detail_url(book_id):
+    """Create and return a book detail URL."""
+    return reverse('book:book-detail', args=[book_id])
+
+
+def create_books(user, count, genres):
+    """Bulk create `count` books for user, each tagged with all genres."""
+    books = Book.objects.bulk_create([
+        Book(
+            user=user,
+            title=f'title {i}',
+            author=f'author {i}',
+            location='test location',
+        )
+        for i in range(count)
+    ])
+    Book.genres.through.objects.bulk_create([
+        Book.genres.through(book_id=book.id, genre_id=genre.id)
+        for book in books
+        for genre in genres
+    ])
+    Book.objects.filter(user=user).update_genre_names()
+    return books
+
+
+class BookQueryCountTests(TestCase):
+    """Test book endpoints run a constant number of queries."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.genres = Genre.objects.bulk_create([
+            Genre(name='Fantasy'),
+            Genre(name='Drama'),
+        ])
+
+    def test_list_books_query_count(self):
+        """Test listing books costs one query, reading genres from the row."""
+        for count in BOOK_COUNTS:
+            with self.subTest(count=count):
+                Book.objects.all().delete()
+                create_books(self.user, count, self.genres)
+
+                with self.assertNumQueries(1):
+                    res = self.client.get(BOOKS_URL, PAGE)
+
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                results = res.data['results']
+                self.assertEqual(len(results), min(count, PAGE['page_size']))
+                self.assertEqual(
+                    results[0]['genre_names'],
+                    ['Drama', 'Fantasy'],
+                )
+
+    def test_list_books_filtered_by_genre_query_count(self):
+        """Test genre filtering adds no queries."""
+        create_books(self.user, 50, self.genres)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(BOOKS_URL, {'genre': 'fantasy', **PAGE})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 50)
+
+    def test_retrieve_book_query_count(self):
+        """Test retrieving a book costs a query for ETag, book and genres."""
+        book = create_books(self.user, 1, self.genres)[0]
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(book.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['genres']), 2)
+
+    def test_retrieve_book_without_genres_query_count(self):
+        """Test omitting genres and text skips the genre query and column."""
+        book = create_books(self.user, 1, self.genres)[0]
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(
+                detail_url(book.id),
+                {'omit': 'genres,description'},
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # The first query computes the ETag.
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('"description"', queries[1]['sql'])
+
+    def test_list_books_sparse_fields_columns(self):
+        """Test listing sparse fields loads only their columns."""
+        create_books(self.user, 50, self.genres)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(BOOKS_URL, {'fields': 'id,title', **PAGE})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"core_book"."title"', queries[0]['sql'])
+        self.assertNotIn('"core_book"."author"', queries[0]['sql'])
+
+    def test_list_next_page_query_count(self):
+        """Test following the cursor costs the same as the first page."""
+        create_books(self.user, 500, self.genres)
+        res = self.client.get(BOOKS_URL)
+
+        while res.data['next']:
+            with self.assertNumQueries(1):
+                res = self.client.get(res.data['next'])
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_create_book_query_count(self):
+        """Test creating a book costs the same for one or many genres."""
+        self.client.force_authenticate(self.user)
+        Genre.objects.create(name='Existing')
+        for count in [1, 8]:
+            with self.subTest(count=count):
+                payload = {
+                    'title': 'title',
+                    'author': 'author',
+                    'location': 'location',
+                    'genres': [{'name': 'existing'}] + [
+                        {'name': f'genre {count} {i}'} for i in range(count)
+                    ],
+                }
+
+                with self.assertNumQueries(CREATE_BOOK_QUERIES):
+                    res = self.client.post(BOOKS_URL, payload, format='json')
+
+                self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+                self.assertEqual(len(res.data['genres']), count + 1)
+
+    @patch('django.conf.settings.BULK_IMPORT_CHUNK_SIZE', 100)
+    def test_bulk_import_query_count(self):
+        """Test bulk import costs a fixed number of queries per chunk."""
+        self.client.force_authenticate(self.user)
+        lines = ['title,author,location,genres'] + [
+            f'title {i},author {i},location,Fantasy;genre {i % 3}'
+            for i in range(250)
+        ]
+
+        # Each chunk runs in a transaction (a savepoint here) that inserts
+        # books, looks up genres, inserts links and updates search vectors.
+        # Only the first chunk has to insert and reload new genres.
+        with self.assertNumQueries(8 + 6 + 6):
+            res = self.client.post(
+                BULK_IMPORT_URL,
+                '\n'.join(lines),
+                content_type='text/csv',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 250)
+        self.assertEqual(Book.genres.through.objects.count(), 500)
+
+    def test_list_my_books_query_count(self):
+        """Test listing own books costs a query for ETag, books and genres."""
+        self.client.force_authenticate(self.user)
+        for count in BOOK_COUNTS:
+            with self.subTest(count=count):
+                Book.objects.all().delete()
+                create_books(self.user, count, self.genres)
+
+                with self.assertNumQueries(3):
+                    res = self.client.get(MY_BOOKS_URL, PAGE)
+
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                results = res.data['results']
+                self.assertEqual(len(results), min(count, PAGE['page_size']))
+
+    def test_inbox_query_count(self):
+        """Test the inbox costs one query however many interests exist."""
+        self.client.force_authenticate(self.user)
+        books = create_books(self.user, 20, self.genres)
+        readers = get_user_model().objects.bulk_create([
+            get_user_model()(email=f'reader{i}@example.com', name=f'r{i}')
+            for i in range(5)
+        ])
+        for book in books:
+            for reader in readers:
+                BookInterest.objects.create(book=book, interested_user=reader)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(INBOX_URL, PAGE)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 20)
+        self.assertEqual(res.data['results'][0]['interest_count'], 5)
+
+    def test_list_book_interests_query_count(self):
+        """Test listing interests costs one query however many exist."""
+        self.client.force_authenticate(self.user)
+        book = create_books(self.user, 1, self.genres)[0]
+        BookInterest.objects.bulk_create([
+            BookInterest(book=book, interested_user=self.user)
+            for _ in range(50)
+        ])
+
+        with self.assertNumQueries(1):
+            res = self.client.get(BOOK_INTERESTS_URL, PAGE)
+
+        self.assertEqual(len(res.data['results']), 50)
+        self.assertEqual(res.data['results'][0]['book_title'], book.title)
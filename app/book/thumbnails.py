@@ -0,0 +1,38 @@
+"""
+Thumbnail resizing for book images.
+
+The functions here run in worker processes, so this module imports only
+Pillow and can be imported without setting up Django.
+"""
+import io
+import sys
+
+from PIL import ExifTags, Image, ImageOps
+
+
+# EXIF orientations which turn the stored image by a quarter.
+TRANSPOSED = {5, 6, 7, 8}
+JPEG_QUALITY = 85
+
+
+def resize(data, width):
+    """Return the encoded image data scaled down to width, upright.
+
+    The thumbnail keeps the image's format. JPEG images are decoded
+    straight at a reduced scale, which is much faster than decoding them
+    whole.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        image_format = image.format
+        orientation = image.getexif().get(ExifTags.Base.Orientation)
+        if orientation in TRANSPOSED:
+            size = (sys.maxsize, width)
+        else:
+            size = (width, sys.maxsize)
+        image.thumbnail(size)
+        image = ImageOps.exif_transpose(image)
+
+    options = {'quality': JPEG_QUALITY} if image_format == 'JPEG' else {}
+    output = io.BytesIO()
+    image.save(output, format=image_format, **options)
+    return output.getvalue()
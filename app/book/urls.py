@@ -8,7 +8,7 @@ from django.urls import (
 
 from rest_framework.routers import DefaultRouter
 
-from book import views
+from book import async_views, views
 
 
 router = DefaultRouter()
@@ -18,7 +18,25 @@ app_name = 'book'
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('changes/', views.BookChangesView.as_view(), name='book-changes'),
     path('my-books/', views.UserBooksListView.as_view(), name='my-books'),
+    path(
+        'my-books/export/',
+        views.UserBooksExportView.as_view(),
+        name='my-books-export',
+    ),
+    path(
+        'my-books/inbox/',
+        views.UserBooksInboxView.as_view(),
+        name='my-books-inbox',
+    ),
+    path('async/books/', async_views.book_list, name='async-book-list'),
+    path(
+        'async/books/<int:pk>/',
+        async_views.book_detail,
+        name='async-book-detail',
+    ),
+    path('async/my-books/', async_views.my_books, name='async-my-books'),
     path(
         'book-interests/',
         views.BookInterestListCreateView.as_view(),
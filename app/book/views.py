@@ -1,31 +1,85 @@
 """
 Views for the book APIs
 """
-from rest_framework import viewsets, permissions
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db import transaction
+from django.db.models import Case, OuterRef, Value, When
+from django.db.models.functions import JSONObject
+from django.utils import timezone
+from rest_framework import (
+    exceptions,
+    parsers,
+    permissions,
+    status,
+    viewsets,
+)
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from rest_framework.generics import (
+    GenericAPIView,
     ListAPIView,
     ListCreateAPIView,
     UpdateAPIView,
 )
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import (
     IsAuthenticated,
     IsAuthenticatedOrReadOnly,
 )
-from django.db.models import Q
+from rest_framework.utils.urls import replace_query_param
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
     OpenApiParameter,
     OpenApiTypes,
 )
-from core.models import Book, BookInterest
-from book import serializers
+from core.authentication import CachedTokenAuthentication
+from core.models import Book, BookInterest, OutboxEvent
+from book import (
+    bulk,
+    caching,
+    changes,
+    images,
+    notifications,
+    serializers,
+)
+from book.caching import cache_response, conditional_response
+from book.export import export_response
+from book.fieldsets import only_requested
+from book.filters import filter_books
+from book.pagination import IdCursorPagination
+
+
+FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description='Comma separated fields to return',
+    ),
+    OpenApiParameter(
+        'omit',
+        OpenApiTypes.STR,
+        description='Comma separated fields to leave out',
+    ),
+]
+
+
+class BookUnavailable(exceptions.APIException):
+    """The book was already given away or withdrawn."""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'This book is no longer available.'
+    default_code = 'book_unavailable'
+
+
+class ImageTooLarge(exceptions.APIException):
+    """The uploaded image is larger than IMAGE_MAX_UPLOAD_SIZE."""
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'The image is too large.'
+    default_code = 'image_too_large'
 
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
     """custom permission to only allow owners to edit their own objects."""
-    def has_object_permission(self, request, obj):
+    def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
         return obj.user == request.user
@@ -33,7 +87,7 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
 
 class IsOwnerForBook(permissions.BasePermission):
     """Custom permission to only allow owners to edit book-related objects."""
-    def has_object_permission(self, request, obj):
+    def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
         return obj.book.user == request.user
@@ -42,6 +96,11 @@ class IsOwnerForBook(permissions.BasePermission):
 @extend_schema_view(
     list=extend_schema(
         parameters=[
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                description='Search title, author, genres and description',
+            ),
             OpenApiParameter(
                 'author',
                 OpenApiTypes.STR,
@@ -62,58 +121,281 @@ class IsOwnerForBook(permissions.BasePermission):
                 OpenApiTypes.STR,
                 description='Filter by Location',
             ),
+            OpenApiParameter(
+                'near',
+                OpenApiTypes.STR,
+                description='Filter by distance from latitude,longitude',
+            ),
+            OpenApiParameter(
+                'radius_km',
+                OpenApiTypes.NUMBER,
+                description='Distance for near in km (default 10)',
+            ),
+            OpenApiParameter(
+                'compact',
+                OpenApiTypes.BOOL,
+                description='Return only id, title, author, image and '
+                            'location',
+            ),
+            *FIELDSET_PARAMETERS,
         ]
-    )
+    ),
+    retrieve=extend_schema(parameters=FIELDSET_PARAMETERS),
 )
 class BookViewSet(viewsets.ModelViewSet):
     """Manage book."""
     serializer_class = serializers.BookSerializer
     queryset = Book.objects.all()
-    authentication_classes = [TokenAuthentication]
+    pagination_class = IdCursorPagination
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_permissions(self):
-        if self.action in ['update', 'partial_update', 'destroy']:
+        if self.action in [
+            'update', 'partial_update', 'destroy', 'upload_image',
+        ]:
             return [IsAuthenticated(), IsOwnerOrReadOnly()]
         return super().get_permissions()
 
+    def get_serializer_class(self):
+        if self.action == 'list':
+            if self.request.query_params.get('compact') in ('true', '1'):
+                return serializers.BookCompactSerializer
+            return serializers.BookListSerializer
+        return self.serializer_class
+
     def get_queryset(self):
-        queryset = Book.objects.filter(available=True).order_by('-id')
-        author = self.request.query_params.get('author')
-        genre = self.request.query_params.get('genre')
-        condition = self.request.query_params.get('condition')
-        location = self.request.query_params.get('location')
-
-        if author:
-            queryset = queryset.filter(Q(author=author))
-        if genre:
-            queryset = queryset.filter(genres__name__icontains=genre)
-        if condition:
-            queryset = queryset.filter(Q(condition=condition))
-        if location:
-            queryset = queryset.filter(Q(location=location))
-
-        return queryset
+        queryset = Book.objects.filter(
+            available=True,
+        ).defer('search_vector').order_by('-id')
+        if self.action in ('list', 'retrieve'):
+            queryset = only_requested(
+                queryset,
+                self.request.query_params,
+                self.get_serializer_class(),
+            )
+        else:
+            queryset = queryset.select_related(
+                'uploaded_image',
+            ).prefetch_related('genres')
+        q = self.request.query_params.get('q')
+
+        if q:
+            queryset = queryset.search(q)
+
+        return filter_books(queryset, self.request.query_params)
+
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    def get_retrieve_queryset(self):
+        """Return the queryset of the book a detail request retrieves."""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return self.get_queryset().filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]},
+        )
+
+    @conditional_response(get_retrieve_queryset)
+    @cache_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        # Commit the book with its genres and derived fields at once, so
+        # no reader sees it without them.
+        with transaction.atomic():
+            serializer.save(user=self.request.user)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+    @extend_schema(
+        request={
+            media_type: OpenApiTypes.STR for media_type in bulk.ROW_READERS
+        },
+        responses={
+            201: OpenApiTypes.OBJECT,
+            400: OpenApiTypes.OBJECT,
+        },
+    )
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk_import(self, request):
+        """Import books streamed as CSV or newline-delimited JSON."""
+        media_type = request.content_type.split(';')[0].strip()
+        read_rows = bulk.ROW_READERS.get(media_type)
+        if read_rows is None:
+            raise exceptions.UnsupportedMediaType(media_type)
+
+        result = bulk.import_books(
+            read_rows(request.stream or []),
+            request.user,
+        )
+        if result['created'] or not result['errors']:
+            return Response(result, status=status.HTTP_201_CREATED)
+        return Response(result, status=status.HTTP_400_BAD_REQUEST)
+
+    @extend_schema(
+        request={'multipart/form-data': serializers.BookImageUploadSerializer},
+        responses={
+            200: serializers.BookSerializer,
+            400: OpenApiTypes.OBJECT,
+            413: OpenApiTypes.OBJECT,
+        },
+    )
+    @action(
+        methods=['POST'],
+        detail=True,
+        url_path='image',
+        parser_classes=[parsers.MultiPartParser],
+    )
+    def upload_image(self, request, pk=None):
+        """Upload an image of the book, replacing its image URL.
+
+        The file is streamed to disk and hashed rather than read into
+        memory, and identical images are stored once.
+        """
+        book = self.get_object()
+        handler = images.HashingUploadHandler(request)
+        request.upload_handlers = [handler]
+        serializer = serializers.BookImageUploadSerializer(data=request.data)
+        if handler.too_large:
+            raise ImageTooLarge()
+        serializer.is_valid(raise_exception=True)
+
+        book.uploaded_image = images.store(serializer.validated_data['image'])
+        book.image = None
+        Book.objects.filter(pk=book.pk).update(
+            uploaded_image=book.uploaded_image,
+            image=None,
+            updated_at=timezone.now(),
+        )
+        caching.invalidate()
+        return Response(self.get_serializer(book).data)
 
+    @extend_schema(responses={(200, 'application/x-ndjson'): OpenApiTypes.STR})
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        """Stream every matching book as newline-delimited JSON."""
+        return export_response(self.get_queryset(), 'books.ndjson')
 
+
+class BookChangesView(GenericAPIView):
+    """API endpoint listing catalogue changes since a sync token."""
+    serializer_class = serializers.BookSerializer
+    pagination_class = IdCursorPagination
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'since',
+                OpenApiTypes.STR,
+                description='Sync token of a previous response',
+            ),
+            OpenApiParameter('page_size', OpenApiTypes.INT),
+        ],
+        responses={200: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT},
+    )
+    def get(self, request):
+        """Return books changed since `since`, and ids of removed books.
+
+        Mirrors follow `next` until it is null and keep the last
+        `sync_token` for their next sync. A book may be repeated on later
+        pages; its last state wins.
+        """
+        since = request.query_params.get('since', changes.START_TOKEN)
+        page_size = self.paginator.get_page_size(request)
+        page = changes.changes_since(since, page_size + 1)
+        has_next = len(page) > page_size
+        page = page[:page_size]
+        token = changes.format_token(page[-1]) if page else since
+        books, removed = changes.changed_books(page)
+
+        return Response({
+            'sync_token': token,
+            'next': replace_query_param(
+                request.build_absolute_uri(),
+                'since',
+                token,
+            ) if has_next else None,
+            'results': self.get_serializer(books, many=True).data,
+            'removed': removed,
+        })
+
+
+@extend_schema_view(get=extend_schema(parameters=FIELDSET_PARAMETERS))
 class UserBooksListView(ListAPIView):
     """API endpoint for listing books owned by the authenticated user."""
     serializer_class = serializers.BookSerializer
     queryset = Book.objects.all()
-    authentication_classes = [TokenAuthentication]
+    pagination_class = IdCursorPagination
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return only_requested(
+            self.queryset.filter(user=self.request.user).order_by('-id'),
+            self.request.query_params,
+            self.serializer_class,
+        )
+
+    @conditional_response(get_queryset)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+
+class UserBooksExportView(GenericAPIView):
+    """API endpoint streaming all books owned by the authenticated user."""
+    queryset = Book.objects.all()
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+        return self.queryset.filter(
+            user=self.request.user,
+        ).defer('search_vector').select_related(
+            'uploaded_image',
+        ).prefetch_related('genres').order_by('-id')
+
+    @extend_schema(responses={(200, 'application/x-ndjson'): OpenApiTypes.STR})
+    def get(self, request):
+        return export_response(self.get_queryset(), 'my-books.ndjson')
+
+
+class UserBooksInboxView(ListAPIView):
+    """API endpoint listing the user's books with their interests."""
+    serializer_class = serializers.BookInboxSerializer
+    queryset = Book.objects.all()
+    pagination_class = IdCursorPagination
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    recent_users = 3
+
+    def get_queryset(self):
+        recent_interests = BookInterest.objects.filter(
+            book=OuterRef('pk'),
+        ).order_by('-id').values(user=JSONObject(
+            id='interested_user_id',
+            name='interested_user__name',
+        ))[:self.recent_users]
+
+        return self.queryset.filter(
+            user=self.request.user,
+        ).only(
+            'id', 'title', 'available', 'interest_count',
+        ).annotate(
+            recent_interested_users=ArraySubquery(recent_interests),
+        ).order_by('-id')
 
 
 class BookInterestListCreateView(ListCreateAPIView):
     """API endpoint for listing and creating book interests."""
     queryset = BookInterest.objects.all()
-    authentication_classes = [TokenAuthentication]
+    pagination_class = IdCursorPagination
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_serializer_class(self):
@@ -125,18 +407,69 @@ class BookInterestListCreateView(ListCreateAPIView):
             return serializers.OwnerBookInterestSerializer
 
     def perform_create(self, serializer):
-        serializer.save(interested_user=self.request.user)
+        with transaction.atomic():
+            interest = serializer.save(interested_user=self.request.user)
+            notifications.record(OutboxEvent.INTEREST_ADDED, interest)
 
     def get_queryset(self):
-        return self.queryset.filter(book__user=self.request.user).order_by('-id')  # noqa: E501
+        return self.queryset.filter(
+            book__user=self.request.user,
+        ).select_related('book', 'interested_user').defer(
+            'book__search_vector',
+        ).order_by('-id')
 
 
 class BookInterestUpdateView(UpdateAPIView):
     """API endpoint for updating book interests."""
     queryset = BookInterest.objects.all()
     serializer_class = serializers.OwnerBookInterestSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsOwnerForBook]
 
     def perform_update(self, serializer):
-        serializer.save(chosen_by_owner=True)
+        """Choose the interest as recipient and reject all the others.
+
+        The book row is locked so concurrent choices for one book are
+        serialized and only the first of them succeeds. The other
+        interests are rejected in the same transaction, and all interested
+        users are notified in digests.
+        """
+        interest = serializer.instance
+        with transaction.atomic():
+            book = Book.objects.select_for_update().only('available').get(
+                pk=interest.book_id,
+            )
+            if not book.available:
+                if BookInterest.objects.filter(
+                    pk=interest.pk,
+                    chosen_by_owner=True,
+                ).exists():
+                    return
+                raise BookUnavailable()
+
+            # A book relisted after an earlier choice keeps that choice;
+            # clear it first, as the one-chosen-per-book index is checked
+            # row by row.
+            BookInterest.objects.filter(
+                book_id=book.pk,
+                chosen_by_owner=True,
+            ).exclude(pk=interest.pk).update(chosen_by_owner=False)
+            BookInterest.objects.filter(book_id=book.pk).update(
+                chosen_by_owner=Case(
+                    When(pk=interest.pk, then=Value(True)),
+                    default=Value(False),
+                ),
+                rejected_by_owner=Case(
+                    When(pk=interest.pk, then=Value(False)),
+                    default=Value(True),
+                ),
+            )
+            Book.objects.filter(pk=book.pk).update(
+                available=False,
+                updated_at=timezone.now(),
+            )
+            caching.invalidate()
+            notifications.record(OutboxEvent.RECIPIENT_CHOSEN, interest)
+
+        interest.chosen_by_owner = True
+        interest.rejected_by_owner = False
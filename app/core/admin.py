@@ -44,5 +44,23 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class BookInterestAdmin(admin.ModelAdmin):
+    """Define the admin pages for book interests."""
+    ordering = ['-id']
+    list_display = ['__str__', 'chosen_by_owner', 'rejected_by_owner']
+    list_select_related = ['book', 'interested_user']
+    raw_id_fields = ['book', 'interested_user']
+
+
+class TaskAdmin(admin.ModelAdmin):
+    """Define the admin pages for queued and failed tasks."""
+    ordering = ['run_at', 'id']
+    list_display = ['__str__', 'attempts', 'max_attempts', 'run_at', 'failed']
+    list_filter = ['failed', 'name']
+    readonly_fields = ['created_at']
+
+
 admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Book)
+admin.site.register(models.BookInterest, BookInterestAdmin)
+admin.site.register(models.Task, TaskAdmin)
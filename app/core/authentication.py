@@ -0,0 +1,120 @@
+"""
+Authentication classes.
+"""
+import copy
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenUserCache:
+    """Cache of users by token key.
+
+    Users are kept in a bounded in-process LRU for TOKEN_CACHE_TTL seconds
+    and, when TOKEN_CACHE_ALIAS names a cache, in that shared cache too.
+    Each user loaded is stamped, and an in-process entry is used only
+    while the shared cache holds the same stamp for its key, so
+    `invalidate` deleting the shared entry drops the user from every
+    process sharing the cache.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        """Return the shared cache, if one is configured."""
+        alias = settings.TOKEN_CACHE_ALIAS
+        return caches[alias] if alias else None
+
+    def get_or_load(self, key, load):
+        """Return the user for key, calling load() on a cache miss."""
+        shared_entry = None
+        if self.shared:
+            shared_entry = self.shared.get(self._shared_key(key))
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > now and (
+                not self.shared
+                or shared_entry is not None and shared_entry[1] == entry[2]
+            ):
+                self._entries.move_to_end(key)
+                return copy.copy(entry[0])
+
+        if shared_entry is not None:
+            user, stamp = shared_entry
+        else:
+            user = load()
+            stamp = time.time_ns()
+            if self.shared:
+                self.shared.set(
+                    self._shared_key(key),
+                    (user, stamp),
+                    settings.TOKEN_CACHE_TTL,
+                )
+
+        with self._lock:
+            self._entries[key] = (
+                user,
+                now + settings.TOKEN_CACHE_TTL,
+                stamp,
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.TOKEN_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+        return copy.copy(user)
+
+    def invalidate(self, *keys):
+        """Drop the users cached for token keys now and on commit.
+
+        The second drop removes users cached by requests that loaded the
+        old row before the transaction committed.
+        """
+        self._drop(keys)
+        transaction.on_commit(functools.partial(self._drop, keys))
+
+    def _drop(self, keys):
+        """Drop the users cached for token keys."""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        if self.shared and keys:
+            self.shared.delete_many([self._shared_key(key) for key in keys])
+
+    def clear(self):
+        """Drop the users cached in this process."""
+        with self._lock:
+            self._entries.clear()
+
+    def _shared_key(self, key):
+        """Return the shared cache key for a token key."""
+        return f'auth-token:user:{key}'
+
+
+token_user_cache = TokenUserCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token to user lookup."""
+
+    def authenticate_credentials(self, key):
+        user = token_user_cache.get_or_load(
+            key,
+            lambda: self._load_user(key),
+        )
+        return (user, Token(key=key, user=user))
+
+    def _load_user(self, key):
+        """Look up the active user for key in the database."""
+        return super().authenticate_credentials(key)[0]
@@ -0,0 +1,218 @@
+"""
+PostgreSQL backend with connection metrics and an optional process-wide
+connection pool.
+
+Set POOL_SIZE in the database settings to share up to that many
+connections between the threads of a process. Closing a connection then
+returns it to the pool instead of disconnecting, so use it with
+CONN_MAX_AGE = 0 to give connections back at the end of each request.
+"""
+import threading
+import time
+
+from django.db.backends.postgresql import base
+from django.db.utils import OperationalError
+from psycopg2.extensions import (
+    TRANSACTION_STATUS_IDLE,
+    TRANSACTION_STATUS_UNKNOWN,
+)
+
+from core.metrics import Counter, Gauge, Histogram, registry
+
+
+CHECKOUT_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0,
+)
+
+connections_opened = registry.register(Counter(
+    'db_connections_opened_total',
+    'Database connections opened.',
+    ['alias'],
+))
+connection_setup_duration = registry.register(Histogram(
+    'db_connection_setup_seconds',
+    'Time spent opening database connections.',
+    ['alias'],
+    buckets=CHECKOUT_BUCKETS,
+))
+pool_in_use = registry.register(Gauge(
+    'db_pool_connections_in_use',
+    'Pooled connections checked out by threads.',
+    ['alias'],
+))
+pool_idle = registry.register(Gauge(
+    'db_pool_connections_idle',
+    'Pooled connections open and waiting to be checked out.',
+    ['alias'],
+))
+pool_waiting = registry.register(Gauge(
+    'db_pool_waiting',
+    'Threads waiting for a pooled connection.',
+    ['alias'],
+))
+pool_checkout_duration = registry.register(Histogram(
+    'db_pool_checkout_seconds',
+    'Time spent getting a connection from the pool, including waiting.',
+    ['alias'],
+    buckets=CHECKOUT_BUCKETS,
+))
+
+
+class ConnectionPool:
+    """Bounded pool of psycopg2 connections shared by threads."""
+
+    def __init__(self, alias, size, timeout, health_checks):
+        self.alias = alias
+        self.size = size
+        self.timeout = timeout
+        self.health_checks = health_checks
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.waiting = 0
+
+    def checkout(self, connect):
+        """Return an idle connection, or one from connect() if none is.
+
+        Waits up to timeout seconds when size connections are in use.
+        """
+        start = time.perf_counter()
+        self._update(waiting=1)
+        try:
+            acquired = self._slots.acquire(timeout=self.timeout)
+        finally:
+            self._update(waiting=-1)
+        if not acquired:
+            raise OperationalError(
+                f'Timed out after {self.timeout}s waiting for a connection '
+                f'from the {self.alias!r} pool.'
+            )
+
+        try:
+            connection = self._pop_usable()
+            if connection is None:
+                connection = connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+        self._update(in_use=1)
+        pool_checkout_duration.observe(
+            time.perf_counter() - start,
+            alias=self.alias,
+        )
+        return connection
+
+    def checkin(self, connection):
+        """Return connection to the pool, rolling back open transactions.
+
+        Idle connections are kept in autocommit mode.
+        """
+        try:
+            status = connection.info.transaction_status
+            if status == TRANSACTION_STATUS_UNKNOWN:
+                connection.close()
+            elif status != TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            if not connection.closed:
+                connection.autocommit = True
+                with self._lock:
+                    self._idle.append(connection)
+        finally:
+            self._update(in_use=-1)
+            self._slots.release()
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+        self._update()
+
+    def _pop_usable(self):
+        """Return the most recently used idle connection that still works."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection = self._idle.pop()
+            if connection.closed:
+                continue
+            if not self.health_checks:
+                return connection
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                return connection
+            except base.Database.Error:
+                connection.close()
+
+    def _update(self, in_use=0, waiting=0):
+        """Adjust the counters and publish them as gauges."""
+        with self._lock:
+            self.in_use += in_use
+            self.waiting += waiting
+            idle = len(self._idle)
+        pool_in_use.set(self.in_use, alias=self.alias)
+        pool_waiting.set(self.waiting, alias=self.alias)
+        pool_idle.set(idle, alias=self.alias)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    """Return the pool of alias, creating it on first use."""
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(
+                alias,
+                settings_dict['POOL_SIZE'],
+                settings_dict.get('POOL_TIMEOUT', 10),
+                settings_dict.get('CONN_HEALTH_CHECKS', False),
+            )
+        return _pools[alias]
+
+
+def close_pool(alias):
+    """Close the idle connections of alias and forget its pool."""
+    with _pools_lock:
+        pool = _pools.pop(alias, None)
+    if pool:
+        pool.close()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL connection recording setup time and optionally pooled."""
+
+    @property
+    def pool(self):
+        """Return the connection pool, if POOL_SIZE enables one."""
+        if not self.settings_dict.get('POOL_SIZE'):
+            return None
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        if self.pool is None:
+            return self._connect(conn_params)
+        return self.pool.checkout(lambda: self._connect(conn_params))
+
+    def _connect(self, conn_params):
+        """Open a new connection, recording the time it took."""
+        start = time.perf_counter()
+        connection = super().get_new_connection(conn_params)
+        connections_opened.inc(alias=self.alias)
+        connection_setup_duration.observe(
+            time.perf_counter() - start,
+            alias=self.alias,
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None or self.pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            self.pool.checkin(self.connection)
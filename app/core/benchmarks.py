@@ -0,0 +1,72 @@
+"""
+Timing helpers shared by the benchmark and load test commands.
+"""
+import contextlib
+import statistics
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.test.utils import (
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+
+def percentile(sorted_values, fraction):
+    """Return the value at fraction (0-1) of an ascending list."""
+    if not sorted_values:
+        return None
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def milliseconds(seconds):
+    """Convert seconds to rounded milliseconds."""
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def summarize(latencies, elapsed):
+    """Return the throughput and latency percentiles of requests.
+
+    latencies are the seconds each successful request took and elapsed
+    the seconds all requests took together.
+    """
+    latencies = sorted(latencies)
+    return {
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': milliseconds(percentile(latencies, 0.5)),
+        'p90_ms': milliseconds(percentile(latencies, 0.9)),
+        'p99_ms': milliseconds(percentile(latencies, 0.99)),
+        'mean_ms': milliseconds(
+            statistics.mean(latencies) if latencies else None,
+        ),
+    }
+
+
+def http_get(url, headers=None):
+    """GET url and return the status and headers of the response.
+
+    A server that cannot be reached is reported as status 599.
+    """
+    try:
+        with urlopen(Request(url, headers=headers or {}), timeout=30) as res:
+            res.read()
+            return res.status, res.headers
+    except HTTPError as error:
+        return error.code, error.headers
+    except (URLError, OSError):
+        return 599, None
+
+
+@contextlib.contextmanager
+def test_environment():
+    """Set up the test environment unless a test already did."""
+    try:
+        setup_test_environment()
+    except RuntimeError:
+        yield
+        return
+    try:
+        yield
+    finally:
+        teardown_test_environment()
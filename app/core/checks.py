@@ -0,0 +1,20 @@
+"""
+System checks of the deployment settings.
+"""
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register(deploy=True)
+def check_replica_cache(app_configs, **kwargs):
+    """Warn when replica pins and cache bumps cannot cross processes."""
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.REPLICA_DATABASES and backend.endswith('LocMemCache'):
+        return [Warning(
+            'Read replicas are configured with a process-local cache.',
+            hint='Clients are pinned to the primary after writing only in '
+                 'the process that served the write. Set CACHE_BACKEND to '
+                 'a cache shared by all processes, such as Redis.',
+            id='core.W001',
+        )]
+    return []
@@ -0,0 +1,77 @@
+"""
+Coordinate search on plain PostgreSQL, without PostGIS.
+
+Candidates are found with an indexed latitude/longitude bounding box and
+then filtered by their exact great-circle (haversine) distance.
+"""
+import csv
+import math
+from pathlib import Path
+
+from django.db.models import F, Value
+from django.db.models.functions import (
+    ASin,
+    Cos,
+    Least,
+    Power,
+    Radians,
+    Sin,
+    Sqrt,
+)
+
+
+EARTH_RADIUS_KM = 6371.0088
+GAZETTEER_PATH = Path(__file__).resolve().parent / 'data' / 'gazetteer.csv'
+
+
+def normalize_place_name(name):
+    """Return the gazetteer key of a free-text location like 'Gori, GE'."""
+    return name.split(',')[0].strip().lower()
+
+
+def read_gazetteer(path=GAZETTEER_PATH):
+    """Yield the name, latitude and longitude of each place in a CSV file.
+
+    The file needs a header row with name, latitude and longitude columns.
+    """
+    with open(path, newline='', encoding='utf-8') as gazetteer:
+        for row in csv.DictReader(gazetteer):
+            yield (
+                normalize_place_name(row['name']),
+                float(row['latitude']),
+                float(row['longitude']),
+            )
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """Return the latitude and longitude ranges within radius_km of a point.
+
+    Longitudes are a list of ranges, split in two when the box crosses the
+    antimeridian.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    south = latitude - math.degrees(angle)
+    north = latitude + math.degrees(angle)
+    if south <= -90 or north >= 90:
+        return max(south, -90), min(north, 90), [(-180, 180)]
+
+    ratio = math.sin(angle) / math.cos(math.radians(latitude))
+    if ratio >= 1:
+        return south, north, [(-180, 180)]
+    spread = math.degrees(math.asin(ratio))
+    west, east = longitude - spread, longitude + spread
+    if west < -180:
+        return south, north, [(west + 360, 180), (-180, east)]
+    if east > 180:
+        return south, north, [(west, 180), (-180, east - 360)]
+    return south, north, [(west, east)]
+
+
+def haversine_km(latitude, longitude):
+    """Return the distance of each row's coordinates from a point in km."""
+    half_chord = (
+        Power(Sin(Radians(F('latitude') - latitude) / 2), 2) +
+        Cos(Radians(Value(latitude))) * Cos(Radians(F('latitude'))) *
+        Power(Sin(Radians(F('longitude') - longitude) / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * ASin(Least(Sqrt(half_chord), Value(1.0)))
@@ -0,0 +1,91 @@
+"""
+Password hashers with configurable cost, and hashing off the event loop.
+
+The cost parameters are read from settings, so a changed cost makes
+Django rehash passwords on the next successful login.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Argon2id hasher using the PASSWORD_ARGON2_* settings."""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class BCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    """bcrypt hasher using the PASSWORD_BCRYPT_ROUNDS setting."""
+
+    @property
+    def rounds(self):
+        return settings.PASSWORD_BCRYPT_ROUNDS
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2 hasher using the PASSWORD_PBKDF2_ITERATIONS setting."""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the thread pool that hashes passwords for async views."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                thread_name_prefix='password-hash',
+            )
+        return _executor
+
+
+async def run_hasher(func, *args):
+    """Run func(*args) in the hashing thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(),
+        functools.partial(func, *args),
+    )
+
+
+def _verify(password, encoded):
+    """Return whether password matches encoded and needs rehashing."""
+    rehash = []
+    valid = hashers.check_password(password, encoded, setter=rehash.append)
+    return valid, bool(rehash)
+
+
+async def acheck_password(user, password):
+    """Return whether password is the password of user.
+
+    The hash is checked in the hashing thread pool, leaving the threads
+    running sync views and queries free, and is upgraded to the preferred
+    hasher and cost when it uses another.
+    """
+    valid, rehash = await run_hasher(_verify, password, user.password)
+    if rehash:
+        user.password = await run_hasher(hashers.make_password, password)
+        await user.asave(update_fields=['password'])
+    return valid
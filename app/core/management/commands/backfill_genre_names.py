@@ -0,0 +1,41 @@
+"""
+Django command to populate the denormalized genre names of books.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Book
+
+
+class Command(BaseCommand):
+    """Django command to rebuild Book.genre_names in batches."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of books updated per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        last_id = 0
+        updated = 0
+        while True:
+            ids = list(
+                Book.objects.filter(pk__gt=last_id).order_by('pk').values_list(
+                    'pk',
+                    flat=True,
+                )[:options['batch_size']]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                updated += Book.objects.filter(
+                    pk__in=ids,
+                ).update_genre_names()
+            last_id = ids[-1]
+            self.stdout.write(f'Updated {updated} books...')
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {updated} books.'))
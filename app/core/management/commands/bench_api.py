@@ -0,0 +1,155 @@
+"""
+Django command to benchmark the book and user API endpoints.
+"""
+import contextlib
+import json
+import re
+import time
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.benchmarks import http_get, summarize, test_environment
+from core.models import Book
+
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def _with_params(url, **params):
+    """Return url with params as its query string."""
+    return f'{url}?{urlencode(params)}'
+
+
+def get_endpoints(book):
+    """Return the name and path of every benchmarked endpoint."""
+    books_url = reverse('book:book-list')
+    genre = book.genre_names[0] if book.genre_names else 'fantasy'
+    return {
+        'book-list': books_url,
+        'book-list-genre': _with_params(books_url, genre=genre),
+        'book-list-author': _with_params(books_url, author=book.author),
+        'book-search': _with_params(books_url, q=book.title),
+        'book-detail': reverse('book:book-detail', args=[book.id]),
+        'async-book-list': reverse('book:async-book-list'),
+        'my-books': reverse('book:my-books'),
+        'my-books-inbox': reverse('book:my-books-inbox'),
+        'book-interests': reverse('book:book-interest-list-create'),
+        'user-me': reverse('user:me'),
+    }
+
+
+def _query_count(server_timing):
+    """Return the query count reported in a Server-Timing header."""
+    match = SERVER_TIMING_QUERIES.search(server_timing or '')
+    return int(match.group(1)) if match else None
+
+
+class Command(BaseCommand):
+    """Django command to report throughput, latency and query counts."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Number of sequential requests sent to each endpoint.',
+        )
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running server; by default requests go '
+                 'through the Django test client in this process.',
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Disable the book response cache (test client only).',
+        )
+        parser.add_argument(
+            '--label',
+            help='Label stored with the results, such as a commit hash.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        book = Book.objects.filter(available=True).order_by('-id').first()
+        if book is None:
+            raise CommandError('No books to benchmark; run seed_books first.')
+        token, _ = Token.objects.get_or_create(user_id=book.user_id)
+        endpoints = get_endpoints(book)
+
+        with contextlib.ExitStack() as stack:
+            if options['url']:
+                send = self._http_sender(options['url'], token.key)
+            else:
+                stack.enter_context(test_environment())
+                if options['no_cache']:
+                    stack.enter_context(
+                        override_settings(BOOK_CACHE_TIMEOUT=0),
+                    )
+                send = self._client_sender(token.key)
+
+            results = [
+                self._bench(name, path, send, options['requests'])
+                for name, path in endpoints.items()
+            ]
+
+        self.stdout.write(json.dumps({
+            'label': options['label'],
+            'mode': 'http' if options['url'] else 'test-client',
+            'cache': not options['no_cache'],
+            'results': results,
+        }, indent=2))
+
+    def _bench(self, name, path, send, requests):
+        """Send requests to path and summarize the responses."""
+        send(path)
+        latencies, queries, errors = [], [], 0
+        start = time.perf_counter()
+        for _ in range(requests):
+            request_start = time.perf_counter()
+            status, server_timing = send(path)
+            if status >= 400:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - request_start)
+            queries.append(_query_count(server_timing))
+        elapsed = time.perf_counter() - start
+
+        counted = [count for count in queries if count is not None]
+        return {
+            'endpoint': name,
+            'path': path,
+            'requests': requests,
+            'errors': errors,
+            **summarize(latencies, elapsed),
+            'queries': max(counted) if counted else None,
+        }
+
+    def _client_sender(self, token):
+        """Return a function sending GET requests with the test client."""
+        client = Client(HTTP_AUTHORIZATION=f'Token {token}')
+
+        def send(path):
+            response = client.get(path)
+            return response.status_code, response.get('Server-Timing')
+
+        return send
+
+    def _http_sender(self, base_url, token):
+        """Return a function sending GET requests to a running server."""
+        headers = {'Authorization': f'Token {token}'}
+
+        def send(path):
+            status, response_headers = http_get(
+                base_url.rstrip('/') + path,
+                headers,
+            )
+            if status >= 400:
+                return status, None
+            return status, response_headers['Server-Timing']
+
+        return send
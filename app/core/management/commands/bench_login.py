@@ -0,0 +1,91 @@
+"""
+Django command to benchmark logins with each configured password hasher.
+"""
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, get_hashers
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.benchmarks import milliseconds, test_environment
+
+
+PASSWORD = 'bench-login-pass123'
+
+
+class Command(BaseCommand):
+    """Django command to report logins per second per core."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--logins',
+            type=int,
+            default=20,
+            help='Number of sequential logins per hasher.',
+        )
+        parser.add_argument(
+            '--label',
+            help='Label stored with the results, such as a commit hash.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        results = []
+        with test_environment():
+            for hasher, path in zip(get_hashers(), settings.PASSWORD_HASHERS):
+                try:
+                    if hasher.library:
+                        hasher._load_library()
+                except ValueError as error:
+                    self.stderr.write(f'Skipping {hasher.algorithm}: {error}')
+                    continue
+                with override_settings(PASSWORD_HASHERS=[path]):
+                    results.append(
+                        self._bench(hasher.algorithm, options['logins']),
+                    )
+
+        self.stdout.write(json.dumps({
+            'label': options['label'],
+            'results': results,
+        }, indent=2))
+
+    def _bench(self, algorithm, logins):
+        """Log in logins times and time the hashing and the requests."""
+        client = Client()
+        payload = {'email': f'bench-{algorithm}@example.com'}
+
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                password=PASSWORD,
+                **payload,
+            )
+            payload['password'] = PASSWORD
+
+            verify = []
+            for _ in range(logins):
+                start = time.perf_counter()
+                check_password(PASSWORD, user.password)
+                verify.append(time.perf_counter() - start)
+
+            errors = 0
+            start = time.perf_counter()
+            for _ in range(logins):
+                response = client.post(reverse('user:token'), payload)
+                errors += response.status_code != 200
+            elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+
+        return {
+            'hasher': algorithm,
+            'hash': user.password.rsplit('$', 2)[0],
+            'logins': logins,
+            'errors': errors,
+            'verify_ms': milliseconds(statistics.mean(verify)),
+            'logins_per_second_per_core': round(logins / elapsed, 1),
+        }
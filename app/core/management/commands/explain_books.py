@@ -0,0 +1,94 @@
+"""
+Django command to print query plans for the book filter paths.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.expressions import ArraySubquery
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import OuterRef
+
+from core.models import Book, BookInterest
+
+
+SEED_SQL = """
+    INSERT INTO core_book (
+        user_id, title, author, description, available,
+        location, condition, image, genre_names, interest_count,
+        latitude, longitude, updated_at
+    )
+    SELECT
+        %s,
+        'Book ' || g,
+        'Author ' || (g %% 5000),
+        '',
+        g %% 10 <> 0,
+        'Location ' || (g %% 500),
+        (ARRAY['new', 'good', 'fair'])[g %% 3 + 1],
+        NULL,
+        '{}',
+        0,
+        41 + (g %% 997) / 500.0,
+        40 + (g %% 991) / 150.0,
+        NOW()
+    FROM generate_series(1, %s) AS g
+"""
+
+
+def get_access_paths(user):
+    """Return the book and interest querysets served by the book APIs."""
+    books = Book.objects.filter(available=True).order_by('-id')
+    return {
+        'list': books,
+        'author': books.filter(author='Author 42'),
+        'condition': books.filter(condition='fair'),
+        'location': books.filter(location='Location 42'),
+        'search': books.search('Author 42'),
+        'near': books.near(42.0, 43.5, 10),
+        'my-books': Book.objects.filter(user=user).order_by('-id'),
+        'inbox': Book.objects.filter(user=user).annotate(
+            recent_interests=ArraySubquery(BookInterest.objects.filter(
+                book=OuterRef('pk'),
+            ).order_by('-id').values('id')[:3]),
+        ).order_by('-id'),
+        'book-interests': BookInterest.objects.filter(
+            book__user=user,
+        ).order_by('-id'),
+    }
+
+
+class Command(BaseCommand):
+    """Django command to seed books and explain the filter queries."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Number of books to insert before explaining.',
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=21,
+            help='LIMIT applied to each query, as a cursor page would.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        user, _ = get_user_model().objects.get_or_create(
+            email='explain-books@example.com',
+        )
+        if options['seed']:
+            self.stdout.write(f"Seeding {options['seed']} books...")
+            with connection.cursor() as cursor:
+                cursor.execute(SEED_SQL, [user.id, options['seed']])
+                Book.objects.filter(
+                    search_vector__isnull=True,
+                ).update_search_vector()
+                cursor.execute('ANALYZE core_book')
+
+        for name, queryset in get_access_paths(user).items():
+            self.stdout.write(self.style.SUCCESS(f'== {name}'))
+            self.stdout.write(
+                queryset[:options['page_size']].explain(analyze=True)
+            )
@@ -0,0 +1,62 @@
+"""
+Django command to load a gazetteer and locate books with it.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.geo import GAZETTEER_PATH, read_gazetteer
+from core.models import Book, Place
+
+
+class Command(BaseCommand):
+    """Django command to load places and set book coordinates in batches."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=GAZETTEER_PATH,
+            help='CSV file with name, latitude and longitude columns '
+                 '(default: the bundled gazetteer).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of books updated per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        places = {
+            name: Place(name=name, latitude=latitude, longitude=longitude)
+            for name, latitude, longitude in read_gazetteer(options['path'])
+        }
+        Place.objects.bulk_create(
+            places.values(),
+            batch_size=5000,
+            update_conflicts=True,
+            unique_fields=['name'],
+            update_fields=['latitude', 'longitude'],
+        )
+        self.stdout.write(f'Loaded {len(places)} places.')
+
+        last_id = 0
+        updated = 0
+        while True:
+            ids = list(
+                Book.objects.filter(pk__gt=last_id).order_by('pk').values_list(
+                    'pk',
+                    flat=True,
+                )[:options['batch_size']]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                updated += Book.objects.filter(
+                    pk__in=ids,
+                ).update_coordinates()
+            last_id = ids[-1]
+            self.stdout.write(f'Located {updated} books...')
+
+        self.stdout.write(self.style.SUCCESS(f'Located {updated} books.'))
@@ -0,0 +1,70 @@
+"""
+Django command to load test a running API server.
+"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import http_get, summarize
+
+
+def timed_get(url, headers):
+    """GET url and return the latency in seconds, or None on failure."""
+    start = time.perf_counter()
+    status, _ = http_get(url, headers)
+    if status >= 400:
+        return None
+    return time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    """Django command to measure throughput and latency of API endpoints."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='URLs to request.')
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=1000,
+            help='Number of requests sent to each URL.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help='Number of requests in flight at once.',
+        )
+        parser.add_argument(
+            '--token',
+            help='API token sent in the Authorization header.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f"Token {options['token']}"
+
+        results = []
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            for url in options['urls']:
+                start = time.perf_counter()
+                latencies = list(executor.map(
+                    lambda _: timed_get(url, headers),
+                    range(options['requests']),
+                ))
+                elapsed = time.perf_counter() - start
+                ok = [
+                    latency for latency in latencies if latency is not None
+                ]
+                results.append({
+                    'url': url,
+                    'requests': options['requests'],
+                    'concurrency': options['concurrency'],
+                    'errors': len(latencies) - len(ok),
+                    **summarize(ok, elapsed),
+                })
+
+        self.stdout.write(json.dumps(results, indent=2))
@@ -0,0 +1,128 @@
+"""
+Django command to run background tasks from the database queue.
+"""
+import signal
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from core.metrics import registry
+from core.tasks import DatabaseBackend, run_startup_hooks
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serve the worker's metrics in the Prometheus text format."""
+
+    def do_GET(self):
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header(
+            'Content-Type',
+            'text/plain; version=0.0.4; charset=utf-8',
+        )
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    """Django command to run queued tasks in a number of threads."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=settings.TASK_CONCURRENCY,
+            help='Number of tasks run at once, each in its own thread '
+                 'and database connection.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.TASK_POLL_INTERVAL,
+            help='Seconds an idle thread waits before polling again.',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit once no task is due instead of waiting for more.',
+        )
+        parser.add_argument(
+            '--metrics-port',
+            type=int,
+            help='Serve the worker metrics on this port.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.backend = DatabaseBackend()
+        self.stopping = threading.Event()
+        self.ran = 0
+        self.lock = threading.Lock()
+
+        server = None
+        if options['metrics_port']:
+            server = ThreadingHTTPServer(
+                ('', options['metrics_port']),
+                MetricsHandler,
+            )
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        run_startup_hooks()
+        previous_handler = signal.signal(
+            signal.SIGTERM,
+            lambda signum, frame: self.stopping.set(),
+        )
+        work_args = (options['poll_interval'], options['burst'])
+        threads = []
+        try:
+            if options['concurrency'] == 1:
+                self.work(*work_args)
+            else:
+                threads = [
+                    threading.Thread(
+                        target=self.work,
+                        args=work_args,
+                        name=f'worker-{i}',
+                    )
+                    for i in range(options['concurrency'])
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    # Join with a timeout so Ctrl+C reaches the main thread.
+                    while thread.is_alive():
+                        thread.join(0.5)
+        except KeyboardInterrupt:
+            self.stopping.set()
+            for thread in threads:
+                thread.join()
+        finally:
+            signal.signal(signal.SIGTERM, previous_handler)
+            if server:
+                server.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f'Ran {self.ran} tasks.'))
+
+    def work(self, poll_interval, burst):
+        """Run due tasks until stopped, or until none is due in burst mode."""
+        try:
+            while not self.stopping.is_set():
+                if self.backend.run_next():
+                    with self.lock:
+                        self.ran += 1
+                elif burst:
+                    break
+                else:
+                    # Drop broken or expired connections while idle.
+                    close_old_connections()
+                    self.stopping.wait(poll_interval)
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                connection.close()
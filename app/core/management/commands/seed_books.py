@@ -0,0 +1,216 @@
+"""
+Django command to generate a synthetic book catalogue for benchmarks.
+"""
+import io
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import Book, BookInterest, Genre
+
+
+SEED_PASSWORD = 'seedpass123'
+GENRES = [
+    'Fantasy', 'Science Fiction', 'Mystery', 'Thriller', 'Romance',
+    'Horror', 'Historical Fiction', 'Biography', 'Poetry', 'Drama',
+    'Classic', 'Young Adult', 'Children', 'Travel', 'Cooking',
+    'Philosophy', 'History', 'Science', 'Self Help', 'Graphic Novel',
+]
+WORDS = [
+    'shadow', 'river', 'night', 'garden', 'empire', 'silent', 'winter',
+    'glass', 'secret', 'lost', 'city', 'storm', 'golden', 'last', 'road',
+    'house', 'fire', 'ocean', 'stone', 'crown', 'letters', 'summer',
+    'mountain', 'forgotten', 'island', 'wolf', 'light', 'dark', 'song',
+]
+FIRST_NAMES = [
+    'Nino', 'Ana', 'Giorgi', 'Mariam', 'Luka', 'Elene', 'David', 'Tamar',
+    'James', 'Olivia', 'Sofia', 'Levan', 'Irakli', 'Nana', 'Sandro',
+]
+LAST_NAMES = [
+    'Beridze', 'Kapanadze', 'Gelashvili', 'Smith', 'Tsiklauri', 'Brown',
+    'Lomidze', 'Garcia', 'Maisuradze', 'Dvali', 'Novak', 'Kim', 'Rossi',
+]
+LOCATIONS = [
+    'Tbilisi', 'Batumi', 'Kutaisi', 'Rustavi', 'Gori', 'Zugdidi', 'Poti',
+    'Telavi', 'Mtskheta', 'Borjomi', 'Sighnaghi', 'Kobuleti',
+]
+CONDITIONS = ['new', 'like new', 'good', 'fair', 'poor']
+
+
+def _pg_array(values):
+    """Return values as a PostgreSQL array literal for COPY."""
+    return '{' + ','.join(f'"{value}"' for value in values) + '}'
+
+
+def _copy(cursor, table, columns, rows):
+    """Load rows into table with COPY."""
+    data = io.StringIO()
+    for row in rows:
+        data.write('\t'.join(row))
+        data.write('\n')
+    data.seek(0)
+    cursor.copy_expert(
+        f'COPY {table} ({", ".join(columns)}) FROM STDIN',
+        data,
+    )
+
+
+def _next_ids(cursor, table, count):
+    """Reserve count ids from the primary key sequence of table."""
+    cursor.execute(
+        "SELECT nextval(pg_get_serial_sequence(%s, 'id')) "
+        'FROM generate_series(1, %s)',
+        [table, count],
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+class Command(BaseCommand):
+    """Django command to seed users, genres, books and interests."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--books',
+            type=int,
+            default=10000,
+            help='Number of books to generate.',
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            help='Number of users to generate (default: books / 100).',
+        )
+        parser.add_argument(
+            '--interests',
+            type=float,
+            default=2.0,
+            help='Average number of interests per book.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50000,
+            help='Books written per COPY and transaction.',
+        )
+        parser.add_argument(
+            '--random-seed',
+            type=int,
+            default=0,
+            help='Seed for the random generator, for repeatable data.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        rand = random.Random(options['random_seed'])
+        user_ids = self._create_users(
+            options['users'] or max(options['books'] // 100, 1),
+        )
+        genres = [
+            (genre.id, genre.name)
+            for genre in Genre.objects.get_or_create_many(GENRES)
+        ]
+        authors = [
+            f'{rand.choice(FIRST_NAMES)} {rand.choice(LAST_NAMES)}'
+            for _ in range(max(options['books'] // 20, 1))
+        ]
+
+        created = 0
+        while created < options['books']:
+            count = min(options['batch_size'], options['books'] - created)
+            with transaction.atomic(), connection.cursor() as cursor:
+                self._copy_books(
+                    cursor, rand, count, user_ids, genres, authors,
+                    options['interests'],
+                )
+            created += count
+            self.stdout.write(f'Seeded {created} books...')
+
+        with connection.cursor() as cursor:
+            for model in [get_user_model(), Genre, Book, BookInterest]:
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {created} books for {len(user_ids)} users.'
+        ))
+
+    def _create_users(self, count):
+        """Create seed users sharing SEED_PASSWORD and return their ids."""
+        User = get_user_model()
+        password = make_password(SEED_PASSWORD)
+        emails = [f'seed-user-{i}@example.com' for i in range(count)]
+        User.objects.bulk_create(
+            [
+                User(email=email, name=f'Seed User {i}', password=password)
+                for i, email in enumerate(emails)
+            ],
+            batch_size=5000,
+            ignore_conflicts=True,
+        )
+        return list(
+            User.objects.filter(email__in=emails).values_list('id', flat=True)
+        )
+
+    def _copy_books(
+        self, cursor, rand, count, user_ids, genres, authors, interests
+    ):
+        """Write count books with genres, interests and derived fields."""
+        book_ids = _next_ids(cursor, Book._meta.db_table, count)
+        updated_at = timezone.now().isoformat()
+        books, links, book_interests = [], [], []
+
+        for book_id in book_ids:
+            owner_id = rand.choice(user_ids)
+            book_genres = rand.sample(genres, rand.randint(1, 3))
+            interest_count = (
+                int(rand.expovariate(1 / interests)) if interests else 0
+            )
+            readers = {
+                rand.choice(user_ids) for _ in range(interest_count)
+            } - {owner_id}
+
+            title = ' '.join(rand.sample(WORDS, rand.randint(2, 4)))
+            books.append([
+                str(book_id),
+                str(owner_id),
+                title.title(),
+                rand.choice(authors),
+                f'A {rand.choice(CONDITIONS)} copy of {title}.',
+                't' if rand.random() < 0.9 else 'f',
+                rand.choice(LOCATIONS),
+                rand.choice(CONDITIONS),
+                r'\N',
+                _pg_array(sorted(name for _, name in book_genres)),
+                str(len(readers)),
+                updated_at,
+            ])
+            links.extend(
+                [str(book_id), str(genre_id)] for genre_id, _ in book_genres
+            )
+            book_interests.extend(
+                [str(book_id), str(reader_id), 'f', 'f']
+                for reader_id in readers
+            )
+
+        _copy(cursor, Book._meta.db_table, [
+            'id', 'user_id', 'title', 'author', 'description', 'available',
+            'location', 'condition', 'image', 'genre_names', 'interest_count',
+            'updated_at',
+        ], books)
+        _copy(
+            cursor,
+            Book.genres.through._meta.db_table,
+            ['book_id', 'genre_id'],
+            links,
+        )
+        _copy(cursor, BookInterest._meta.db_table, [
+            'book_id', 'interested_user_id', 'chosen_by_owner',
+            'rejected_by_owner',
+        ], book_interests)
+        Book.objects.filter(
+            pk__gte=book_ids[0],
+            pk__lte=book_ids[-1],
+        ).refresh_derived_fields()
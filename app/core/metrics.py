@@ -0,0 +1,147 @@
+"""
+In-process metrics exposed in the Prometheus text format.
+
+Metrics are kept per process, so with several server workers each one
+reports its own series.
+"""
+import bisect
+import math
+import threading
+
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _format_value(value):
+    """Return value formatted as a Prometheus sample value."""
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels):
+    """Return labels formatted as a Prometheus label set."""
+    pairs = []
+    for name, value in labels:
+        value = str(value).replace('\\', r'\\').replace('"', r'\"')
+        pairs.append('{}="{}"'.format(name, value.replace('\n', r'\n')))
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonically increasing count, one series per set of label values."""
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """Add amount to the series for labels."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        """Yield the name, labels and value of every sample."""
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, list(zip(self.labelnames, key)), value
+
+
+class Gauge(Counter):
+    """Value that goes up and down, one series per set of label values."""
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        """Set the series for labels to value."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    """Histogram of observed values, one series per set of label values."""
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets or DEFAULT_BUCKETS) + (math.inf,)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Record value in the series for labels."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        """Yield the name, labels and value of every sample."""
+        with self._lock:
+            series = {
+                key: (list(counts), total)
+                for key, (counts, total) in self._series.items()
+            }
+        for key, (counts, total) in sorted(series.items()):
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield (
+                    f'{self.name}_bucket',
+                    labels + [('le', _format_value(bound))],
+                    cumulative,
+                )
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, cumulative
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+
+    def register(self, metric):
+        """Add metric to the registry and return it."""
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric {metric.name} is already registered.')
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector):
+        """Call collector to refresh gauges before each render."""
+        self._collectors.append(collector)
+        return collector
+
+    def render(self):
+        """Return every metric in the Prometheus text format."""
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in metric.samples():
+                lines.append(
+                    f'{name}{_format_labels(labels)} {_format_value(value)}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
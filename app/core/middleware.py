@@ -0,0 +1,240 @@
+"""
+Middleware measuring where request time goes.
+"""
+import hashlib
+import logging
+import time
+import traceback
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from core.metrics import Histogram, registry
+from core.routers import choose_replica, read_from
+
+
+logger = logging.getLogger(__name__)
+
+LABELS = ['route', 'method']
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+request_duration = registry.register(Histogram(
+    'http_request_duration_seconds',
+    'Wall time spent handling requests.',
+    LABELS + ['status'],
+))
+request_queries = registry.register(Histogram(
+    'http_request_db_queries',
+    'Database queries run per request.',
+    LABELS,
+    buckets=QUERY_BUCKETS,
+))
+request_db_duration = registry.register(Histogram(
+    'http_request_db_duration_seconds',
+    'Time spent in database queries per request.',
+    LABELS,
+))
+request_serialize_duration = registry.register(Histogram(
+    'http_request_serialize_duration_seconds',
+    'Time spent serializing response data per request.',
+    LABELS,
+))
+request_render_duration = registry.register(Histogram(
+    'http_request_render_duration_seconds',
+    'Time spent rendering response bodies per request.',
+    LABELS,
+))
+
+
+def get_call_site():
+    """Return the innermost project stack frame outside this module."""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(base_dir) and frame.filename != __file__:
+            return f'{frame.filename}:{frame.lineno} in {frame.name}'
+    return 'unknown'
+
+
+class QueryTimer:
+    """Database execute wrapper counting and timing queries.
+
+    Queries slower than SLOW_QUERY_MS and statements repeated
+    N_PLUS_ONE_THRESHOLD times are logged with the code that ran them.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            repeats = self.statements[sql] = self.statements.get(sql, 0) + 1
+            if duration * 1000 >= settings.SLOW_QUERY_MS:
+                logger.warning(
+                    'Slow query (%.1f ms) at %s: %s',
+                    duration * 1000,
+                    get_call_site(),
+                    sql,
+                )
+            if repeats == settings.N_PLUS_ONE_THRESHOLD:
+                logger.warning(
+                    'Possible N+1 query, repeated %d times at %s: %s',
+                    repeats,
+                    get_call_site(),
+                    sql,
+                )
+
+
+def _add_execute_wrapper(wrapper):
+    """Install wrapper on the current thread's connections."""
+    for connection in connections.all():
+        connection.execute_wrappers.append(wrapper)
+
+
+def _remove_execute_wrapper(wrapper):
+    """Remove wrapper from the current thread's connections."""
+    for connection in connections.all():
+        connection.execute_wrappers.remove(wrapper)
+
+
+class PerformanceMiddleware:
+    """Record request, database, serializer and render time of requests.
+
+    Timings are reported in a Server-Timing header and observed in the
+    request histograms served at /metrics.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        start = time.perf_counter()
+        request._query_timer = timer = QueryTimer()
+        _add_execute_wrapper(timer)
+        try:
+            response = self.get_response(request)
+        finally:
+            _remove_execute_wrapper(timer)
+        return self._record(request, response, start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        request._query_timer = timer = QueryTimer()
+        # Async views run their queries on the request's thread sensitive
+        # executor, so install the wrapper on that thread's connections.
+        await sync_to_async(_add_execute_wrapper)(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_remove_execute_wrapper)(timer)
+        return self._record(request, response, start)
+
+    def process_template_response(self, request, response):
+        """Time the rendering of DRF and template responses."""
+        render_start = time.perf_counter()
+
+        def rendered(response):
+            request._render_duration = time.perf_counter() - render_start
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def _record(self, request, response, start):
+        """Add the Server-Timing header and observe the histograms."""
+        timer = request._query_timer
+        serialize = getattr(request, '_serialize_duration', 0.0)
+        render = getattr(request, '_render_duration', 0.0)
+        total = time.perf_counter() - start
+        response['Server-Timing'] = (
+            f'db;dur={timer.duration * 1000:.2f};desc="{timer.count} queries",'
+            f' serialize;dur={serialize * 1000:.2f},'
+            f' render;dur={render * 1000:.2f},'
+            f' total;dur={total * 1000:.2f}'
+        )
+
+        match = request.resolver_match
+        labels = {
+            'route': match.view_name if match else 'unmatched',
+            'method': request.method,
+        }
+        request_duration.observe(total, status=response.status_code, **labels)
+        request_queries.observe(timer.count, **labels)
+        request_db_duration.observe(timer.duration, **labels)
+        request_serialize_duration.observe(serialize, **labels)
+        request_render_duration.observe(render, **labels)
+        return response
+
+
+def _pin_key(request):
+    """Return the cache key pinning the client of request to the primary."""
+    credentials = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    if not credentials:
+        return None
+    digest = hashlib.sha256(credentials.encode()).hexdigest()
+    return f'replica-pin:{digest}'
+
+
+def _read_database(request):
+    """Return the replica request may read from, or None for the primary.
+
+    Unsafe requests pin their client to the primary for REPLICA_PIN_SECONDS
+    so it reads its own writes despite replication lag.
+    """
+    key = _pin_key(request)
+    if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+        if key:
+            cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+        return None
+    if key and cache.get(key):
+        return None
+    return choose_replica()
+
+
+class ReplicaMiddleware:
+    """Read books and genres from a replica during safe requests."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.REPLICA_DATABASES:
+            return self.get_response(request)
+        with read_from(_read_database(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not settings.REPLICA_DATABASES:
+            return await self.get_response(request)
+        # Connect on the thread the async views run their queries on.
+        alias = await sync_to_async(_read_database)(request)
+        with read_from(alias):
+            return await self.get_response(request)
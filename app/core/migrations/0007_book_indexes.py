@@ -0,0 +1,37 @@
+# Generated by Django 4.2.5 on 2026-10-17 19:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_bookinterest'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(condition=models.Q(('available', True)), fields=['-id'], name='book_available_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(condition=models.Q(('available', True)), fields=['author', '-id'], name='book_available_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(condition=models.Q(('available', True)), fields=['condition', '-id'], name='book_available_condition_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(condition=models.Q(('available', True)), fields=['location', '-id'], name='book_available_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['user', '-id'], name='book_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookinterest',
+            index=models.Index(fields=['book', '-id'], name='bookinterest_book_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.5 on 2026-10-17 19:55
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_search_vector(apps, schema_editor):
+    """Populate the search vector of existing books."""
+    Book = apps.get_model('core', 'Book')
+    genre_names = Book.genres.through.objects.filter(
+        book=OuterRef('pk'),
+    ).values('book').annotate(
+        names=StringAgg('genre__name', ' '),
+    ).values('names')
+
+    Book.objects.update(search_vector=(
+        SearchVector('title', weight='A', config='english') +
+        SearchVector('author', weight='A', config='english') +
+        SearchVector(Subquery(genre_names), weight='B', config='english') +
+        SearchVector('description', weight='C', config='english')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_book_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            backfill_search_vector,
+            migrations.RunPython.noop,
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='book_search_vector_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.5 on 2026-10-17 19:57
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+# Keep the oldest genre of each case-insensitive name, move book links
+# from its duplicates onto it and drop the duplicates.
+MERGE_DUPLICATE_GENRES_SQL = """
+    CREATE TEMPORARY TABLE genre_duplicates ON COMMIT DROP AS
+    SELECT id, keep_id FROM (
+        SELECT id, MIN(id) OVER (PARTITION BY LOWER(name)) AS keep_id
+        FROM core_genre
+    ) AS genres
+    WHERE id <> keep_id;
+
+    INSERT INTO core_book_genres (book_id, genre_id)
+    SELECT book_genres.book_id, genre_duplicates.keep_id
+    FROM core_book_genres AS book_genres
+    JOIN genre_duplicates ON genre_duplicates.id = book_genres.genre_id
+    ON CONFLICT DO NOTHING;
+
+    DELETE FROM core_book_genres
+    WHERE genre_id IN (SELECT id FROM genre_duplicates);
+
+    DELETE FROM core_genre
+    WHERE id IN (SELECT id FROM genre_duplicates);
+
+    SET CONSTRAINTS ALL IMMEDIATE;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_book_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunSQL(MERGE_DUPLICATE_GENRES_SQL, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='genre',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), name='genre_name_ci_unique'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.5 on 2026-10-17 20:19
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_genre_name_ci_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='genre_names',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['genre_names'], name='book_genre_names_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.5 on 2026-10-17 20:34
+
+from django.db import migrations, models
+
+
+# Keep the oldest chosen interest of each book and reject the others.
+REJECT_DUPLICATE_CHOICES_SQL = """
+    UPDATE core_bookinterest
+    SET chosen_by_owner = FALSE, rejected_by_owner = TRUE
+    WHERE chosen_by_owner AND id NOT IN (
+        SELECT MIN(id) FROM core_bookinterest
+        WHERE chosen_by_owner
+        GROUP BY book_id
+    );
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_book_genre_names'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookinterest',
+            name='rejected_by_owner',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunSQL(
+            REJECT_DUPLICATE_CHOICES_SQL,
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='bookinterest',
+            constraint=models.UniqueConstraint(condition=models.Q(('chosen_by_owner', True)), fields=('book',), name='bookinterest_one_chosen_per_book'),
+        ),
+    ]
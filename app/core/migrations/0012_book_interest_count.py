@@ -0,0 +1,31 @@
+# Generated by Django 4.2.5 on 2026-10-17 20:36
+
+from django.db import migrations, models
+
+
+COUNT_INTERESTS_SQL = """
+    UPDATE core_book
+    SET interest_count = counts.interest_count
+    FROM (
+        SELECT book_id, COUNT(*) AS interest_count
+        FROM core_bookinterest
+        GROUP BY book_id
+    ) AS counts
+    WHERE counts.book_id = core_book.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_bookinterest_one_chosen_per_book'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='interest_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(COUNT_INTERESTS_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.5 on 2026-10-17 21:16
+
+from django.db import migrations, models
+
+from core.geo import read_gazetteer
+
+
+def load_gazetteer(apps, schema_editor):
+    """Load the bundled gazetteer into the places table."""
+    Place = apps.get_model('core', 'Place')
+    Place.objects.bulk_create(
+        [
+            Place(name=name, latitude=latitude, longitude=longitude)
+            for name, latitude, longitude in read_gazetteer()
+        ],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_book_interest_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Place',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='latitude',
+            field=models.FloatField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='longitude',
+            field=models.FloatField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(condition=models.Q(('available', True)), fields=['latitude', 'longitude'], name='book_available_coords_idx'),
+        ),
+        migrations.RunPython(load_gazetteer, migrations.RunPython.noop),
+    ]
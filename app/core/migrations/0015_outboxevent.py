@@ -0,0 +1,23 @@
+# Generated by Django 4.2.5 on 2026-10-17 21:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('interest_added', 'Interest added'), ('recipient_chosen', 'Recipient chosen')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('interest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.bookinterest')),
+            ],
+        ),
+    ]
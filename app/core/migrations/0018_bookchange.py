@@ -0,0 +1,74 @@
+# Generated by Django 4.2.5 on 2026-10-17 22:19
+
+from django.db import migrations, models
+
+
+# Statement level triggers log the rows changed by each statement, so bulk
+# inserts and queryset updates, which send no signals, are logged too.
+LOG_CHANGES_SQL = """
+    CREATE FUNCTION core_book_log_changes() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO core_bookchange (book_id, transaction_id, deleted)
+            SELECT id, txid_current(), FALSE FROM new_rows;
+        ELSIF TG_OP = 'UPDATE' THEN
+            INSERT INTO core_bookchange (book_id, transaction_id, deleted)
+            SELECT new_rows.id, txid_current(), FALSE
+            FROM new_rows JOIN old_rows ON old_rows.id = new_rows.id
+            WHERE new_rows.updated_at IS DISTINCT FROM old_rows.updated_at;
+        ELSE
+            INSERT INTO core_bookchange (book_id, transaction_id, deleted)
+            SELECT id, txid_current(), TRUE FROM old_rows;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER core_book_log_inserts
+    AFTER INSERT ON core_book
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_book_log_changes();
+
+    CREATE TRIGGER core_book_log_updates
+    AFTER UPDATE ON core_book
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_book_log_changes();
+
+    CREATE TRIGGER core_book_log_deletes
+    AFTER DELETE ON core_book
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_book_log_changes();
+
+    INSERT INTO core_bookchange (book_id, transaction_id, deleted)
+    SELECT id, txid_current(), FALSE FROM core_book ORDER BY id;
+"""
+
+DROP_LOG_CHANGES_SQL = """
+    DROP TRIGGER core_book_log_deletes ON core_book;
+    DROP TRIGGER core_book_log_updates ON core_book;
+    DROP TRIGGER core_book_log_inserts ON core_book;
+    DROP FUNCTION core_book_log_changes();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_book_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('book_id', models.BigIntegerField()),
+                ('transaction_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['transaction_id', 'id'], name='bookchange_token_idx')],
+            },
+        ),
+        migrations.RunSQL(LOG_CHANGES_SQL, DROP_LOG_CHANGES_SQL),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.5 on 2026-10-17 23:10
+
+from django.db import migrations
+
+
+# Moving updated_at changes the books' ETags and lists them in the change
+# feed, so clients pick up the normalized names.
+LOWERCASE_GENRE_NAMES_SQL = """
+    UPDATE core_book
+    SET genre_names = ARRAY(
+            SELECT LOWER(name) FROM unnest(genre_names) AS name ORDER BY 1
+        )::varchar(255)[],
+        updated_at = NOW()
+    WHERE genre_names <> '{}';
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_bookchange'),
+    ]
+
+    operations = [
+        migrations.RunSQL(LOWERCASE_GENRE_NAMES_SQL, migrations.RunSQL.noop),
+    ]
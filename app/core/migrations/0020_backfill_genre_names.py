@@ -0,0 +1,35 @@
+# Generated by Django 4.2.5 on 2026-10-18 09:12
+
+from django.db import migrations
+
+
+# Rebuilds the names of every book from its genres, restoring the display
+# names 0019 lowercased and filling books added before 0010. Moving
+# updated_at lists changed books in the change feed and changes their ETags.
+BACKFILL_GENRE_NAMES_SQL = """
+    UPDATE core_book
+    SET genre_names = derived.names, updated_at = NOW()
+    FROM (
+        SELECT book.id, ARRAY(
+            SELECT genre.name
+            FROM core_book_genres AS book_genre
+            JOIN core_genre AS genre ON genre.id = book_genre.genre_id
+            WHERE book_genre.book_id = book.id
+            ORDER BY genre.name
+        )::varchar(255)[] AS names
+        FROM core_book AS book
+    ) AS derived
+    WHERE core_book.id = derived.id
+        AND core_book.genre_names IS DISTINCT FROM derived.names;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_lowercase_genre_names'),
+    ]
+
+    operations = [
+        migrations.RunSQL(BACKFILL_GENRE_NAMES_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.5 on 2026-10-17 23:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# AlterField would drop every index on the columns, including the partial
+# unique index of bookinterest_one_chosen_per_book, so only the indexes the
+# foreign keys created are dropped, by name.
+DROP_FK_INDEXES_SQL = """
+    DROP INDEX IF EXISTS core_book_user_id_55b2f8ca;
+    DROP INDEX IF EXISTS core_bookinterest_book_id_1d0b2f82;
+"""
+CREATE_FK_INDEXES_SQL = """
+    CREATE INDEX core_book_user_id_55b2f8ca ON core_book (user_id);
+    CREATE INDEX core_bookinterest_book_id_1d0b2f82
+        ON core_bookinterest (book_id);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_backfill_genre_names'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(DROP_FK_INDEXES_SQL, CREATE_FK_INDEXES_SQL),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='book',
+                    name='user',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+                ),
+                migrations.AlterField(
+                    model_name='bookinterest',
+                    name='book',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='core.book'),
+                ),
+            ],
+        ),
+    ]
@@ -2,13 +2,31 @@
 Database models.
 """
 from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+)
 from django.db import models
+from django.db.models import Count, F, Func, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Lower, Trim
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
 
+from core.geo import bounding_box, haversine_km
+
+
+SEARCH_CONFIG = 'english'
+
 
 class UserManager(BaseUserManager):
     """Manager for users."""
@@ -45,11 +63,143 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
+def genre_names_expression():
+    """Return the sorted names of a book's genres as an array expression."""
+    return ArraySubquery(
+        Genre.objects.filter(book=OuterRef('pk')).order_by('name').values(
+            'name',
+        ),
+    )
+
+
+def search_vector_expression():
+    """Return the weighted search vector of a book's text and genres."""
+    genre_names = Book.genres.through.objects.filter(
+        book=OuterRef('pk'),
+    ).values('book').annotate(
+        names=StringAgg('genre__name', ' '),
+    ).values('names')
+
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+        SearchVector('author', weight='A', config=SEARCH_CONFIG) +
+        SearchVector(Subquery(genre_names), weight='B', config=SEARCH_CONFIG) +
+        SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def interest_count_expression():
+    """Return the number of interests in a book."""
+    counts = BookInterest.objects.filter(book=OuterRef('pk')).values(
+        'book',
+    ).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts), 0)
+
+
+def place_name_expression(location):
+    """Return the gazetteer key of a location, like normalize_place_name."""
+    return Trim(Lower(Func(
+        location,
+        Value(','),
+        Value(1),
+        function='split_part',
+        output_field=models.CharField(),
+    )))
+
+
+def coordinate_expressions():
+    """Return the gazetteer latitude and longitude of a book's location."""
+    places = Place.objects.filter(
+        name=place_name_expression(OuterRef('location')),
+    )
+    return {
+        'latitude': Subquery(places.values('latitude')),
+        'longitude': Subquery(places.values('longitude')),
+    }
+
+
+class BookQuerySet(models.QuerySet):
+    """Queryset for books with full-text search support."""
+
+    def update_search_vector(self):
+        """Rebuild the search vector from title, author, genres and text."""
+        return self.update(search_vector=search_vector_expression())
+
+    def update_genre_names(self):
+        """Rebuild the denormalized genre names."""
+        return self.update(
+            genre_names=genre_names_expression(),
+            updated_at=timezone.now(),
+        )
+
+    def refresh_genres(self):
+        """Rebuild the genre names and search vector after genres change."""
+        return self.update(
+            genre_names=genre_names_expression(),
+            search_vector=search_vector_expression(),
+            updated_at=timezone.now(),
+        )
+
+    def update_interest_counts(self):
+        """Recount the interests in each book."""
+        return self.update(interest_count=interest_count_expression())
+
+    def update_coordinates(self):
+        """Look up the coordinates of each book's location."""
+        return self.update(
+            **coordinate_expressions(),
+            updated_at=timezone.now(),
+        )
+
+    def refresh_derived_fields(self):
+        """Rebuild genre names, search vector and coordinates of new books."""
+        return self.update(
+            genre_names=genre_names_expression(),
+            search_vector=search_vector_expression(),
+            **coordinate_expressions(),
+            updated_at=timezone.now(),
+        )
+
+    def near(self, latitude, longitude, radius_km):
+        """Filter books within radius_km of a point.
+
+        An indexed bounding box narrows the candidates before the exact
+        distance is computed.
+        """
+        south, north, longitudes = bounding_box(
+            latitude,
+            longitude,
+            radius_km,
+        )
+        in_box = models.Q()
+        for west, east in longitudes:
+            in_box |= models.Q(longitude__range=(west, east))
+        return self.filter(
+            in_box,
+            latitude__range=(south, north),
+        ).alias(
+            distance_km=haversine_km(latitude, longitude),
+        ).filter(distance_km__lte=radius_km)
+
+    def search(self, text):
+        """Filter books matching text, ordered by relevance."""
+        query = SearchQuery(
+            text,
+            config=SEARCH_CONFIG,
+            search_type='websearch',
+        )
+        return self.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query),
+        ).order_by('-rank', '-id')
+
+
 class Book(models.Model):
     """Book object."""
+    # Indexed by book_user_idx, which leads with the user.
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        db_index=False,
     )
     title = models.CharField(max_length=255)
     author = models.CharField(max_length=255)
@@ -58,28 +208,280 @@ class Book(models.Model):
     location = models.CharField(max_length=255)
     condition = models.CharField(max_length=255, null=True)
     image = models.CharField(max_length=255, null=True)  # for images URL.
+    # Image uploaded for the book, served instead of `image` when set.
+    uploaded_image = models.ForeignKey(
+        'StoredImage',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+    )
     genres = models.ManyToManyField('Genre')
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Names of the book's genres, kept in sync with `genres` by signals.
+    genre_names = ArrayField(
+        models.CharField(max_length=255),
+        blank=True,
+        default=list,
+        editable=False,
+    )
+    # Number of interests in the book, kept in sync by signals and
+    # reconcile_interest_counts.
+    interest_count = models.PositiveIntegerField(default=0, editable=False)
+    # Coordinates of the location's gazetteer entry, set by signals.
+    latitude = models.FloatField(null=True, editable=False)
+    longitude = models.FloatField(null=True, editable=False)
+    # Time of the last change shown by the book APIs, including changes to
+    # its genres, image and availability made with update().
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = BookQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='book_search_vector_idx'),
+            GinIndex(fields=['genre_names'], name='book_genre_names_idx'),
+            models.Index(
+                fields=['-id'],
+                name='book_available_idx',
+                condition=models.Q(available=True),
+            ),
+            models.Index(
+                fields=['author', '-id'],
+                name='book_available_author_idx',
+                condition=models.Q(available=True),
+            ),
+            models.Index(
+                fields=['condition', '-id'],
+                name='book_available_condition_idx',
+                condition=models.Q(available=True),
+            ),
+            models.Index(
+                fields=['location', '-id'],
+                name='book_available_location_idx',
+                condition=models.Q(available=True),
+            ),
+            models.Index(fields=['user', '-id'], name='book_user_idx'),
+            # Serves the latest update and count of a user's books from the
+            # index alone, for conditional requests.
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='book_user_updated_idx',
+            ),
+            models.Index(
+                fields=['latitude', 'longitude'],
+                name='book_available_coords_idx',
+                condition=models.Q(available=True),
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
 
+class BookChange(models.Model):
+    """Entry of the book change log, written by database triggers.
+
+    Each insert, delete, or update moving `updated_at`, of a book logs its
+    id with the id of the writing transaction; see book.changes.
+    """
+    # Not a foreign key: entries outlive their books as tombstones.
+    book_id = models.BigIntegerField()
+    transaction_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['transaction_id', 'id'],
+                name='bookchange_token_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.book_id} in {self.transaction_id}'
+
+
+def stored_image_path(instance, filename):
+    """Return the content addressed storage path of an uploaded image."""
+    extension = filename.rsplit('.', 1)[-1].lower()
+    return f'images/{instance.sha256[:2]}/{instance.sha256}.{extension}'
+
+
+class StoredImage(models.Model):
+    """Uploaded image, stored once per distinct content."""
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to=stored_image_path, max_length=255)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    # Widths of the thumbnails generated so far, in ascending order.
+    thumbnail_widths = ArrayField(
+        models.PositiveIntegerField(),
+        blank=True,
+        default=list,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.file.name
+
+
+class Place(models.Model):
+    """Place of the offline gazetteer that books are located with."""
+    # Lowercase name, as returned by normalize_place_name.
+    name = models.CharField(max_length=255, unique=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+
+    def __str__(self):
+        return self.name
+
+
+class GenreManager(models.Manager):
+    """Manager for genres."""
+
+    def get_or_create_many(self, names):
+        """Return genres for names, creating missing ones in bulk.
+
+        Names are matched case-insensitively, as the database lowercases
+        them; the first spelling wins when a genre is created.
+        """
+        genres = self.get_or_create_by_name(names)
+        return list(dict.fromkeys(genres.values()))
+
+    def get_or_create_by_name(self, names):
+        """Return a dict of each name to its genre, as get_or_create_many."""
+        keys = {}
+        wanted = {}
+        genres = {}
+        for name, genre in self._by_lower_name(names):
+            keys[name] = genre.lower_name
+            wanted.setdefault(genre.lower_name, name)
+            if genre.pk is not None:
+                genres[genre.lower_name] = genre
+        missing = [wanted[key] for key in wanted if key not in genres]
+        if missing:
+            self.bulk_create(
+                [self.model(name=name) for name in missing],
+                ignore_conflicts=True,
+            )
+            genres.update(
+                (genre.lower_name, genre)
+                for name, genre in self._by_lower_name(missing)
+            )
+
+        return {name: genres[key] for name, key in keys.items()}
+
+    def _by_lower_name(self, names):
+        """Yield each name with its genre, or an unsaved one if none.
+
+        Every genre carries the name as lowercased by the database in
+        lower_name, so that names and genres are keyed alike.
+        """
+        names = list(names)
+        genres = self.raw(
+            'SELECT genre.id, genre.name, LOWER(wanted.name) AS lower_name '
+            'FROM unnest(%s::text[]) WITH ORDINALITY AS wanted (name, n) '
+            f'LEFT JOIN {self.model._meta.db_table} AS genre '
+            'ON LOWER(genre.name) = LOWER(wanted.name) '
+            'ORDER BY wanted.n',
+            [names],
+        )
+        return zip(names, genres)
+
+
 class Genre(models.Model):
     name = models.CharField(max_length=255)
 
+    objects = GenreManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                Lower('name'),
+                name='genre_name_ci_unique',
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
 
 class BookInterest(models.Model):
     """For Managing Book Requests and Owner Decisions"""
-    book = models.ForeignKey(Book, on_delete=models.CASCADE)
+    # Indexed by bookinterest_book_idx, which leads with the book.
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, db_index=False)
     interested_user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name='book_interests'
     )
     chosen_by_owner = models.BooleanField(default=False)
+    rejected_by_owner = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Serves the newest interests of each book in the inbox and
+            # the interests of an owner's books, joined book by book.
+            models.Index(fields=['book', '-id'], name='bookinterest_book_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['book'],
+                condition=models.Q(chosen_by_owner=True),
+                name='bookinterest_one_chosen_per_book',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.interested_user.name} interested in '{self.book.title}'"
+
+
+class OutboxEvent(models.Model):
+    """Change to a book interest waiting to be notified to the users.
+
+    Events are written in the transaction making the change and deleted
+    once the digests mentioning them are sent.
+    """
+    INTEREST_ADDED = 'interest_added'
+    RECIPIENT_CHOSEN = 'recipient_chosen'
+    KIND_CHOICES = [
+        (INTEREST_ADDED, 'Interest added'),
+        (RECIPIENT_CHOSEN, 'Recipient chosen'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    interest = models.ForeignKey(BookInterest, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.kind} #{self.interest_id}'
+
+
+class Task(models.Model):
+    """Background task waiting in the database queue.
+
+    Tasks are deleted once they succeed; tasks out of attempts are kept as
+    failed with their last error.
+    """
+    name = models.CharField(max_length=255)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField()
+    run_at = models.DateTimeField(default=timezone.now)
+    failed = models.BooleanField(default=False)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['run_at', 'id'],
+                condition=models.Q(failed=False),
+                name='task_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
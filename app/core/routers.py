@@ -0,0 +1,99 @@
+"""
+Database router sending book reads to read replicas.
+
+ReplicaMiddleware picks the database that safe requests read books and
+genres from. Everything else, including all writes and reads inside
+transactions on the primary, uses the primary.
+"""
+import contextlib
+import contextvars
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import OperationalError
+
+from core.metrics import Counter, registry
+
+
+logger = logging.getLogger(__name__)
+
+REPLICATED_MODELS = {'core.book', 'core.genre', 'core.book_genres'}
+
+replica_unavailable = registry.register(Counter(
+    'db_replica_unavailable_total',
+    'Times a read replica could not be reached and reads fell back to '
+    'the primary.',
+    ['alias'],
+))
+
+_read_database = contextvars.ContextVar('read_database', default=None)
+_unavailable_until = {}
+
+
+def replica_available(alias):
+    """Return whether alias accepts connections.
+
+    A replica that fails is skipped for REPLICA_RETRY_SECONDS.
+    """
+    if _unavailable_until.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connection = connections[alias]
+        connection.close_if_health_check_failed()
+        connection.ensure_connection()
+    except OperationalError as error:
+        logger.warning('Read replica %s is unavailable: %s', alias, error)
+        replica_unavailable.inc(alias=alias)
+        _unavailable_until[alias] = (
+            time.monotonic() + settings.REPLICA_RETRY_SECONDS
+        )
+        return False
+    _unavailable_until.pop(alias, None)
+    return True
+
+
+def choose_replica():
+    """Return a random available replica, or None to use the primary."""
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return None
+    aliases = [
+        alias for alias in settings.REPLICA_DATABASES
+        if replica_available(alias)
+    ]
+    return random.choice(aliases) if aliases else None
+
+
+@contextlib.contextmanager
+def read_from(alias):
+    """Route replicated reads to alias inside the block."""
+    token = _read_database.set(alias)
+    try:
+        yield
+    finally:
+        _read_database.reset(token)
+
+
+class ReplicaRouter:
+    """Route book and genre reads to the database chosen for the request."""
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if model._meta.label_lower in REPLICATED_MODELS:
+            return _read_database.get()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.REPLICA_DATABASES
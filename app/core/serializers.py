@@ -0,0 +1,34 @@
+"""
+Serializer classes shared by the apps.
+"""
+import time
+
+from rest_framework import serializers
+
+
+class TimedSerializerMixin:
+    """Serializer mixin adding the time spent building `.data` to its request.
+
+    PerformanceMiddleware reports that time apart from rendering. Set
+    `list_serializer_class = TimedListSerializer` in Meta so lists built
+    with `many=True` are timed too.
+    """
+
+    @property
+    def data(self):
+        start = time.perf_counter()
+        try:
+            return super().data
+        finally:
+            request = self.context.get('request')
+            if request is not None:
+                # The Django request the middleware sees, behind DRF's.
+                request = getattr(request, '_request', request)
+                request._serialize_duration = (
+                    getattr(request, '_serialize_duration', 0.0)
+                    + time.perf_counter() - start
+                )
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    """List serializer adding the time spent building `.data`."""
@@ -0,0 +1,127 @@
+"""
+Signal handlers keeping derived and cached data in sync.
+"""
+from django.contrib.auth import get_user_model
+from django.core.signals import request_started
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core import tasks
+from core.authentication import token_user_cache
+from core.models import Book, BookInterest, Genre
+
+
+@receiver(post_save, sender=Book)
+def refresh_derived_fields_on_save(sender, instance, raw=False, **kwargs):
+    """Refresh the derived fields after a book is saved."""
+    if not raw:
+        Book.objects.filter(pk=instance.pk).refresh_derived_fields()
+
+
+@receiver(m2m_changed, sender=Book.genres.through)
+def refresh_genres_on_genres_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """Refresh the genre names and search vector of changed books."""
+    if reverse and action == 'pre_clear':
+        remember_books_of_genre(Genre, instance)
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        books = Book.objects.filter(pk=instance.pk)
+    elif pk_set:
+        books = Book.objects.filter(pk__in=pk_set)
+    elif getattr(instance, '_book_ids', None):
+        books = Book.objects.filter(pk__in=instance._book_ids)
+    else:
+        return
+    books.refresh_genres()
+
+
+@receiver(post_save, sender=Genre)
+def refresh_genres_on_genre_rename(sender, instance, created, **kwargs):
+    """Refresh books tagged with a renamed genre."""
+    if not created:
+        Book.objects.filter(genres=instance).refresh_genres()
+
+
+@receiver(pre_delete, sender=Genre)
+def remember_books_of_genre(sender, instance, **kwargs):
+    """Record the books tagged with a genre before its links are removed."""
+    instance._book_ids = list(
+        Book.objects.filter(genres=instance).values_list('pk', flat=True),
+    )
+
+
+@receiver(post_delete, sender=Genre)
+def refresh_genres_on_genre_delete(sender, instance, **kwargs):
+    """Refresh books that were tagged with a deleted genre.
+
+    Deleting a genre removes its links without sending m2m_changed.
+    """
+    book_ids = getattr(instance, '_book_ids', None)
+    if book_ids:
+        Book.objects.filter(pk__in=book_ids).refresh_genres()
+
+
+# The interest count is shown only to the book's owner, so keeping it in
+# step leaves updated_at alone. Bulk writes bypass these signals; run
+# reconcile_interest_counts to correct counts that have drifted.
+@receiver(post_save, sender=BookInterest)
+def count_created_interest(sender, instance, created, raw=False, **kwargs):
+    """Increment the interest count of a book when an interest is added."""
+    if created and not raw:
+        Book.objects.filter(pk=instance.book_id).update(
+            interest_count=F('interest_count') + 1,
+        )
+
+
+@receiver(post_delete, sender=BookInterest)
+def count_deleted_interest(sender, instance, **kwargs):
+    """Decrement the interest count of a book when an interest is removed."""
+    Book.objects.filter(pk=instance.book_id).update(
+        interest_count=Greatest(F('interest_count') - 1, 0),
+    )
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_token_user_cache_on_save(
+    sender, instance, created, **kwargs
+):
+    """Drop the cached user when a user changes.
+
+    This covers deactivation, password changes and profile updates, so
+    request.user is never staler than the database. Deleting a user
+    deletes its token, which is handled below.
+    """
+    if not created:
+        token_user_cache.invalidate(*Token.objects.filter(
+            user=instance,
+        ).values_list('key', flat=True))
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token_user_cache_on_delete(sender, instance, **kwargs):
+    """Drop the cached user of a deleted token."""
+    token_user_cache.invalidate(instance.key)
+
+
+@receiver(request_started)
+def run_task_startup_hooks(sender, **kwargs):
+    """Run the task startup hooks on the first request of the process.
+
+    Its threads run the tasks of the ThreadPoolBackend, whose queue was
+    lost with any previous process.
+    """
+    request_started.disconnect(run_task_startup_hooks)
+    if isinstance(tasks.get_backend(), tasks.ThreadPoolBackend):
+        tasks.run_startup_hooks()
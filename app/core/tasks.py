@@ -0,0 +1,344 @@
+"""
+Background tasks for work that does not need to block the response.
+
+Functions decorated with @task are registered by name and enqueued with
+`func.enqueue(*args)`, or `func.enqueue_in(seconds, *args)` to run them
+later. Arguments must be JSON serializable, so pass ids
+rather than model instances. The backend named by TASK_BACKEND runs them:
+
+- ImmediateBackend runs them in the calling thread, for tests.
+- ThreadPoolBackend runs them in a pool of TASK_CONCURRENCY threads of the
+  server process, for development.
+- DatabaseBackend stores them in the Task table, from which the
+  run_workers command claims them with SELECT ... FOR UPDATE SKIP LOCKED.
+
+Tasks are handed over only once the enqueuing transaction commits, so they
+never see uncommitted data or run for rolled back work. Failed tasks are
+retried up to TASK_MAX_ATTEMPTS times with exponential backoff.
+
+Functions decorated with @on_startup are called when a process starts
+running tasks, to enqueue work whose scheduling may have been lost.
+"""
+import functools
+import logging
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.metrics import Counter, Gauge, Histogram, registry
+from core.models import Task
+
+
+logger = logging.getLogger(__name__)
+
+tasks_total = registry.register(Counter(
+    'tasks_total',
+    'Task attempts by outcome (succeeded, retried or failed).',
+    ['task', 'outcome'],
+))
+task_duration = registry.register(Histogram(
+    'task_duration_seconds',
+    'Time spent running a task attempt.',
+    ['task'],
+))
+queue_depth = registry.register(Gauge(
+    'task_queue_depth',
+    'Tasks waiting in the queue, by state.',
+    ['state'],
+))
+
+tasks = {}
+startup_hooks = []
+
+
+def task(func=None, *, max_attempts=None):
+    """Register func as a task, adding an enqueue method to it."""
+    def register(func):
+        func.task_name = f'{func.__module__}.{func.__qualname__}'
+        func.max_attempts = max_attempts
+        func.enqueue = functools.partial(enqueue, func)
+        func.enqueue_in = functools.partial(enqueue_in, func)
+        tasks[func.task_name] = func
+        return func
+
+    return register(func) if func else register
+
+
+def on_startup(func):
+    """Register func to be called when a process starts running tasks."""
+    startup_hooks.append(func)
+    return func
+
+
+def run_startup_hooks():
+    """Call the functions registered with @on_startup."""
+    for hook in startup_hooks:
+        hook()
+
+
+def enqueue(func, *args, **kwargs):
+    """Run the task func with args once the current transaction commits."""
+    enqueue_in(func, 0, *args, **kwargs)
+
+
+def enqueue_in(func, delay, *args, **kwargs):
+    """Run the task func with args delay seconds after the commit."""
+    max_attempts = func.max_attempts or settings.TASK_MAX_ATTEMPTS
+    get_backend().enqueue(func.task_name, args, kwargs, max_attempts, delay)
+
+
+def retry_delay(attempt):
+    """Return the seconds to wait before retrying after attempt failed."""
+    return settings.TASK_RETRY_DELAY * 2 ** (attempt - 1)
+
+
+def run_task(name, args, kwargs, attempt, max_attempts):
+    """Run one attempt of a task and record its outcome.
+
+    A failed attempt is logged and its exception raised again for the
+    backend to retry it.
+    """
+    start = time.perf_counter()
+    try:
+        tasks[name](*args, **kwargs)
+    except Exception:
+        outcome = 'retried' if attempt < max_attempts else 'failed'
+        tasks_total.inc(task=name, outcome=outcome)
+        logger.warning(
+            'Task %s %s after attempt %d of %d.',
+            name,
+            outcome,
+            attempt,
+            max_attempts,
+            exc_info=True,
+        )
+        raise
+    finally:
+        task_duration.observe(time.perf_counter() - start, task=name)
+    tasks_total.inc(task=name, outcome='succeeded')
+
+
+class ImmediateBackend:
+    """Run tasks in the calling thread once the transaction commits.
+
+    Delays are ignored and retries follow at once, without waiting.
+    """
+
+    def enqueue(self, name, args, kwargs, max_attempts, delay=0):
+        transaction.on_commit(functools.partial(
+            self.run, name, args, kwargs, max_attempts,
+        ))
+
+    def run(self, name, args, kwargs, max_attempts):
+        for attempt in range(1, max_attempts + 1):
+            try:
+                run_task(name, args, kwargs, attempt, max_attempts)
+            except Exception:
+                continue
+            return
+
+    def queue_depth(self):
+        return {'ready': 0}
+
+
+class ThreadPoolBackend:
+    """Run tasks in a thread pool of the current process.
+
+    Queued tasks are lost when the process exits.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self._ready = 0
+        self._scheduled = 0
+
+    def get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.TASK_CONCURRENCY,
+                    thread_name_prefix='task',
+                )
+            return self._executor
+
+    def enqueue(self, name, args, kwargs, max_attempts, delay=0):
+        if delay:
+            transaction.on_commit(functools.partial(
+                self.schedule, delay, name, args, kwargs, 1, max_attempts,
+            ))
+        else:
+            transaction.on_commit(functools.partial(
+                self.submit, name, args, kwargs, 1, max_attempts,
+            ))
+
+    def submit(self, name, args, kwargs, attempt, max_attempts):
+        with self._lock:
+            self._ready += 1
+        self.get_executor().submit(
+            self.run, name, args, kwargs, attempt, max_attempts,
+        )
+
+    def run(self, name, args, kwargs, attempt, max_attempts):
+        with self._lock:
+            self._ready -= 1
+        try:
+            run_task(name, args, kwargs, attempt, max_attempts)
+        except Exception:
+            if attempt < max_attempts:
+                self.schedule(
+                    retry_delay(attempt),
+                    name,
+                    args,
+                    kwargs,
+                    attempt + 1,
+                    max_attempts,
+                )
+        finally:
+            # Pool threads outlive requests, so close their connections the
+            # way the end of a request would.
+            close_old_connections()
+
+    def schedule(self, delay, name, args, kwargs, attempt, max_attempts):
+        def due():
+            with self._lock:
+                self._scheduled -= 1
+            self.submit(name, args, kwargs, attempt, max_attempts)
+
+        with self._lock:
+            self._scheduled += 1
+        timer = threading.Timer(delay, due)
+        timer.daemon = True
+        timer.start()
+
+    def queue_depth(self):
+        with self._lock:
+            return {'ready': self._ready, 'scheduled': self._scheduled}
+
+
+class DatabaseBackend:
+    """Queue tasks in the Task table for the run_workers command.
+
+    Tasks are inserted in the enqueuing transaction, which makes them
+    visible to workers exactly when it commits. A worker first claims a
+    task, committing its attempt and pushing it back by the retry delay,
+    so an attempt that kills the worker still counts and is retried
+    later. It then runs the task in a transaction holding the task's row
+    lock, so the task is deleted together with the task's own writes.
+    """
+
+    def enqueue(self, name, args, kwargs, max_attempts, delay=0):
+        Task.objects.create(
+            name=name,
+            args=list(args),
+            kwargs=kwargs,
+            max_attempts=max_attempts,
+            run_at=timezone.now() + timedelta(seconds=delay),
+        )
+
+    def claim(self):
+        """Claim the next due task, returning None when none is due."""
+        with transaction.atomic():
+            queued = Task.objects.select_for_update(
+                skip_locked=True,
+            ).filter(
+                failed=False,
+                run_at__lte=timezone.now(),
+            ).order_by('run_at', 'id').first()
+            if queued is None:
+                return None
+
+            if queued.attempts >= queued.max_attempts:
+                # The last attempt never finished.
+                queued.failed = True
+                queued.last_error = 'The worker stopped during the attempt.'
+                queued.save(update_fields=['failed', 'last_error'])
+                return queued
+
+            queued.attempts += 1
+            queued.run_at = timezone.now() + timedelta(
+                seconds=retry_delay(queued.attempts),
+            )
+            queued.save(update_fields=['attempts', 'run_at'])
+            return queued
+
+    def run_next(self):
+        """Run the next due task, returning False when none is due."""
+        claimed = self.claim()
+        if claimed is None:
+            return False
+        if claimed.failed:
+            return True
+
+        with transaction.atomic():
+            # Another worker may have claimed it again since, once due.
+            queued = Task.objects.select_for_update(
+                skip_locked=True,
+            ).filter(pk=claimed.pk, attempts=claimed.attempts).first()
+            if queued is None:
+                return True
+
+            try:
+                with transaction.atomic():
+                    run_task(
+                        queued.name,
+                        queued.args,
+                        queued.kwargs,
+                        queued.attempts,
+                        queued.max_attempts,
+                    )
+            except Exception:
+                queued.last_error = traceback.format_exc()
+                if queued.attempts < queued.max_attempts:
+                    queued.run_at = timezone.now() + timedelta(
+                        seconds=retry_delay(queued.attempts),
+                    )
+                else:
+                    queued.failed = True
+                queued.save(update_fields=['last_error', 'run_at', 'failed'])
+            else:
+                queued.delete()
+        return True
+
+    def queue_depth(self):
+        return Task.objects.aggregate(
+            ready=Count('pk', filter=Q(
+                failed=False,
+                run_at__lte=timezone.now(),
+            )),
+            scheduled=Count('pk', filter=Q(
+                failed=False,
+                run_at__gt=timezone.now(),
+            )),
+            failed=Count('pk', filter=Q(failed=True)),
+        )
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the backend named by TASK_BACKEND."""
+    global _backend
+    with _backend_lock:
+        path = settings.TASK_BACKEND
+        if _backend is None or _backend.path != path:
+            _backend = import_string(path)()
+            _backend.path = path
+        return _backend
+
+
+@registry.add_collector
+def collect_queue_depth():
+    """Report the depth of the configured backend's queue."""
+    for state, depth in get_backend().queue_depth().items():
+        queue_depth.set(depth, state=state)
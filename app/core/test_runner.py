@@ -0,0 +1,34 @@
+"""
+Test runner for the project.
+"""
+import shutil
+import tempfile
+
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Run tests hashing passwords with MD5 and running tasks inline.
+
+    Tests exercising the configured hashers override PASSWORD_HASHERS, and
+    tests of the task backends override TASK_BACKEND. Uploads are stored
+    in a temporary MEDIA_ROOT, removed after the run.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._media_root = tempfile.mkdtemp(prefix='media-')
+        self._settings = override_settings(
+            MEDIA_ROOT=self._media_root,
+            PASSWORD_HASHERS=[
+                'django.contrib.auth.hashers.MD5PasswordHasher',
+            ],
+            TASK_BACKEND='core.tasks.ImmediateBackend',
+        )
+        self._settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._settings.disable()
+        shutil.rmtree(self._media_root, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
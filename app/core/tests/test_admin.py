@@ -5,6 +5,10 @@ from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import Client
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Book, BookInterest
 
 
 class AdminSiteTests(TestCase):
@@ -45,3 +49,25 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+    def test_book_interests_list(self):
+        """Test interests are listed without per-row queries."""
+        book = Book.objects.create(
+            user=self.admin_user,
+            title='Sample book',
+            author='author',
+            location='location',
+        )
+        url = reverse('admin:core_bookinterest_changelist')
+        BookInterest.objects.create(book=book, interested_user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        BookInterest.objects.bulk_create([
+            BookInterest(book=book, interested_user=self.user)
+            for _ in range(5)
+        ])
+
+        with self.assertNumQueries(len(queries)):
+            res = self.client.get(url)
+
+        self.assertContains(res, 'Test User interested in')
@@ -0,0 +1,152 @@
+"""
+Tests for authentication classes.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.authentication import (
+    CachedTokenAuthentication,
+    TokenUserCache,
+    token_user_cache,
+)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test cached token authentication."""
+
+    def setUp(self):
+        cache.clear()
+        token_user_cache.clear()
+        self.auth = CachedTokenAuthentication()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+            name='Test Name',
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    def test_authenticate_cached(self):
+        """Test a token is looked up in the database only once."""
+        with self.assertNumQueries(1):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(0):
+            cached_user, cached_token = self.auth.authenticate_credentials(
+                self.token.key,
+            )
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(cached_user, self.user)
+        self.assertEqual(cached_token.key, self.token.key)
+        self.assertIsNot(cached_user, user)
+
+    def test_invalid_token_error(self):
+        """Test an unknown token is rejected."""
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials('invalid')
+
+    def test_token_delete_invalidates(self):
+        """Test deleting a token revokes it immediately."""
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_user_deactivation_invalidates(self):
+        """Test deactivating a user revokes their token immediately."""
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_user_update_invalidates(self):
+        """Test changes to the user are seen on the next request."""
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.user.set_password('newpass123')
+        self.user.save()
+        user, _ = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertTrue(user.check_password('newpass123'))
+
+    @override_settings(TOKEN_CACHE_TTL=0)
+    def test_entries_expire(self):
+        """Test cached users expire after the TTL."""
+        self.auth.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(1):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_other_user_update_keeps_cache(self):
+        """Test changes to another user leave this user cached."""
+        other_user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        Token.objects.create(user=other_user)
+        self.auth.authenticate_credentials(self.token.key)
+
+        other_user.name = 'Other Name'
+        other_user.save()
+
+        with self.assertNumQueries(0):
+            self.auth.authenticate_credentials(self.token.key)
+
+    @override_settings(TOKEN_CACHE_SIZE=1)
+    def test_least_recently_used_evicted(self):
+        """Test the in-process cache is bounded."""
+        other_user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        other_token = Token.objects.create(user=other_user)
+        self.auth.authenticate_credentials(self.token.key)
+        self.auth.authenticate_credentials(other_token.key)
+
+        with self.assertNumQueries(1):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_user_update_invalidates_on_commit(self):
+        """Test users cached before the change commits are dropped."""
+        self.auth.authenticate_credentials(self.token.key)
+        stale_user = get_user_model().objects.get(pk=self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.name = 'New Name'
+            self.user.save()
+            # A concurrent request loading the row before the commit.
+            token_user_cache.get_or_load(self.token.key, lambda: stale_user)
+
+        user, _ = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user.name, 'New Name')
+
+    @override_settings(TOKEN_CACHE_ALIAS='default')
+    def test_shared_cache(self):
+        """Test users are shared between processes through the cache."""
+        self.auth.authenticate_credentials(self.token.key)
+        # Simulate another process with an empty in-process cache.
+        token_user_cache.clear()
+
+        with self.assertNumQueries(0):
+            user, _ = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(user, self.user)
+
+    @override_settings(TOKEN_CACHE_ALIAS='default')
+    def test_shared_cache_invalidates_other_processes(self):
+        """Test invalidation reaches in-process caches of other processes."""
+        self.auth.authenticate_credentials(self.token.key)
+        # Simulate the token being deleted by another process.
+        TokenUserCache().invalidate(self.token.key)
+        Token.objects.filter(pk=self.token.pk).delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
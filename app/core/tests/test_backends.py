@@ -0,0 +1,87 @@
+"""
+Tests for the PostgreSQL backend connection pool.
+"""
+import threading
+
+from django.db import connection
+from django.db.utils import OperationalError
+from django.test import TransactionTestCase
+
+from core.backends.postgresql.base import close_pool
+from core.metrics import registry
+
+
+# The main test connection has no pool, so its alias is free for one.
+POOL_ALIAS = 'default'
+
+
+class ConnectionPoolTests(TransactionTestCase):
+    """Test pooled database connections."""
+
+    def setUp(self):
+        self.addCleanup(close_pool, POOL_ALIAS)
+
+    def pooled_connection(self, **settings):
+        """Return a new connection wrapper using a small pool."""
+        wrapper = connection.copy()
+        wrapper.settings_dict.update(POOL_SIZE=1, POOL_TIMEOUT=0.1)
+        wrapper.settings_dict.update(settings)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def query(self, wrapper):
+        """Run a query on wrapper and return the server process id."""
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            return cursor.fetchone()[0]
+
+    def test_closed_connections_are_reused(self):
+        """Test closing returns the connection to the pool for reuse."""
+        first = self.pooled_connection()
+        pid = self.query(first)
+        first.close()
+
+        second = self.pooled_connection()
+
+        self.assertEqual(self.query(second), pid)
+        self.assertIn(
+            f'db_pool_connections_in_use{{alias="{POOL_ALIAS}"}} 1',
+            registry.render(),
+        )
+
+    def test_open_transaction_rolled_back_on_checkin(self):
+        """Test a connection closed mid-transaction comes back clean."""
+        first = self.pooled_connection()
+        first.set_autocommit(False)
+        self.query(first)
+        first.close()
+
+        second = self.pooled_connection()
+        self.query(second)
+
+        self.assertTrue(second.get_autocommit())
+        self.assertEqual(
+            second.connection.info.transaction_status,
+            0,
+        )
+
+    def test_checkout_times_out_when_exhausted(self):
+        """Test waiting for a connection gives up after POOL_TIMEOUT."""
+        first = self.pooled_connection()
+        self.query(first)
+        second = self.pooled_connection()
+        second.inc_thread_sharing()
+        errors = []
+
+        def query_from_thread():
+            try:
+                self.query(second)
+            except OperationalError as error:
+                errors.append(error)
+
+        thread = threading.Thread(target=query_from_thread)
+        thread.start()
+        thread.join()
+
+        self.assertEqual(len(errors), 1)
+        self.assertIn('Timed out', str(errors[0]))
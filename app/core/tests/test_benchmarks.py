@@ -0,0 +1,38 @@
+"""
+Tests for the benchmark timing helpers.
+"""
+from django.test import SimpleTestCase
+
+from core.benchmarks import percentile, summarize
+
+
+class BenchmarkTests(SimpleTestCase):
+    """Test latency percentiles and summaries."""
+
+    def test_percentile(self):
+        """Test percentiles pick from the sorted values, capped at the end."""
+        values = [0.1, 0.2, 0.3, 0.4]
+
+        self.assertEqual(percentile(values, 0.5), 0.3)
+        self.assertEqual(percentile(values, 0.99), 0.4)
+        self.assertIsNone(percentile([], 0.5))
+
+    def test_summarize(self):
+        """Test throughput and latencies are reported in milliseconds."""
+        summary = summarize([0.003, 0.001, 0.002, 0.004], elapsed=0.5)
+
+        self.assertEqual(summary, {
+            'requests_per_second': 8.0,
+            'p50_ms': 3.0,
+            'p90_ms': 4.0,
+            'p99_ms': 4.0,
+            'mean_ms': 2.5,
+        })
+
+    def test_summarize_without_latencies(self):
+        """Test a run with no successful requests has no latencies."""
+        summary = summarize([], elapsed=1)
+
+        self.assertEqual(summary['requests_per_second'], 0)
+        self.assertIsNone(summary['p50_ms'])
+        self.assertIsNone(summary['mean_ms'])
@@ -1,13 +1,28 @@
 """
 Test custom Django management commands.
 """
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2OpError
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+
+from core import tasks
+from core.models import Book, BookInterest, Genre, Place, Task
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -32,3 +47,245 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class ExplainBooksCommandTests(TestCase):
+    """Test the explain_books command."""
+
+    def test_explain_books_seeds_and_explains(self):
+        """Test seeding books and printing a plan for each access path."""
+        out = StringIO()
+
+        call_command('explain_books', seed=100, stdout=out)
+
+        self.assertEqual(Book.objects.count(), 100)
+        output = out.getvalue()
+        for name in [
+            'list', 'author', 'condition', 'location', 'search', 'inbox',
+        ]:
+            self.assertIn(f'== {name}\n', output)
+        self.assertIn('Execution Time', output)
+
+
+class BackfillGenreNamesCommandTests(TestCase):
+    """Test the backfill_genre_names command."""
+
+    def test_backfill_genre_names(self):
+        """Test every book's genre names are rebuilt in batches."""
+        call_command('explain_books', seed=25, stdout=StringIO())
+        genre = Genre.objects.create(name='Drama')
+        Book.genres.through.objects.bulk_create([
+            Book.genres.through(book=book, genre=genre)
+            for book in Book.objects.all()
+        ])
+        out = StringIO()
+
+        call_command('backfill_genre_names', batch_size=10, stdout=out)
+
+        self.assertFalse(Book.objects.exclude(genre_names=['Drama']).exists())
+        self.assertIn('Backfilled 25 books.', out.getvalue())
+
+
+class ReconcileInterestCountsCommandTests(TestCase):
+    """Test the reconcile_interest_counts command."""
+
+    def test_reconcile_interest_counts(self):
+        """Test counts left behind by bulk writes are recounted."""
+        call_command('explain_books', seed=25, stdout=StringIO())
+        book = Book.objects.first()
+        BookInterest.objects.bulk_create([
+            BookInterest(
+                book=book,
+                interested_user=get_user_model().objects.create_user(
+                    f'reader{i}@example.com',
+                ),
+            )
+            for i in range(3)
+        ])
+        Book.objects.exclude(pk=book.pk).update(interest_count=7)
+        out = StringIO()
+
+        call_command('reconcile_interest_counts', batch_size=10, stdout=out)
+
+        counts = dict(Book.objects.values_list('pk', 'interest_count'))
+        self.assertEqual(counts.pop(book.pk), 3)
+        self.assertEqual(set(counts.values()), {0})
+        self.assertIn('Reconciled 25 books.', out.getvalue())
+
+
+class LoadGazetteerCommandTests(TestCase):
+    """Test the load_gazetteer command."""
+
+    def test_load_gazetteer(self):
+        """Test places are loaded and every book is located in batches."""
+        call_command('explain_books', seed=25, stdout=StringIO())
+        Book.objects.update(latitude=None, longitude=None)
+        Place.objects.create(name='location 3', latitude=0, longitude=0)
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / 'places.csv'
+        path.write_text(
+            'name,latitude,longitude\n'
+            'Location 3,41.5,44.5\n'
+            'Location 4,-33.9,18.4\n'
+        )
+        out = StringIO()
+
+        call_command('load_gazetteer', str(path), batch_size=10, stdout=out)
+
+        located = Book.objects.filter(latitude__isnull=False)
+        self.assertEqual(
+            set(located.values_list('location', 'latitude', 'longitude')),
+            {('Location 3', 41.5, 44.5), ('Location 4', -33.9, 18.4)},
+        )
+        self.assertIn('Located 25 books.', out.getvalue())
+
+
+class SeedBooksCommandTests(TestCase):
+    """Test the seed_books command."""
+
+    def test_seed_books(self):
+        """Test books are seeded with consistent derived data."""
+        call_command(
+            'seed_books',
+            books=300,
+            users=10,
+            batch_size=100,
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(Book.objects.count(), 300)
+        self.assertEqual(
+            get_user_model().objects.filter(
+                email__startswith='seed-user-',
+            ).count(),
+            10,
+        )
+        self.assertFalse(Book.objects.filter(search_vector=None).exists())
+        self.assertFalse(Book.objects.filter(latitude=None).exists())
+        self.assertTrue(BookInterest.objects.exists())
+        for book in Book.objects.prefetch_related('genres')[:20]:
+            self.assertEqual(
+                book.genre_names,
+                sorted(genre.name for genre in book.genres.all()),
+            )
+            self.assertEqual(
+                book.interest_count,
+                BookInterest.objects.filter(book=book).count(),
+            )
+
+        call_command('seed_books', books=100, users=10, stdout=StringIO())
+        self.assertEqual(Book.objects.count(), 400)
+
+
+class BenchApiCommandTests(TestCase):
+    """Test the bench_api command."""
+
+    def test_bench_api_reports_endpoints(self):
+        """Test every endpoint is reported with latency and query counts."""
+        call_command('seed_books', books=50, stdout=StringIO())
+        out = StringIO()
+
+        call_command('bench_api', requests=3, no_cache=True, stdout=out)
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['mode'], 'test-client')
+        for result in report['results']:
+            with self.subTest(endpoint=result['endpoint']):
+                self.assertEqual(result['errors'], 0)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+                self.assertIsNotNone(result['queries'])
+
+
+class BenchLoginCommandTests(TestCase):
+    """Test the bench_login command."""
+
+    def test_bench_login_reports_hashers(self):
+        """Test each configured hasher is reported with its login rate."""
+        out = StringIO()
+
+        call_command('bench_login', logins=2, stdout=out)
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(
+            [result['hasher'] for result in report['results']],
+            ['md5'],
+        )
+        self.assertEqual(report['results'][0]['errors'], 0)
+        self.assertGreater(
+            report['results'][0]['logins_per_second_per_core'],
+            0,
+        )
+        self.assertFalse(get_user_model().objects.exists())
+
+
+@tasks.task
+def create_genre(name):
+    """Create a genre, holding the task row lock for a moment."""
+    Genre.objects.create(name=name)
+    threading.Event().wait(0.01)
+
+
+@override_settings(TASK_BACKEND='core.tasks.DatabaseBackend')
+class RunWorkersCommandTests(TransactionTestCase):
+    """Test the run_workers command."""
+
+    def test_run_workers_runs_each_task_once(self):
+        """Test concurrent workers split the queue without overlap."""
+        names = [f'genre {i}' for i in range(40)]
+        for name in names:
+            create_genre.enqueue(name)
+        out = StringIO()
+
+        call_command('run_workers', burst=True, concurrency=4, stdout=out)
+
+        self.assertIn('Ran 40 tasks.', out.getvalue())
+        # Genre names are unique, so a task run twice would have failed.
+        self.assertEqual(
+            sorted(Genre.objects.values_list('name', flat=True)),
+            sorted(names),
+        )
+        self.assertFalse(Task.objects.exists())
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    """HTTP handler answering /ok with 200 and anything else with 404."""
+
+    def do_GET(self):
+        self.send_response(200 if self.path == '/ok' else 404)
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+class LoadTestCommandTests(SimpleTestCase):
+    """Test the load_test command."""
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), OkHandler)
+        threading.Thread(target=self.server.serve_forever).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+
+    def test_load_test_reports_latency(self):
+        """Test throughput, latency percentiles and errors are reported."""
+        out = StringIO()
+
+        call_command(
+            'load_test',
+            f'{self.base_url}/ok',
+            f'{self.base_url}/missing',
+            requests=20,
+            concurrency=4,
+            stdout=out,
+        )
+
+        ok, missing = json.loads(out.getvalue())
+        self.assertEqual(ok['errors'], 0)
+        self.assertGreater(ok['requests_per_second'], 0)
+        self.assertLessEqual(ok['p50_ms'], ok['p99_ms'])
+        self.assertEqual(missing['errors'], 20)
+        self.assertIsNone(missing['p50_ms'])
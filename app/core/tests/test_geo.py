@@ -0,0 +1,62 @@
+"""
+Tests for the coordinate search helpers.
+"""
+from django.test import SimpleTestCase
+
+from core.geo import bounding_box, normalize_place_name, read_gazetteer
+
+
+class GeoTests(SimpleTestCase):
+    """Test bounding boxes and gazetteer names."""
+
+    def test_bounding_box(self):
+        """Test the box spans the radius in both directions."""
+        south, north, longitudes = bounding_box(0, 0, 111.19508)
+
+        self.assertAlmostEqual(south, -1, places=5)
+        self.assertAlmostEqual(north, 1, places=5)
+        [(west, east)] = longitudes
+        self.assertAlmostEqual(west, -1, places=5)
+        self.assertAlmostEqual(east, 1, places=5)
+
+    def test_bounding_box_wider_towards_poles(self):
+        """Test longitudes widen with latitude for the same radius."""
+        [(west, east)] = bounding_box(60, 10, 100)[2]
+
+        self.assertAlmostEqual(east - 10, 10 - west)
+        self.assertGreater(east - west, 3.5)
+
+    def test_bounding_box_split_at_antimeridian(self):
+        """Test boxes crossing 180 degrees become two longitude ranges."""
+        _, _, longitudes = bounding_box(0, 179.5, 111.19508)
+
+        self.assertEqual(len(longitudes), 2)
+        self.assertAlmostEqual(longitudes[0][0], 178.5, places=5)
+        self.assertEqual(longitudes[0][1], 180)
+        self.assertEqual(longitudes[1][0], -180)
+        self.assertAlmostEqual(longitudes[1][1], -179.5, places=5)
+
+    def test_bounding_box_covering_pole(self):
+        """Test boxes reaching a pole cover every longitude."""
+        south, north, longitudes = bounding_box(89.5, 0, 100)
+
+        self.assertEqual(north, 90)
+        self.assertEqual(longitudes, [(-180, 180)])
+
+    def test_normalize_place_name(self):
+        """Test locations are matched by their first comma separated part."""
+        self.assertEqual(
+            normalize_place_name(' Kutaisi , Imereti, GE'),
+            'kutaisi',
+        )
+
+    def test_bundled_gazetteer(self):
+        """Test the bundled gazetteer has unique names and valid points."""
+        places = list(read_gazetteer())
+        names = [name for name, _, _ in places]
+
+        self.assertEqual(len(names), len(set(names)))
+        self.assertIn('tbilisi', names)
+        for name, latitude, longitude in places:
+            self.assertTrue(-90 <= latitude <= 90, name)
+            self.assertTrue(-180 <= longitude <= 180, name)
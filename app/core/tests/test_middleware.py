@@ -0,0 +1,152 @@
+"""
+Tests for the performance middleware and metrics.
+"""
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import Histogram, Registry
+from core.middleware import QueryTimer
+from core.models import Book
+
+
+BOOKS_URL = reverse('book:book-list')
+ASYNC_BOOKS_URL = reverse('book:async-book-list')
+METRICS_URL = reverse('metrics')
+SERVER_TIMING = re.compile(
+    r'db;dur=[\d.]+;desc="(\d+) queries", serialize;dur=([\d.]+),'
+    r' render;dur=([\d.]+), total;dur=[\d.]+'
+)
+
+
+class PerformanceMiddlewareTests(TestCase):
+    """Test request instrumentation."""
+
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        Book.objects.create(
+            user=user,
+            title='title',
+            author='author',
+            location='location',
+        )
+
+    def test_server_timing_header(self):
+        """Test responses report database, serializer and render time."""
+        res = self.client.get(BOOKS_URL)
+
+        match = SERVER_TIMING.fullmatch(res['Server-Timing'])
+        self.assertIsNotNone(match)
+        self.assertEqual(match.group(1), '1')
+        self.assertGreater(float(match.group(2)), 0)
+        self.assertGreater(float(match.group(3)), 0)
+
+    async def test_server_timing_header_async(self):
+        """Test async views report their database queries too."""
+        res = await self.async_client.get(ASYNC_BOOKS_URL)
+
+        match = SERVER_TIMING.fullmatch(res['Server-Timing'])
+        self.assertIsNotNone(match)
+        self.assertEqual(match.group(1), '1')
+
+    @override_settings(METRICS_ALLOWED_NETWORKS=['127.0.0.0/8'])
+    def test_metrics_endpoint(self):
+        """Test per-route histograms are served at /metrics."""
+        self.client.get(BOOKS_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        body = res.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertRegex(
+            body,
+            r'http_request_db_queries_count\{route="book:book-list",'
+            r'method="GET"\} \d+',
+        )
+
+    def test_metrics_denied_by_default(self):
+        """Test /metrics is refused without a token or allowed networks."""
+        for address in ['127.0.0.1', '10.0.0.5', '8.8.8.8']:
+            res = self.client.get(METRICS_URL, REMOTE_ADDR=address)
+
+            self.assertEqual(res.status_code, 403)
+
+    @override_settings(METRICS_ALLOWED_NETWORKS=['10.0.0.0/8'])
+    def test_metrics_allowed_networks(self):
+        """Test /metrics is served only to the allowed networks."""
+        res = self.client.get(METRICS_URL, REMOTE_ADDR='10.1.2.3')
+        self.assertEqual(res.status_code, 200)
+
+        res = self.client.get(METRICS_URL, REMOTE_ADDR='192.168.0.5')
+        self.assertEqual(res.status_code, 403)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        """Test /metrics requires the token when one is set."""
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 403)
+
+        res = self.client.get(
+            METRICS_URL,
+            HTTP_AUTHORIZATION='Bearer secret',
+            REMOTE_ADDR='8.8.8.8',
+        )
+
+        self.assertEqual(res.status_code, 200)
+
+    @override_settings(N_PLUS_ONE_THRESHOLD=3)
+    def test_repeated_query_logged(self):
+        """Test a statement repeated per row is logged with its call site."""
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            with connection.execute_wrapper(QueryTimer()):
+                for book_id in range(3):
+                    Book.objects.filter(pk=book_id).exists()
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('repeated 3 times', logs.output[0])
+        self.assertIn('test_middleware.py', logs.output[0])
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_slow_query_logged(self):
+        """Test queries slower than the threshold are logged."""
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            with connection.execute_wrapper(QueryTimer()):
+                Book.objects.count()
+
+        self.assertIn('Slow query', logs.output[0])
+
+
+class MetricsTests(TestCase):
+    """Test rendering metrics."""
+
+    def test_histogram_render(self):
+        """Test histograms render cumulative buckets, sum and count."""
+        registry = Registry()
+        histogram = registry.register(Histogram(
+            'latency_seconds',
+            'Latency.',
+            ['route'],
+            buckets=[0.1, 1],
+        ))
+        histogram.observe(0.05, route='a')
+        histogram.observe(0.5, route='a')
+        histogram.observe(5, route='a')
+
+        self.assertEqual(registry.render(), (
+            '# HELP latency_seconds Latency.\n'
+            '# TYPE latency_seconds histogram\n'
+            'latency_seconds_bucket{route="a",le="0.1"} 1\n'
+            'latency_seconds_bucket{route="a",le="1"} 2\n'
+            'latency_seconds_bucket{route="a",le="+Inf"} 3\n'
+            'latency_seconds_sum{route="a"} 5.55\n'
+            'latency_seconds_count{route="a"} 3\n'
+        ))
@@ -1,6 +1,7 @@
 """
 Tests for models.
 """
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -67,3 +68,192 @@ class ModelTests(TestCase):
         )
 
         self.assertEqual(str(book), book.title)
+
+    def test_book_search_vector_tracks_genres(self):
+        """Test the search vector follows genre changes and renames."""
+        user = get_user_model().objects.create_user(
+            'test@example.com',
+            'testpass123',
+        )
+        book = models.Book.objects.create(
+            user=user,
+            title='test title',
+            author='test author',
+            location='test location',
+        )
+        genre = models.Genre.objects.create(name='Mystery')
+        books = models.Book.objects.all()
+
+        book.genres.add(genre)
+        self.assertTrue(books.search('mystery').exists())
+
+        genre.name = 'Thriller'
+        genre.save()
+        self.assertFalse(books.search('mystery').exists())
+        self.assertTrue(books.search('thriller').exists())
+
+        book.genres.remove(genre)
+        self.assertFalse(books.search('thriller').exists())
+
+    def test_book_genre_names_track_genres(self):
+        """Test the genre names follow genre changes, renames and deletes."""
+        user = get_user_model().objects.create_user(
+            'test@example.com',
+            'testpass123',
+        )
+        book = models.Book.objects.create(
+            user=user,
+            title='test title',
+            author='test author',
+            location='test location',
+        )
+        mystery = models.Genre.objects.create(name='Mystery')
+        drama = models.Genre.objects.create(name='Drama')
+
+        def genre_names():
+            book.refresh_from_db()
+            return book.genre_names
+
+        self.assertEqual(genre_names(), [])
+        book.genres.add(mystery, drama)
+        self.assertEqual(genre_names(), ['Drama', 'Mystery'])
+
+        mystery.name = 'Thriller'
+        mystery.save()
+        self.assertEqual(genre_names(), ['Drama', 'Thriller'])
+
+        drama.delete()
+        self.assertEqual(genre_names(), ['Thriller'])
+
+        mystery.book_set.clear()
+        self.assertEqual(genre_names(), [])
+
+    def test_book_interest_count_tracks_interests(self):
+        """Test the interest count follows interests, never below zero."""
+        user = get_user_model().objects.create_user('test@example.com')
+        book = models.Book.objects.create(
+            user=user,
+            title='Dune',
+            author='Herbert',
+            location='Tbilisi',
+        )
+        updated_at = models.Book.objects.get(pk=book.pk).updated_at
+
+        interest = models.BookInterest.objects.create(
+            book=book,
+            interested_user=user,
+        )
+        book.refresh_from_db()
+        self.assertEqual(book.interest_count, 1)
+        self.assertEqual(book.updated_at, updated_at)
+
+        # A count that drifted below the interests it had.
+        models.Book.objects.filter(pk=book.pk).update(interest_count=0)
+        interest.delete()
+        book.refresh_from_db()
+        self.assertEqual(book.interest_count, 0)
+
+    def test_book_coordinates_from_gazetteer(self):
+        """Test books are located by the first part of their location."""
+        user = get_user_model().objects.create_user(
+            'test@example.com',
+            'testpass123',
+        )
+        book = models.Book.objects.create(
+            user=user,
+            title='test title',
+            author='test author',
+            location=' tbilisi, Georgia',
+        )
+        saved_at = book.updated_at
+        book.refresh_from_db()
+        self.assertAlmostEqual(book.latitude, 41.7151)
+        self.assertAlmostEqual(book.longitude, 44.8271)
+        # Readers who saw the book before it was located see it change.
+        self.assertGreater(book.updated_at, saved_at)
+
+        book.location = 'Nowhere'
+        book.save()
+        book.refresh_from_db()
+        self.assertIsNone(book.latitude)
+        self.assertIsNone(book.longitude)
+
+    def test_books_near(self):
+        """Test filtering books by distance, across the antimeridian."""
+        user = get_user_model().objects.create_user(
+            'test@example.com',
+            'testpass123',
+        )
+        models.Place.objects.create(
+            name='taveuni',
+            latitude=-16.85,
+            longitude=-179.95,
+        )
+        books = {
+            location: models.Book.objects.create(
+                user=user,
+                title=location,
+                author='test author',
+                location=location,
+            )
+            for location in ['Tbilisi', 'Rustavi', 'Batumi', 'Suva', 'Taveuni']
+        }
+
+        def near(latitude, longitude, radius_km):
+            return {
+                book.location for book in models.Book.objects.near(
+                    latitude,
+                    longitude,
+                    radius_km,
+                )
+            }
+
+        self.assertEqual(near(41.7151, 44.8271, 30), {'Tbilisi', 'Rustavi'})
+        self.assertEqual(near(41.7151, 44.8271, 5), {'Tbilisi'})
+        self.assertEqual(
+            near(41.7151, 44.8271, 300),
+            {'Tbilisi', 'Rustavi', 'Batumi'},
+        )
+        self.assertEqual(near(-18.1248, 178.4501, 250), {'Suva', 'Taveuni'})
+        self.assertEqual(near(-16.85, -179.95, 250), {'Suva', 'Taveuni'})
+        self.assertIn(books['Suva'], models.Book.objects.near(-90, 0, 8000))
+
+    def test_genre_name_unique_case_insensitive(self):
+        """Test genre names are unique regardless of case."""
+        models.Genre.objects.create(name='Poetry')
+
+        with self.assertRaises(IntegrityError):
+            models.Genre.objects.create(name='POETRY')
+
+    def test_get_or_create_many_genres(self):
+        """Test resolving genre names reuses and creates genres in bulk."""
+        existing = models.Genre.objects.create(name='Poetry')
+
+        with self.assertNumQueries(3):
+            genres = models.Genre.objects.get_or_create_many(
+                ['Essay', 'poetry', 'essay', 'Drama'],
+            )
+
+        self.assertEqual(
+            [genre.name for genre in genres],
+            ['Essay', 'Poetry', 'Drama'],
+        )
+        self.assertEqual(genres[1], existing)
+        self.assertEqual(models.Genre.objects.count(), 3)
+
+        with self.assertNumQueries(1):
+            models.Genre.objects.get_or_create_many(['drama', 'ESSAY'])
+
+    def test_get_or_create_many_genres_unicode(self):
+        """Test names are matched as the database lowercases them."""
+        # Python lowercases these differently from Postgres.
+        names = ['İnce', 'ΣΊΣΥΦΟΣ', 'ince']
+
+        genres = models.Genre.objects.get_or_create_many(names)
+
+        self.assertEqual([genre.name for genre in genres], ['İnce', 'ΣΊΣΥΦΟΣ'])
+        self.assertEqual(
+            models.Genre.objects.get_or_create_many(names),
+            genres,
+        )
+        self.assertEqual(models.Genre.objects.count(), 2)
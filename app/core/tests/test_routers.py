@@ -0,0 +1,166 @@
+"""
+Tests for read replica routing.
+"""
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.utils import OperationalError
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core import checks, routers
+from core.middleware import ReplicaMiddleware
+from core.models import Book, Genre
+from core.routers import ReplicaRouter, read_from
+
+
+def book_database(request):
+    """Return the database the request would read books from."""
+    return ReplicaRouter().db_for_read(Book)
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    """Test the database router."""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_book_reads_use_request_database(self):
+        """Test book and genre reads go to the chosen replica."""
+        with read_from('replica'):
+            self.assertEqual(self.router.db_for_read(Book), 'replica')
+            self.assertEqual(self.router.db_for_read(Genre), 'replica')
+            self.assertEqual(
+                self.router.db_for_read(Book.genres.through),
+                'replica',
+            )
+            self.assertIsNone(self.router.db_for_read(get_user_model()))
+
+        self.assertIsNone(self.router.db_for_read(Book))
+
+    def test_transactions_read_from_primary(self):
+        """Test reads inside a primary transaction see its writes."""
+        with read_from('replica'), patch(
+            'core.routers.connections',
+        ) as patched_connections:
+            primary = patched_connections.__getitem__.return_value
+            primary.in_atomic_block = True
+
+            self.assertEqual(self.router.db_for_read(Book), 'default')
+
+    def test_writes_use_primary(self):
+        """Test writes go to the primary, even for replica instances."""
+        book = Book()
+        book._state.db = 'replica'
+
+        with read_from('replica'):
+            self.assertEqual(
+                self.router.db_for_write(Book, instance=book),
+                'default',
+            )
+
+    @override_settings(REPLICA_DATABASES=['replica'])
+    def test_replicas_not_migrated(self):
+        """Test migrations only run on the primary."""
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+        self.assertFalse(self.router.allow_migrate('replica', 'core'))
+
+
+@override_settings(REPLICA_DATABASES=['replica'], REPLICA_PIN_SECONDS=5)
+@patch('core.middleware.choose_replica', return_value='replica')
+class ReplicaMiddlewareTests(SimpleTestCase):
+    """Test choosing the read database per request."""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.middleware = ReplicaMiddleware(book_database)
+
+    def test_safe_requests_read_from_replica(self, patched_choose):
+        """Test GET requests read books from a replica."""
+        request = self.factory.get('/', HTTP_AUTHORIZATION='Token a')
+
+        self.assertEqual(self.middleware(request), 'replica')
+
+    def test_writes_pin_client_to_primary(self, patched_choose):
+        """Test a client reads its own writes from the primary."""
+        write = self.factory.post('/', HTTP_AUTHORIZATION='Token a')
+        self.assertIsNone(self.middleware(write))
+
+        own_read = self.factory.get('/', HTTP_AUTHORIZATION='Token a')
+        other_read = self.factory.get('/', HTTP_AUTHORIZATION='Token b')
+        self.assertIsNone(self.middleware(own_read))
+        self.assertEqual(self.middleware(other_read), 'replica')
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_replicas_configured(self, patched_choose):
+        """Test requests skip routing without replicas."""
+        request = self.factory.get('/')
+
+        self.assertIsNone(self.middleware(request))
+        patched_choose.assert_not_called()
+
+
+@override_settings(REPLICA_DATABASES=['replica'], REPLICA_RETRY_SECONDS=30)
+@patch('core.routers.connections')
+class ReplicaFallbackTests(SimpleTestCase):
+    """Test falling back to the primary when replicas are down."""
+
+    def setUp(self):
+        routers._unavailable_until.clear()
+        self.addCleanup(routers._unavailable_until.clear)
+
+    def configure(self, patched_connections, replica_error=None):
+        """Set up the mocked primary and replica connections."""
+        primary, replica = MagicMock(in_atomic_block=False), MagicMock()
+        replica.ensure_connection.side_effect = replica_error
+        patched_connections.__getitem__.side_effect = {
+            'default': primary,
+            'replica': replica,
+        }.get
+        return replica
+
+    def test_available_replica_chosen(self, patched_connections):
+        """Test a reachable replica is used."""
+        self.configure(patched_connections)
+
+        self.assertEqual(routers.choose_replica(), 'replica')
+
+    def test_unavailable_replica_skipped(self, patched_connections):
+        """Test an unreachable replica is skipped until the retry delay."""
+        replica = self.configure(
+            patched_connections,
+            replica_error=OperationalError('down'),
+        )
+
+        with self.assertLogs('core.routers', 'WARNING'):
+            self.assertIsNone(routers.choose_replica())
+        self.assertIsNone(routers.choose_replica())
+
+        replica.ensure_connection.assert_called_once()
+
+    def test_primary_transaction_skips_replicas(self, patched_connections):
+        """Test replicas are not contacted inside a primary transaction."""
+        replica = self.configure(patched_connections)
+        patched_connections['default'].in_atomic_block = True
+
+        self.assertIsNone(routers.choose_replica())
+        replica.ensure_connection.assert_not_called()
+
+
+class ReplicaCacheCheckTests(SimpleTestCase):
+    """Test the check of the cache used with replicas."""
+
+    @override_settings(REPLICA_DATABASES=['replica'], CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }})
+    def test_local_cache_with_replicas_warned(self):
+        """Test replicas with a process-local cache are warned about."""
+        warnings = checks.check_replica_cache(None)
+
+        self.assertEqual([warning.id for warning in warnings], ['core.W001'])
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_replicas_not_warned(self):
+        """Test a local cache is fine without replicas."""
+        self.assertEqual(checks.check_replica_cache(None), [])
@@ -0,0 +1,224 @@
+"""
+Tests for background tasks.
+"""
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import tasks
+from core.models import Genre, Task
+
+
+calls = []
+failures = {}
+
+
+@tasks.task
+def record(value):
+    """Record value."""
+    calls.append(value)
+
+
+@tasks.task
+def create_genre(name):
+    """Create a genre."""
+    Genre.objects.create(name=name)
+
+
+@tasks.task(max_attempts=2)
+def fail_times(key, times):
+    """Fail the first `times` calls for key."""
+    failures[key] = failures.get(key, 0) + 1
+    if failures[key] <= times:
+        raise ValueError(f'failure {failures[key]}')
+    calls.append(key)
+
+
+class TaskTestMixin:
+    """Reset the recorded task calls."""
+
+    def setUp(self):
+        calls.clear()
+        failures.clear()
+
+
+class ImmediateBackendTests(TaskTestMixin, TestCase):
+    """Test running tasks in the calling thread."""
+
+    def test_runs_on_commit(self):
+        """Test tasks run once the transaction commits."""
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                record.enqueue('a')
+                self.assertEqual(calls, [])
+
+        self.assertEqual(calls, ['a'])
+
+    def test_rolled_back_task_not_run(self):
+        """Test tasks of a rolled back transaction never run."""
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    record.enqueue('a')
+                    raise ValueError
+            except ValueError:
+                pass
+
+        self.assertEqual(calls, [])
+
+    def test_retries(self):
+        """Test failed tasks are retried up to their attempts."""
+        with self.assertLogs('core.tasks', 'WARNING') as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                fail_times.enqueue('once', 1)
+                fail_times.enqueue('always', 5)
+
+        self.assertEqual(calls, ['once'])
+        self.assertEqual(failures, {'once': 2, 'always': 2})
+        self.assertIn('failed after attempt 2 of 2', logs.output[-1])
+
+
+@override_settings(
+    TASK_BACKEND='core.tasks.ThreadPoolBackend',
+    TASK_RETRY_DELAY=0.01,
+)
+class ThreadPoolBackendTests(TaskTestMixin, TransactionTestCase):
+    """Test running tasks in a thread pool."""
+
+    def setUp(self):
+        super().setUp()
+        # Pool threads share these settings; closing their connections
+        # after each task lets the test database be dropped.
+        settings_dict = patch.dict(connection.settings_dict, CONN_MAX_AGE=0)
+        settings_dict.start()
+        self.addCleanup(settings_dict.stop)
+
+    def wait_for_calls(self, count):
+        """Wait until count tasks have recorded a call."""
+        for _ in range(500):
+            if len(calls) >= count:
+                return
+            time.sleep(0.01)
+        self.fail(f'Only {len(calls)} of {count} tasks ran.')
+
+    def test_runs_in_pool(self):
+        """Test tasks run in pool threads with their own connections."""
+        for i in range(5):
+            record.enqueue(i)
+        create_genre.enqueue('Drama')
+        record.enqueue('last')
+
+        self.wait_for_calls(6)
+        self.assertEqual(sorted(calls[:5]), list(range(5)))
+        self.assertTrue(Genre.objects.filter(name='Drama').exists())
+
+    def test_retries_after_delay(self):
+        """Test a failed task is retried after a delay."""
+        with self.assertLogs('core.tasks', 'WARNING'):
+            fail_times.enqueue('once', 1)
+            self.wait_for_calls(1)
+
+        self.assertEqual(failures, {'once': 2})
+
+
+@override_settings(TASK_BACKEND='core.tasks.DatabaseBackend')
+class DatabaseBackendTests(TaskTestMixin, TestCase):
+    """Test the database task queue."""
+
+    def setUp(self):
+        super().setUp()
+        self.backend = tasks.get_backend()
+
+    def test_enqueue_and_run(self):
+        """Test queued tasks run in order and are deleted."""
+        create_genre.enqueue('Drama')
+        record.enqueue(value='b')
+
+        self.assertTrue(self.backend.run_next())
+        self.assertTrue(self.backend.run_next())
+        self.assertFalse(self.backend.run_next())
+
+        self.assertTrue(Genre.objects.filter(name='Drama').exists())
+        self.assertEqual(calls, ['b'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_enqueue_rolled_back(self):
+        """Test tasks are queued only when the transaction commits."""
+        try:
+            with transaction.atomic():
+                record.enqueue('a')
+                raise ValueError
+        except ValueError:
+            pass
+
+        self.assertFalse(Task.objects.exists())
+
+    def test_retry_then_fail(self):
+        """Test failed tasks are delayed, then kept as failed."""
+        fail_times.enqueue('always', 5)
+
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.assertTrue(self.backend.run_next())
+        queued = Task.objects.get()
+        self.assertEqual(queued.attempts, 1)
+        self.assertFalse(queued.failed)
+        self.assertGreater(queued.run_at, timezone.now())
+        self.assertFalse(self.backend.run_next())
+
+        Task.objects.update(run_at=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.assertTrue(self.backend.run_next())
+        queued.refresh_from_db()
+        self.assertEqual(queued.attempts, 2)
+        self.assertTrue(queued.failed)
+        self.assertIn('ValueError: failure 2', queued.last_error)
+        self.assertFalse(self.backend.run_next())
+
+    def test_crashed_attempts_counted(self):
+        """Test attempts a worker died in count towards the maximum."""
+        record.enqueue('a')
+        max_attempts = Task.objects.get().max_attempts
+
+        for attempt in range(max_attempts):
+            # The worker claims the task, then dies before finishing it.
+            self.assertEqual(self.backend.claim().attempts, attempt + 1)
+            self.assertFalse(self.backend.run_next())
+            Task.objects.update(run_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertTrue(self.backend.run_next())
+        self.assertTrue(Task.objects.get().failed)
+        self.assertEqual(calls, [])
+
+    def test_failed_task_writes_rolled_back(self):
+        """Test a failed attempt leaves no partial writes behind."""
+        @tasks.task(max_attempts=1)
+        def create_then_fail(name):
+            Genre.objects.create(name=name)
+            raise ValueError
+
+        create_then_fail.enqueue('Drama')
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.backend.run_next()
+
+        self.assertFalse(Genre.objects.exists())
+        self.assertTrue(Task.objects.get().failed)
+
+    def test_queue_depth_metrics(self):
+        """Test the queue depth is reported at /metrics."""
+        record.enqueue('a')
+        Task.objects.create(name='x', max_attempts=1, failed=True)
+
+        with self.settings(METRICS_TOKEN='secret'):
+            res = self.client.get(
+                reverse('metrics'),
+                HTTP_AUTHORIZATION='Bearer secret',
+            )
+
+        body = res.content.decode()
+        self.assertIn('task_queue_depth{state="ready"} 1', body)
+        self.assertIn('task_queue_depth{state="failed"} 1', body)
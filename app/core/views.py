@@ -0,0 +1,53 @@
+"""
+Views for the core app.
+"""
+import hmac
+import ipaddress
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.static import serve
+
+from core.metrics import registry
+
+
+def may_read_metrics(request):
+    """Return whether request may read the metrics.
+
+    Requests must send METRICS_TOKEN as a bearer token or come from one of
+    METRICS_ALLOWED_NETWORKS. Both are unset by default, denying everyone.
+    """
+    if settings.METRICS_TOKEN and hmac.compare_digest(
+        request.headers.get('Authorization', ''),
+        f'Bearer {settings.METRICS_TOKEN}',
+    ):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network)
+        for network in settings.METRICS_ALLOWED_NETWORKS
+    )
+
+
+def metrics(request):
+    """Serve the process metrics in the Prometheus text format."""
+    if not may_read_metrics(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+def media(request, path):
+    """Serve an uploaded file, letting clients cache it for a year.
+
+    Uploads are stored under names derived from their content, so the
+    file at a URL never changes. Routed only when DEBUG is on.
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
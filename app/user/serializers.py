@@ -9,8 +9,10 @@ from django.utils.translation import gettext as _
 
 from rest_framework import serializers
 
+from core.serializers import TimedSerializerMixin
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for the user object."""
 
     class Meta:
@@ -34,14 +36,18 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class AuthTokenSerializer(serializers.Serializer):
-    """Serializer for the user auth token."""
+class CredentialsSerializer(serializers.Serializer):
+    """Serializer for user login credentials."""
     email = serializers.EmailField()
     password = serializers.CharField(
         style={'input_type': 'password'},
         trim_whitespace=False,
     )
 
+
+class AuthTokenSerializer(CredentialsSerializer):
+    """Serializer for the user auth token."""
+
     def validate(self, attrs):
         """Validate and authenticate the user."""
         email = attrs.get('email')
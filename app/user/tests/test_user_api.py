@@ -1,18 +1,34 @@
 """
 Tests for the user API.
 """
-from django.test import TestCase
+from django.test import AsyncClient, TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.urls import reverse
 
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from rest_framework import status
 
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
+ASYNC_TOKEN_URL = reverse('user:async-token')
 ME_URL = reverse('user:me')
 
+# The configured hashers with costs low enough for tests.
+CHEAP_HASHERS = override_settings(
+    PASSWORD_HASHERS=[
+        'core.hashers.Argon2PasswordHasher',
+        'core.hashers.BCryptSHA256PasswordHasher',
+        'core.hashers.PBKDF2PasswordHasher',
+    ],
+    PASSWORD_ARGON2_TIME_COST=1,
+    PASSWORD_ARGON2_MEMORY_COST=64,
+    PASSWORD_BCRYPT_ROUNDS=4,
+    PASSWORD_PBKDF2_ITERATIONS=1000,
+)
+
 
 def create_user(**params):
     """Create and return a new user."""
@@ -110,6 +126,116 @@ class PublicUserApiTests(TestCase):
         self.assertNotIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @CHEAP_HASHERS
+    def test_create_token_rehashes_password(self):
+        """Test logging in upgrades the hash to the preferred hasher."""
+        user = create_user(email='test@example.com', name='Test Name')
+        user.password = make_password('testpass123', hasher='pbkdf2_sha256')
+        user.save()
+
+        res = self.client.post(
+            TOKEN_URL,
+            {'email': 'test@example.com', 'password': 'testpass123'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('argon2$'))
+        self.assertTrue(user.check_password('testpass123'))
+
+    @CHEAP_HASHERS
+    def test_create_token_bcrypt_password(self):
+        """Test logging in with a password stored by the bcrypt hasher."""
+        user = create_user(email='test@example.com', name='Test Name')
+        user.password = make_password('testpass123', hasher='bcrypt_sha256')
+        user.save()
+
+        res = self.client.post(
+            TOKEN_URL,
+            {'email': 'test@example.com', 'password': 'testpass123'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('argon2$'))
+
+    @CHEAP_HASHERS
+    def test_create_token_rehashes_changed_cost(self):
+        """Test logging in upgrades hashes made with an outdated cost."""
+        user = create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+
+        with override_settings(PASSWORD_ARGON2_TIME_COST=2):
+            self.client.post(
+                TOKEN_URL,
+                {'email': 'test@example.com', 'password': 'testpass123'},
+            )
+
+        old_password = user.password
+        user.refresh_from_db()
+        self.assertIn('t=1', old_password)
+        self.assertIn('t=2', user.password)
+
+    @CHEAP_HASHERS
+    async def test_async_create_token(self):
+        """Test the async endpoint returns the user's token and rehashes."""
+        user = await get_user_model().objects.acreate(
+            email='test@example.com',
+            password=make_password('testpass123', hasher='pbkdf2_sha256'),
+        )
+
+        res = await self.async_client.post(
+            ASYNC_TOKEN_URL,
+            {'email': 'test@example.com', 'password': 'testpass123'},
+            content_type='application/json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        token = await Token.objects.aget(user=user)
+        self.assertEqual(res.json(), {'token': token.key})
+        await user.arefresh_from_db()
+        self.assertTrue(user.password.startswith('argon2$'))
+
+    async def test_async_create_token_without_csrf_token(self):
+        """Test the async endpoint does not require a CSRF token."""
+        await get_user_model().objects.acreate(
+            email='test@example.com',
+            password=make_password('testpass123'),
+        )
+        client = AsyncClient(enforce_csrf_checks=True)
+
+        res = await client.post(
+            ASYNC_TOKEN_URL,
+            {'email': 'test@example.com', 'password': 'testpass123'},
+            content_type='application/json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('token', res.json())
+
+    async def test_async_create_token_bad_credentials(self):
+        """Test the async endpoint rejects wrong passwords and emails."""
+        await get_user_model().objects.acreate(
+            email='test@example.com',
+            password=make_password('goodpass'),
+        )
+
+        for payload in [
+            {'email': 'test@example.com', 'password': 'badpass'},
+            {'email': 'other@example.com', 'password': 'goodpass'},
+            {'email': 'test@example.com', 'password': ''},
+        ]:
+            res = await self.async_client.post(
+                ASYNC_TOKEN_URL,
+                payload,
+                content_type='application/json',
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertNotIn('token', res.json())
+
     def test_retrieve_user_unauthorized(self):
         """Test authentication is required for users."""
         res = self.client.get(ME_URL)
@@ -155,3 +281,15 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_token_auth_sees_profile_update(self):
+        """Test token authenticated requests see the updated profile."""
+        token = Token.objects.create(user=self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        client.get(ME_URL)
+
+        client.patch(ME_URL, {'name': 'Updated name'})
+        res = client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'Updated name')
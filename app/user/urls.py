@@ -3,7 +3,7 @@ URL mappings for the user API.
 """
 from django.urls import path
 
-from user import views
+from user import async_views, views
 
 
 app_name = 'user'
@@ -12,4 +12,5 @@ urlpatterns = [
     path('create/', views.CreateUserView.as_view(), name='create'),
     path('token/', views.CreateTokenView.as_view(), name='token'),
     path('me/', views.ManageUserView.as_view(), name='me'),
+    path('async/token/', async_views.create_token, name='async-token'),
 ]